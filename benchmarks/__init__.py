@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The generator's modules import each other by bare name (as main.py
+# runs them), so the benchmarks need src/ on the path as well
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,157 @@
+import os
+import random
+import shutil
+
+# Relative weights of the block kinds in a generated document
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 10,
+    "heading": 2,
+    "unordered_list": 2,
+    "ordered_list": 1,
+    "code": 1,
+    "quote": 1,
+}
+
+# Relative weights of inline elements inside paragraphs and list items
+DEFAULT_INLINE_MIX = {
+    "text": 20,
+    "bold": 2,
+    "italic": 2,
+    "code": 1,
+    "link": 2,
+    "image": 1,
+}
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog elves dwarves hobbits ring "
+    "mountain river forest tower council fellowship journey shadow light "
+    "ancient song king wizard road home"
+).split()
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def parse_mix(spec, defaults):
+    """
+    Parses "paragraph=10,code=0" into a mix, starting from the defaults.
+    """
+    mix = dict(defaults)
+    if spec:
+        for part in spec.split(","):
+            name, _, weight = part.partition("=")
+            if name.strip() not in mix:
+                raise ValueError(f"Unknown mix entry '{name}', expected one of {sorted(mix)}")
+            mix[name.strip()] = int(weight)
+    return mix
+
+
+def _choose(rng, mix):
+    names = list(mix)
+    return rng.choices(names, weights=[mix[name] for name in names])[0]
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def inline_text(rng, inline_mix, elements=12):
+    parts = []
+    for _ in range(elements):
+        kind = _choose(rng, inline_mix)
+        if kind == "text":
+            parts.append(_words(rng, rng.randint(2, 8)))
+        elif kind == "bold":
+            parts.append(f"**{_words(rng, 2)}**")
+        elif kind == "italic":
+            parts.append(f"_{_words(rng, 2)}_")
+        elif kind == "code":
+            parts.append(f"`{rng.choice(WORDS)}`")
+        elif kind == "link":
+            parts.append(f"[{_words(rng, 2)}](/pages/{rng.randint(0, 999)})")
+        else:
+            parts.append(f"![{_words(rng, 2)}](/images/{rng.randint(0, 99)}.png)")
+    return " ".join(parts)
+
+
+def generate_block(rng, block_mix, inline_mix):
+    kind = _choose(rng, block_mix)
+    if kind == "heading":
+        return "#" * rng.randint(1, 4) + " " + _words(rng, rng.randint(2, 6))
+    if kind == "unordered_list":
+        return "\n".join("- " + inline_text(rng, inline_mix, 3) for _ in range(rng.randint(2, 6)))
+    if kind == "ordered_list":
+        return "\n".join(f"{i}. " + inline_text(rng, inline_mix, 3) for i in range(1, rng.randint(3, 7)))
+    if kind == "code":
+        lines = [f"{rng.choice(WORDS)}({rng.randint(0, 9)})" for _ in range(rng.randint(2, 8))]
+        return "```\n" + "\n".join(lines) + "\n```"
+    if kind == "quote":
+        return "\n".join("> " + _words(rng, rng.randint(4, 12)) for _ in range(rng.randint(1, 3)))
+    return inline_text(rng, inline_mix)
+
+
+# Documents larger than this repeat a unique chunk of this size, which
+# keeps generating a 100 MB document fast
+UNIQUE_CHUNK_BYTES = 1024 * 1024
+
+
+def generate_document(target_bytes, block_mix=None, inline_mix=None, seed=0):
+    """
+    Returns a markdown document of roughly target_bytes characters.
+    """
+    if target_bytes > UNIQUE_CHUNK_BYTES:
+        chunk = generate_document(UNIQUE_CHUNK_BYTES, block_mix, inline_mix, seed)
+        return "\n\n".join([chunk] * max(1, round(target_bytes / len(chunk))))
+
+    rng = random.Random(seed)
+    block_mix = block_mix or DEFAULT_BLOCK_MIX
+    inline_mix = inline_mix or DEFAULT_INLINE_MIX
+    blocks = ["# " + _words(rng, 4)]
+    size = len(blocks[0])
+    while size < target_bytes:
+        block = generate_block(rng, block_mix, inline_mix)
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+def generate_site(root, pages, page_bytes=4000, block_mix=None, inline_mix=None, seed=0):
+    """
+    Writes a complete site (content/, static/, template.html) under root
+    with the given number of pages, spread over nested directories so no
+    single directory holds more than 100 pages.
+    """
+    content_dir = os.path.join(root, "content")
+    static_dir = os.path.join(root, "static")
+    if os.path.exists(content_dir):
+        shutil.rmtree(content_dir)
+    os.makedirs(os.path.join(static_dir, "images"), exist_ok=True)
+
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+    with open(os.path.join(static_dir, "index.css"), "w") as f:
+        f.write("body { font-family: sans-serif; }\n")
+    for i in range(100):
+        with open(os.path.join(static_dir, "images", f"{i}.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + bytes(256))
+
+    for i in range(pages):
+        if i == 0:
+            relative = "index.md"
+        else:
+            relative = os.path.join(f"section{i // 10000}", f"group{(i // 100) % 100}", f"page{i}", "index.md")
+        path = os.path.join(content_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(generate_document(page_bytes, block_mix, inline_mix, seed=seed + i))
+    return content_dir
@@ -0,0 +1,191 @@
+"""
+Benchmarks every public stage of the generator on a synthetic corpus and
+compares the results against a stored baseline.
+
+    python -m benchmarks.run                      # small preset, compare
+    python -m benchmarks.run --preset large       # 100k pages, 100 MB doc
+    python -m benchmarks.run --update-baseline    # store a new baseline
+
+Exits with status 1 when a stage's throughput drops, or its peak memory
+grows, by more than --threshold relative to the baseline.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+from benchmarks.corpus import DEFAULT_BLOCK_MIX, DEFAULT_INLINE_MIX, generate_document, generate_site, parse_mix
+
+from blocklexer import lex_blocks
+from blocktype import block_to_block_type
+from markdowntoblocks import markdown_to_blocks
+from markdowntohtmlnode import markdown_to_html_node
+from splitdelimiter import split_nodes_delimiter
+from splitnodes import split_nodes_link
+from textnode import TextNode, TextType
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+PRESETS = {
+    "small": {"pages": 100, "doc_mb": 1},
+    "medium": {"pages": 10000, "doc_mb": 10},
+    "large": {"pages": 100000, "doc_mb": 100},
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the static site generator.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--pages", type=int, help="pages in the full-build site (overrides the preset)")
+    parser.add_argument("--doc-mb", type=float, help="size of the single-document benchmarks in MB")
+    parser.add_argument("--page-bytes", type=int, default=4000, help="approximate size of each site page")
+    parser.add_argument("--blocks", help="block mix, e.g. paragraph=10,code=0,heading=2")
+    parser.add_argument("--inline", help="inline mix, e.g. link=5,image=0,bold=1")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the best is kept")
+    parser.add_argument("--stages", help="comma-separated subset of stages to run")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative slowdown or memory growth before failing")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def measure(func, size_bytes, repeat):
+    """
+    Runs func repeat times for the best wall time, then once more under
+    tracemalloc for the peak memory, so tracing does not skew the timing.
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "seconds": round(best, 6),
+        "mb_per_s": round(size_bytes / (1024 * 1024) / best, 3) if best else None,
+        "peak_mb": round(peak / (1024 * 1024), 3),
+    }
+
+
+def run_full_build(site_dir):
+    from main import main as build_main
+
+    cwd = os.getcwd()
+    os.chdir(site_dir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_main(["--no-cache"])
+    finally:
+        os.chdir(cwd)
+
+
+def stage_functions(document, site_dir):
+    """
+    Returns {stage: (func, bytes processed)}. Inputs for the later stages
+    are prepared once here so each stage is timed on its own.
+    """
+    blocks = markdown_to_blocks(document)
+    text_nodes = [TextNode(block, TextType.TEXT) for block in blocks if not block.startswith(("#", "```"))]
+    html_node = markdown_to_html_node(document)
+    size = len(document.encode("utf-8"))
+    site_bytes = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(os.path.join(site_dir, "content"))
+        for name in files
+    )
+    return {
+        "lex_blocks": (lambda: list(lex_blocks(document)), size),
+        "markdown_to_blocks": (lambda: markdown_to_blocks(document), size),
+        "block_to_block_type": (lambda: [block_to_block_type(block) for block in blocks], size),
+        "split_nodes_delimiter": (lambda: split_nodes_delimiter(text_nodes, "**", TextType.BOLD), size),
+        "split_nodes_link": (lambda: split_nodes_link(text_nodes), size),
+        "markdown_to_html_node": (lambda: markdown_to_html_node(document), size),
+        "HTMLNode.to_html": (lambda: html_node.to_html(), size),
+        "main_build": (lambda: run_full_build(site_dir), site_bytes),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns a list of human-readable regressions.
+    """
+    regressions = []
+    for stage, current in results.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        if previous.get("mb_per_s") and current["mb_per_s"] < previous["mb_per_s"] * (1 - threshold):
+            regressions.append(f"{stage}: throughput {current['mb_per_s']} MB/s vs baseline {previous['mb_per_s']} MB/s")
+        if previous.get("peak_mb") and current["peak_mb"] > previous["peak_mb"] * (1 + threshold):
+            regressions.append(f"{stage}: peak memory {current['peak_mb']} MB vs baseline {previous['peak_mb']} MB")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    preset = PRESETS[args.preset]
+    pages = args.pages or preset["pages"]
+    doc_mb = args.doc_mb or preset["doc_mb"]
+    block_mix = parse_mix(args.blocks, DEFAULT_BLOCK_MIX)
+    inline_mix = parse_mix(args.inline, DEFAULT_INLINE_MIX)
+
+    print(f"Generating corpus: {pages} pages, {doc_mb} MB document")
+    document = generate_document(int(doc_mb * 1024 * 1024), block_mix, inline_mix)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as site_dir:
+        generate_site(site_dir, pages, args.page_bytes, block_mix, inline_mix)
+        stages = stage_functions(document, site_dir)
+        selected = args.stages.split(",") if args.stages else list(stages)
+        for stage in selected:
+            func, size = stages[stage]
+            results[stage] = measure(func, size, args.repeat)
+            result = results[stage]
+            print(f"  {stage:<22} {result['seconds']:10.4f} s  {result['mb_per_s']:10.2f} MB/s  peak {result['peak_mb']:8.2f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
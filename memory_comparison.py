@@ -0,0 +1,80 @@
+import sys
+import tracemalloc
+
+sys.path.insert(0, "src")
+
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+from markdowntohtmlnode import markdown_to_html_node
+
+
+# The node classes as they were before __slots__, interned tags and
+# shared props, kept here only as a baseline for the comparison
+class DictTextNode():
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode():
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+COUNT = 100000
+URLS = [f"https://example.com/page/{i}" for i in range(100)]
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    nodes = build()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del nodes
+    return allocated, peak
+
+
+def report(label, build_old, build_new):
+    old_bytes, _ = measure(build_old)
+    new_bytes, _ = measure(build_new)
+    print(f"{label}: {old_bytes / COUNT:.1f} bytes/node before, "
+          f"{new_bytes / COUNT:.1f} bytes/node after "
+          f"({100.0 * (old_bytes - new_bytes) / old_bytes:.0f}% smaller)")
+
+
+report(
+    "TextNode",
+    lambda: [DictTextNode(f"word {i % 50}", TextType.TEXT) for i in range(COUNT)],
+    lambda: [TextNode(f"word {i % 50}", TextType.TEXT) for i in range(COUNT)],
+)
+report(
+    "LeafNode (text)",
+    lambda: [DictHTMLNode(None, f"word {i % 50}") for i in range(COUNT)],
+    lambda: [LeafNode(None, f"word {i % 50}") for i in range(COUNT)],
+)
+report(
+    "ParentNode (link)",
+    lambda: [DictHTMLNode("a", None, [DictHTMLNode(None, "x")], {"href": URLS[i % 100]}) for i in range(COUNT)],
+    lambda: [ParentNode("a", [LeafNode(None, "x")], {"href": URLS[i % 100]}) for i in range(COUNT)],
+)
+report(
+    "LeafNode (image)",
+    lambda: [DictHTMLNode("img", "", None, {"src": URLS[i % 100], "alt": "image"}) for i in range(COUNT)],
+    lambda: [LeafNode("img", "x", {"src": URLS[i % 100], "alt": "image"}) for i in range(COUNT)],
+)
+
+# Peak memory while converting a large document
+paragraph = "Some **bold** text, a [link](https://example.com/a) and _italic_ words with `code`."
+document = "\n\n".join(paragraph for _ in range(5000))
+tracemalloc.start()
+markdown_to_html_node(document)
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+print(f"markdown_to_html_node on {len(document)} chars: peak {peak / 1024 / 1024:.1f} MiB")
@@ -0,0 +1,318 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from buildlog import log
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class SyncResult():
+    def __init__(self):
+        self.copied = []
+        # The copied files that did not exist in the destination before
+        self.added = []
+        self.unchanged = []
+        self.removed = []
+
+    def summary(self):
+        return f"{len(self.copied)} copied, {len(self.unchanged)} unchanged, {len(self.removed)} removed"
+
+
+class FileStat():
+    """
+    The size and mtime of a scanned file, all that syncs and manifests
+    compare. A full os.stat_result holds about twenty fields, most of them
+    ints of their own, for every file of the tree; anything else a copy
+    needs is read from the open source file.
+    """
+
+    __slots__ = ("st_size", "st_mtime_ns")
+
+    def __init__(self, st_size, st_mtime_ns):
+        self.st_size = st_size
+        self.st_mtime_ns = st_mtime_ns
+
+
+def scan_tree(source, exclude=None):
+    """
+    Returns {relative_path: FileStat} for every file under source, using
+    os.scandir so each directory is listed with a single syscall.
+    """
+    files = {}
+    stack = [("", source)]
+    while stack:
+        prefix, directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative = prefix + entry.name
+                if entry.is_dir(follow_symlinks=True):
+                    stack.append((relative + "/", entry.path))
+                elif entry.is_file(follow_symlinks=True):
+                    if exclude is not None and exclude(relative):
+                        continue
+                    stat = entry.stat()
+                    files[relative] = FileStat(stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_contents(source_file, destination_file, size):
+    """
+    Copies bytes between two open files inside the kernel when possible:
+    copy_file_range (Linux 4.5+, reflinks on CoW filesystems), then
+    sendfile, then a plain read/write loop.
+    """
+    source_fd = source_file.fileno()
+    destination_fd = destination_file.fileno()
+    copied = 0
+    try:
+        if hasattr(os, "copy_file_range"):
+            while copied < size:
+                sent = os.copy_file_range(source_fd, destination_fd, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return
+    except OSError as error:
+        if error.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+            raise
+    try:
+        if hasattr(os, "sendfile"):
+            while copied < size:
+                sent = os.sendfile(destination_fd, source_fd, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+            return
+    except OSError as error:
+        if error.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+            raise
+    source_file.seek(copied)
+    destination_file.seek(copied)
+    shutil.copyfileobj(source_file, destination_file, COPY_CHUNK_SIZE)
+
+
+def copy_file(source_path, destination_path, hardlink=False):
+    """
+    Replaces destination_path with the source file. The copy is written to a
+    temporary file and renamed into place, and gets the source's mode and
+    mtime so the next sync can tell it is up to date from a single stat.
+    """
+    directory = os.path.dirname(destination_path)
+    if hardlink:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".sync-")
+        os.close(fd)
+        os.remove(tmp_path)
+        try:
+            os.link(source_path, tmp_path)
+            os.replace(tmp_path, destination_path)
+            return
+        except OSError as error:
+            if error.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            # Different filesystem or no link support: fall back to a copy
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".sync-")
+    try:
+        with open(source_path, "rb") as source_file, os.fdopen(fd, "wb") as destination_file:
+            source_stat = os.fstat(source_file.fileno())
+            _copy_contents(source_file, destination_file, source_stat.st_size)
+        os.chmod(tmp_path, source_stat.st_mode & 0o777)
+        os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tmp_path, destination_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _is_current(source_path, source_stat, destination_path, hardlink):
+    try:
+        destination_stat = os.stat(destination_path)
+    except FileNotFoundError:
+        return False
+    if hardlink:
+        return os.path.samestat(destination_stat, os.stat(source_path))
+    return (destination_stat.st_size == source_stat.st_size
+            and destination_stat.st_mtime_ns == source_stat.st_mtime_ns)
+
+
+def _output_size(path):
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest(manifest_path, destination):
+    if manifest_path is None or not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("destination") != os.path.abspath(destination):
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(manifest_path, destination, files):
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as manifest_file:
+        # Written an entry at a time: json.dump encodes the whole manifest
+        # into chunks before writing any of them
+        manifest_file.write(f'{{"destination": {json.dumps(os.path.abspath(destination))}, "files": {{')
+        separator = ""
+        for relative, entry in files.items():
+            manifest_file.write(f"{separator}{json.dumps(relative)}: {json.dumps(entry)}")
+            separator = ", "
+        manifest_file.write("}}")
+    os.replace(tmp_path, manifest_path)
+
+
+def remove_empty_dirs(destination, relative_paths):
+    directories = {os.path.dirname(path) for path in relative_paths if os.path.dirname(path)}
+    for directory in sorted(directories, key=len, reverse=True):
+        path = os.path.join(destination, directory)
+        while path != destination:
+            try:
+                os.rmdir(path)
+            except OSError:
+                break
+            path = os.path.dirname(path)
+
+
+def write_transformed(source_path, destination_path, transform):
+    """
+    Replaces destination_path with transform(text) of the source file,
+    through a temporary file, and gives it the source's mode and mtime.
+    Returns the size of what was written.
+    """
+    with open(source_path, "r", encoding="utf-8") as source_file:
+        source_stat = os.fstat(source_file.fileno())
+        data = transform(source_file.read()).encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(destination_path), prefix=".sync-")
+    try:
+        with os.fdopen(fd, "wb") as destination_file:
+            destination_file.write(data)
+        os.chmod(tmp_path, source_stat.st_mode & 0o777)
+        os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tmp_path, destination_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(data)
+
+
+def _transform_for(relative, transforms):
+    if not transforms:
+        return None
+    return transforms.get(os.path.splitext(relative)[1].lower())
+
+
+def sync_tree(sources, destination, manifest_path=None, hardlink=False, verify_hash=False, jobs=8, rename=None,
+              transforms=None):
+    """
+    Makes destination contain the files from sources, copying only what
+    changed since the last sync.
+
+    sources is a list of (directory, exclude) pairs; exclude is None or a
+    function of the relative path returning True for files to skip. When
+    two sources provide the same path the later one wins.
+
+    A file is copied when the destination copy is missing or its size or
+    mtime differ (with verify_hash, also when the content hash recorded in
+    the manifest differs). Copies run on a thread pool. Files recorded in
+    the manifest that no longer have a source are deleted; other files in
+    destination, such as generated pages, are left alone.
+
+    rename, when given, maps a file's relative path to the relative path it
+    is copied to, for fingerprinted asset names. transforms maps file
+    extensions to functions applied to the text of those files, such as
+    minify.minify_css; a transformed file is current when its source is
+    unchanged since the manifest was written and its output is still there.
+    """
+    result = SyncResult()
+    previous = load_manifest(manifest_path, destination)
+
+    wanted = {}
+    for source, exclude in sources:
+        if not os.path.isdir(source):
+            continue
+        for relative, stat in scan_tree(source, exclude).items():
+            output_relative = rename(relative) if rename is not None else relative
+            wanted[output_relative] = (os.path.join(source, relative), stat)
+
+    manifest = {}
+    to_copy = []
+    for relative, (source_path, stat) in sorted(wanted.items()):
+        destination_path = os.path.join(destination, relative)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        recorded = previous.get(relative, {})
+        transform = _transform_for(relative, transforms)
+        if transform is not None:
+            entry["transform"] = transform.__name__
+            current = (all(recorded.get(key) == value for key, value in entry.items())
+                       and _output_size(destination_path) == recorded.get("output_size"))
+            if current:
+                entry["output_size"] = recorded["output_size"]
+        else:
+            current = _is_current(source_path, stat, destination_path, hardlink)
+        if verify_hash:
+            entry["sha256"] = hash_file(source_path)
+            if current and recorded.get("sha256") != entry["sha256"]:
+                current = False
+        elif current and "sha256" in recorded and recorded.get("mtime_ns") == stat.st_mtime_ns:
+            # Keep the hash from an earlier verified sync for the next one
+            entry["sha256"] = recorded["sha256"]
+        manifest[relative] = entry
+        if current:
+            result.unchanged.append(relative)
+        else:
+            to_copy.append((relative, source_path, destination_path, transform))
+            if relative not in previous and not os.path.exists(destination_path):
+                result.added.append(relative)
+
+    for directory in sorted({os.path.dirname(item[2]) for item in to_copy}):
+        os.makedirs(directory, exist_ok=True)
+
+    def copy(item):
+        relative, source_path, destination_path, transform = item
+        if transform is not None:
+            manifest[relative]["output_size"] = write_transformed(source_path, destination_path, transform)
+        else:
+            copy_file(source_path, destination_path, hardlink)
+        return relative
+
+    if len(to_copy) > 1 and jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            result.copied = list(executor.map(copy, to_copy))
+    else:
+        result.copied = [copy(item) for item in to_copy]
+    for relative in result.copied:
+        log.info("Copied file: %s", relative)
+
+    for relative in sorted(set(previous) - set(wanted)):
+        try:
+            os.remove(os.path.join(destination, relative))
+            log.info("Removed stale file: %s", relative)
+        except FileNotFoundError:
+            pass
+        result.removed.append(relative)
+    remove_empty_dirs(destination, result.removed)
+
+    if manifest_path is not None:
+        save_manifest(manifest_path, destination, manifest)
+    return result
@@ -0,0 +1,180 @@
+import re
+
+from blocktype import BlockType
+from frontmatter import parse_front_matter
+
+_INDENT = re.compile(r"[ \t]*")
+_BLANK_LINES = re.compile(r"(?:[ \t]*\n)*")
+_BLANK_LINE = re.compile(r"\n[ \t]*(?:\n|$)")
+_HEADING = re.compile(r"[ \t]*#{1,6}[ \t]")
+_TITLE = re.compile(r"[ \t]*#[ \t]")
+# Line starts are matched as "\n" rather than with re.M and "^": a literal
+# first character lets the regex engine skip ahead instead of trying every
+# position. The first line of a span is always checked separately.
+_FENCE_LINE = re.compile(r"\n[ \t]*```")
+# Lines that end a paragraph running into them
+_INTERRUPT = re.compile(r"\n[ \t]*(?:```|#{1,6}[ \t])")
+_NOT_QUOTE = re.compile(r"\n(?![ \t]*>)")
+_NOT_ITEM = re.compile(r"\n(?![ \t]*- )")
+FENCE = "```"
+
+
+def _line_end(source, pos):
+    end = source.find("\n", pos)
+    return len(source) if end == -1 else end
+
+
+def _closing_fence(source, eol):
+    """
+    Returns the end offset of the first fence line after the line ending at
+    eol, or None when the fence is never closed.
+    """
+    match = _FENCE_LINE.search(source, eol)
+    if match is None:
+        return None
+    return _line_end(source, match.end())
+
+
+def _is_ordered(source, start, end):
+    number = 1
+    pos = start
+    while pos < end:
+        eol = min(_line_end(source, pos), end)
+        indent = _INDENT.match(source, pos, eol).end()
+        if not source.startswith(f"{number}. ", indent, eol):
+            return False
+        number += 1
+        pos = eol + 1
+    return True
+
+
+def _classify(source, start, end):
+    first = _INDENT.match(source, start, end).end()
+    marker = source[first]
+    if marker == ">" and _NOT_QUOTE.search(source, start, end) is None:
+        return BlockType.quote
+    if marker == "-" and source.startswith("- ", first) and _NOT_ITEM.search(source, start, end) is None:
+        return BlockType.unordered_list
+    if marker == "1" and _is_ordered(source, start, end):
+        return BlockType.ordered_list
+    return BlockType.paragraph
+
+
+def lex_blocks(source, pos=0):
+    """
+    Walks the source once and yields (BlockType, start, end) offsets into it
+    for every block; no block text is copied. Block boundaries and line
+    prefixes are found with regular expressions over the block's span, so
+    the per-line work runs inside the regex engine.
+
+    - Blank lines separate blocks.
+    - A fenced code block runs from its opening fence line to the closing
+      one and keeps its blank lines and indentation. A fence that is never
+      closed is ordinary text.
+    - An ATX heading ("# " to "###### ") is always a block of its own line.
+    - Fences and headings also end a paragraph that runs into them.
+    - Other blocks are quotes when every line starts with ">", unordered
+      lists when every line starts with "- ", ordered lists when the lines
+      are numbered "1. ", "2. " ... in order, and paragraphs otherwise.
+
+    Lexing starts at pos, such as the end of a page's front matter.
+    """
+    length = len(source)
+    pos = _BLANK_LINES.match(source, pos).end()
+    while pos < length:
+        eol = _line_end(source, pos)
+        if _INDENT.match(source, pos, eol).end() == eol:
+            # Whitespace-only last line
+            break
+
+        if source.startswith(FENCE, _INDENT.match(source, pos, eol).end(), eol):
+            close = _closing_fence(source, eol)
+            if close is not None:
+                yield BlockType.code, pos, close
+                pos = _BLANK_LINES.match(source, close + 1).end()
+                continue
+
+        if _HEADING.match(source, pos, eol):
+            yield BlockType.heading, pos, eol
+            pos = _BLANK_LINES.match(source, eol + 1).end()
+            continue
+
+        blank = _BLANK_LINE.search(source, eol)
+        end = blank.start() if blank is not None else length
+        search_from = eol
+        while search_from < end:
+            interrupt = _INTERRUPT.search(source, search_from, end)
+            if interrupt is None:
+                break
+            line_end = _line_end(source, interrupt.end())
+            if interrupt.group().endswith(FENCE) and _closing_fence(source, line_end) is None:
+                search_from = line_end
+                continue
+            end = interrupt.start()
+            break
+
+        yield _classify(source, pos, end), pos, end
+        pos = _BLANK_LINES.match(source, end + 1).end()
+
+
+class LexedPage():
+    """
+    A page lexed by lex_page: its front matter fields, the spans of its
+    blocks, and the span of its first h1 heading (None when it has none).
+    """
+
+    __slots__ = ("fields", "spans", "title_span")
+
+    def __init__(self, fields, spans, title_span):
+        self.fields = fields
+        self.spans = spans
+        self.title_span = title_span
+
+
+def lex_page(source):
+    """
+    Parses a page's front matter and lexes the markdown after it, noting
+    the first h1 as the blocks go by, so that a page's metadata (see
+    frontmatter.page_metadata) needs no pass over the source of its own.
+    """
+    fields, pos = parse_front_matter(source)
+    spans = []
+    title_span = None
+    for span in lex_blocks(source, pos):
+        spans.append(span)
+        if title_span is None and span[0] == BlockType.heading and _TITLE.match(source, span[1], span[2]):
+            title_span = span
+    return LexedPage(fields, spans, title_span)
+
+
+def block_lines(block):
+    """
+    Returns the stripped, non-blank lines of a block's text.
+    """
+    return [line.strip() for line in block.split("\n") if line.strip()]
+
+
+def code_content(block):
+    """
+    Returns the text between a code block's fence lines, with the fence's
+    own indentation removed from each line and everything else kept.
+    """
+    first = block.find("\n")
+    last = block.rfind("\n")
+    if first == -1 or first == last:
+        return ""
+    indent = _INDENT.match(block).end()
+    lines = block[first + 1:last].split("\n")
+    if indent:
+        lines = [line[min(indent, _INDENT.match(line).end()):] for line in lines]
+    return "\n".join(lines)
+
+
+def block_text(source, block_type, start, end):
+    """
+    Returns the text of a lexed block the way markdown_to_blocks always
+    has: stripped, non-blank lines, except for code, which is kept as written.
+    """
+    if block_type == BlockType.code:
+        return source[start:end]
+    return "\n".join(block_lines(source[start:end]))
@@ -0,0 +1,157 @@
+import json
+from collections import OrderedDict
+
+from htmlnode import RawHTMLNode
+from rendercache import GENERATOR_VERSION, hash_text
+
+DEFAULT_MAX_ENTRIES = 20000
+
+# Stored under a block's page-independent key when its output depends on
+# the page's own URL (relative links, bare image names); the real entry is
+# then kept under a key that includes the page
+PAGE_SPECIFIC = "page-specific"
+
+_active = None
+
+
+def enable(memo):
+    global _active
+    _active = memo
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    return _active
+
+
+class BlockMemo():
+    """
+    Memoizes the HTML rendered for single markdown blocks.
+
+    Blocks are keyed by their text and the URL rewriting settings; the block
+    type follows from the text alone, so it needs no place in the key.
+    Entries live in a bounded in-memory LRU, and optionally in a RenderCache
+    ("blocks" entries) so they survive between builds. A hit replays the
+    image and link URLs the block recorded, so dependency tracking still
+    sees them. Warnings are only raised when a block is first rendered.
+
+    With an image sizer, whether an image loads lazily depends on how many
+    images came before it on the page, so blocks with images are also keyed
+    by that count, capped where it stops making a difference. Entries record
+    how many images they hold, to keep the page's count right on a hit, and
+    the plain text the block added to a searchindex.PageText.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        if self.store is None:
+            return None
+        text = self.store.get("blocks", self._store_key(key))
+        if text is None:
+            return None
+        entry = json.loads(text)
+        self._remember(key, entry)
+        self.store_hits += 1
+        return entry
+
+    def _put(self, key, entry):
+        self._remember(key, entry)
+        if self.store is not None:
+            self.store.put("blocks", self._store_key(key), json.dumps(entry))
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _store_key(self, key):
+        return hash_text(f"{GENERATOR_VERSION}\0{key[0]}\0{key[1]}")
+
+    def render(self, block, rewriter, render_block, *args):
+        """
+        Returns the HTMLNode for block, or None for a block that renders to
+        nothing. render_block(block, rewriter, *args) is called on a miss.
+        """
+        position = ""
+        if rewriter is not None and rewriter.sizer is not None and "![" in block:
+            position = f"\0{min(rewriter.image_index, rewriter.sizer.eager_images)}"
+        key = ((rewriter.signature(include_page=False) if rewriter is not None else "") + position, block)
+        entry = self._get(key)
+        if entry == PAGE_SPECIFIC:
+            key = (rewriter.signature() + position, block)
+            entry = self._get(key)
+
+        if entry is not None:
+            self.hits += 1
+            html, images, links, image_count, pieces = entry
+            if rewriter is not None:
+                rewriter.images.extend(images)
+                rewriter.links.extend(links)
+                rewriter.image_index += image_count
+                if rewriter.text is not None:
+                    rewriter.text.pieces.extend(pieces)
+            return None if html is None else RawHTMLNode(html)
+
+        self.misses += 1
+        if rewriter is None:
+            node = render_block(block, rewriter, *args)
+            self._put(key, [None if node is None else node.to_html(), [], [], 0, []])
+            return node
+
+        images_before = len(rewriter.images)
+        links_before = len(rewriter.links)
+        index_before = rewriter.image_index
+        pieces_before = len(rewriter.text.pieces) if rewriter.text is not None else 0
+        page_relative = rewriter.page_relative
+        rewriter.page_relative = False
+        node = render_block(block, rewriter, *args)
+        entry = [
+            None if node is None else node.to_html(),
+            rewriter.images[images_before:],
+            rewriter.links[links_before:],
+            rewriter.image_index - index_before,
+            rewriter.text.pieces[pieces_before:] if rewriter.text is not None else [],
+        ]
+        if rewriter.page_relative:
+            self._put(key, PAGE_SPECIFIC)
+            key = (rewriter.signature() + position, block)
+        rewriter.page_relative = rewriter.page_relative or page_relative
+        self._put(key, entry)
+        return node
+
+    def take_stats(self):
+        """
+        Returns and resets the counters, for a worker to report to the parent.
+        """
+        stats = (self.hits, self.store_hits, self.misses)
+        self.hits = self.store_hits = self.misses = 0
+        return stats
+
+    def merge_stats(self, stats):
+        hits, store_hits, misses = stats
+        self.hits += hits
+        self.store_hits += store_hits
+        self.misses += misses
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = (100.0 * self.hits / lookups) if lookups else 0.0
+        line = f"Block memo: {self.hits} hits / {self.misses} misses ({rate:.1f}%)"
+        if self.store is not None:
+            line += f", {self.store_hits} of the hits from disk"
+        return line
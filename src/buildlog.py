@@ -0,0 +1,111 @@
+import contextlib
+import logging
+import sys
+from collections import Counter
+
+# All build output goes through this logger. It is quiet by default:
+# per-page and per-block detail is only formatted when --verbose is on.
+log = logging.getLogger("ssg")
+log.propagate = False
+
+DEBUG = logging.DEBUG
+
+# (kind, file) -> count of warnings seen during this build
+_warnings = Counter()
+_current_file = None
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """
+    Writes to whatever sys.stdout is at the time of the call, so output
+    captured with contextlib.redirect_stdout (as in worker processes) picks
+    up log records too.
+    """
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_handler = _StdoutHandler()
+_handler.setFormatter(logging.Formatter("%(message)s"))
+
+
+def configure(verbose=False):
+    """
+    Sets up the build logger. Without verbose only real problems are
+    printed; with it every page, block and warning is logged as it happens.
+    """
+    if _handler not in log.handlers:
+        log.addHandler(_handler)
+    log.setLevel(logging.DEBUG if verbose else logging.WARNING)
+
+
+def verbose_enabled():
+    return log.isEnabledFor(logging.DEBUG)
+
+
+@contextlib.contextmanager
+def current_file(path):
+    """
+    Attributes warnings raised inside the block to path.
+    """
+    global _current_file
+    previous = _current_file
+    _current_file = path
+    try:
+        yield
+    finally:
+        _current_file = previous
+
+
+def warn(kind, message, *args):
+    """
+    Records a warning of the given kind against the current file. The
+    message is only formatted when verbose output is enabled; otherwise the
+    warning just shows up in the end-of-build summary.
+    """
+    _warnings[(kind, _current_file)] += 1
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Warning [%s]: " + message, kind, *args)
+
+
+def take_warnings():
+    """
+    Returns the collected warning counts and clears them. Used to ship
+    counts from a worker process back to the parent.
+    """
+    counts = dict(_warnings)
+    _warnings.clear()
+    return counts
+
+
+def merge_warnings(counts):
+    _warnings.update(counts)
+
+
+def warning_summary(max_files=5):
+    """
+    Returns the summary lines: one per kind with its total, followed by the
+    files that raised it most often.
+    """
+    by_kind = {}
+    for (kind, path), count in _warnings.items():
+        by_kind.setdefault(kind, Counter())[path] += count
+
+    lines = []
+    for kind in sorted(by_kind):
+        files = by_kind[kind]
+        lines.append(f"  {kind}: {sum(files.values())}")
+        for path, count in files.most_common(max_files):
+            lines.append(f"    {path or '<no file>'}: {count}")
+        if len(files) > max_files:
+            lines.append(f"    ... and {len(files) - max_files} more file(s)")
+    return lines
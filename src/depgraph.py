@@ -0,0 +1,174 @@
+import json
+import os
+import posixpath
+
+from rendercache import GENERATOR_VERSION
+
+
+def fingerprint(path):
+    """
+    Returns [size, mtime_ns] for a file, or None when it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _url_path(url):
+    for separator in ("?", "#"):
+        url = url.split(separator, 1)[0]
+    return posixpath.normpath(url) + ("/" if url.endswith("/") and url != "/" else "")
+
+
+class DependencyGraph():
+    """
+    Records, for every page, the inputs its output was built from and
+    persists them between builds:
+
+      - its markdown file
+      - its template, partials and the more specific layouts that would
+        replace the template if they were added
+      - the image files behind every image URL it references, and the
+        files next to the page that a bare image name would use instead,
+        had they existed
+      - the markdown files behind every internal page it links to
+
+    Files are fingerprinted by size and mtime. Linked pages only count by
+    whether they exist: a page is rebuilt when a link target appears or
+    disappears, not when the target's text changes.
+
+    settings holds anything that affects every page, such as the base
+    path; when it differs from the recorded settings every page is stale.
+    """
+
+    def __init__(self, path=None, content_dir="content", static_dir="static", settings=None):
+        self.path = path
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.settings = dict(settings or {}, generator=GENERATOR_VERSION)
+        self.pages = {}
+        self.settings_changed = False
+        self._fingerprints = {}
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as graph_file:
+                data = json.load(graph_file)
+            if data.get("settings") == self.settings:
+                self.pages = data.get("pages", {})
+            else:
+                self.settings_changed = True
+
+    def image_sources(self, url):
+        """
+        Returns the files an image URL may be served from; content/ wins
+        over static/, like the asset sync.
+        """
+        relative = _url_path(url).lstrip("/")
+        return [os.path.join(self.content_dir, relative), os.path.join(self.static_dir, relative)]
+
+    def link_sources(self, url):
+        """
+        Returns the markdown files an internal link may point at.
+        """
+        path = _url_path(url)
+        relative = path.strip("/")
+        if path.endswith("/") or not relative:
+            return [os.path.join(self.content_dir, relative, "index.md")]
+        if relative.endswith(".html"):
+            return [os.path.join(self.content_dir, relative[:-len(".html")] + ".md")]
+        return [os.path.join(self.content_dir, relative + ".md"),
+                os.path.join(self.content_dir, relative, "index.md")]
+
+    def _fingerprint(self, path):
+        # Many pages share a template or image; stat each file once per build
+        if path not in self._fingerprints:
+            self._fingerprints[path] = fingerprint(path)
+        return self._fingerprints[path]
+
+    def record(self, markdown_path, output_path, dependencies):
+        """
+        Stores the inputs of a page that was just rendered. dependencies is
+        what utils.generate_page returns.
+        """
+        # The page's own files were just rewritten or read; stat them again
+        self._fingerprints.pop(markdown_path, None)
+        files = {markdown_path: self._fingerprint(markdown_path)}
+        for path in dependencies.get("templates", []):
+            files[path] = self._fingerprint(path)
+        for url in dependencies.get("images", []):
+            for path in self.image_sources(url):
+                files[path] = self._fingerprint(path)
+        for path in dependencies.get("absent", []):
+            # Recorded as missing, so the file appearing rebuilds the page
+            files[path] = None
+        links = {}
+        for url in dependencies.get("links", []):
+            for path in self.link_sources(url):
+                if path != markdown_path:
+                    links[path] = os.path.isfile(path)
+        self.pages[markdown_path] = {"output": output_path, "files": files, "links": links}
+
+    def forget(self, markdown_path):
+        self.pages.pop(markdown_path, None)
+
+    def retain(self, markdown_paths):
+        """
+        Drops pages whose markdown no longer exists.
+        """
+        keep = set(markdown_paths)
+        for markdown_path in list(self.pages):
+            if markdown_path not in keep:
+                del self.pages[markdown_path]
+
+    def reasons(self, markdown_path, output_path):
+        """
+        Returns why the page must be rebuilt, as a list of readable reasons;
+        an empty list means its output is up to date.
+        """
+        record = self.pages.get(markdown_path)
+        if record is None:
+            return ["build settings changed" if self.settings_changed else "not built before"]
+        reasons = []
+        if record["output"] != output_path or not os.path.exists(output_path):
+            reasons.append(f"{output_path} is missing")
+        for path, recorded in record["files"].items():
+            current = self._fingerprint(path)
+            if current == recorded:
+                continue
+            if recorded is None:
+                reasons.append(f"{path} was added")
+            elif current is None:
+                reasons.append(f"{path} was removed")
+            else:
+                reasons.append(f"{path} changed")
+        for path, existed in record["links"].items():
+            exists = self._fingerprint(path) is not None
+            if exists != existed:
+                reasons.append(f"linked page {path} was {'added' if exists else 'removed'}")
+        return reasons
+
+    def dependents(self, path):
+        """
+        Returns the markdown files of every page that depends on path.
+        """
+        return sorted(markdown_path for markdown_path, record in self.pages.items()
+                      if path == markdown_path or path in record["files"] or path in record["links"])
+
+    def invalidate(self, paths=None):
+        """
+        Forgets cached fingerprints, for all files or just the given ones,
+        so the next reasons() call sees edits made since.
+        """
+        if paths is None:
+            self._fingerprints.clear()
+        else:
+            for path in paths:
+                self._fingerprints.pop(path, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as graph_file:
+            json.dump({"settings": self.settings, "pages": self.pages}, graph_file)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,515 @@
+"""
+Development server: renders every page into memory, serves it over HTTP
+and, with --watch, re-renders only what changed and tells open browsers to
+reload through server-sent events.
+
+    python3 src/main.py serve --watch
+"""
+import argparse
+import hashlib
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import blockmemo
+import buildlog
+from buildlog import current_file, log
+from depgraph import DependencyGraph
+from listings import ListingGenerator
+from pageindex import PageIndex
+from parallelrender import _init_worker
+from rendercache import RenderCache, DEFAULT_MAX_BYTES
+from template import get_loader
+from utils import discover_pages, render_page
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + LIVERELOAD_PATH + "\")"
+    ".addEventListener(\"reload\", function () { location.reload(); });</script>"
+)
+KEEPALIVE_SECONDS = 15
+
+# Below this many changed pages the server renders in its own process; the
+# warm worker pool only pays off for larger batches such as template edits
+POOL_THRESHOLD = 8
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve the site from memory.")
+    parser.add_argument("base_path", nargs="?", default="/",
+                        help="URL prefix the site is served from (default: /)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--watch", action="store_true",
+                        help="rebuild changed pages and live-reload open browsers")
+    parser.add_argument("--poll-interval", type=float, default=0.1,
+                        help="seconds between checks for changed files")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes kept warm for large rebuilds")
+    parser.add_argument("--cache-dir", default=os.path.join(".cache", "render"),
+                        help="directory for the persistent render cache")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="render every page from scratch")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log every page, block and warning as it happens")
+    return parser.parse_args(argv)
+
+
+def snapshot(paths):
+    """
+    Returns {path: (mtime_ns, size)} for every file under the given files
+    and directories. Missing paths are skipped.
+    """
+    files = {}
+    stack = []
+    for path in paths:
+        if os.path.isdir(path):
+            stack.append(path)
+        elif os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff_snapshots(old, new):
+    """
+    Returns the sorted list of paths that were added, removed or modified.
+    """
+    changed = {path for path in new if old.get(path) != new[path]}
+    changed.update(path for path in old if path not in new)
+    return sorted(changed)
+
+
+class Watcher():
+    """
+    Polls a set of files and directories for changes. A poll costs one
+    scandir per directory, which stays well under a millisecond for a site
+    of this size and needs no platform-specific notification API.
+    """
+
+    def __init__(self, paths, interval=0.1):
+        self.paths = paths
+        self.interval = interval
+        self.state = snapshot(paths)
+
+    def poll(self):
+        current = snapshot(self.paths)
+        changed = diff_snapshots(self.state, current)
+        self.state = current
+        return changed
+
+    def run(self, on_change, stop_event):
+        while not stop_event.wait(self.interval):
+            changed = self.poll()
+            if changed:
+                on_change(changed)
+
+
+class Entry():
+    __slots__ = ("status", "body", "etag", "content_type")
+
+    def __init__(self, status, body, content_type="text/html; charset=utf-8"):
+        self.status = status
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.content_type = content_type
+
+
+def _error_html(path, error):
+    log.error("Failed to render %s\n%s", path, error)
+    escaped = error.replace("&", "&amp;").replace("<", "&lt;")
+    return f"<html><body><h1>{path}</h1><pre>{escaped}</pre></body></html>"
+
+
+def _make_entry(status, html, live_reload):
+    if live_reload:
+        index = html.rfind("</body>")
+        html = html[:index] + LIVERELOAD_SCRIPT + html[index:] if index != -1 else html + LIVERELOAD_SCRIPT
+    return Entry(status, html.encode("utf-8"))
+
+
+def _render_to_entry(content_path, template_path, base_path, cache, content_dir, live_reload):
+    """
+    Renders one page into an Entry, returning it with the page's
+    dependencies. A page that fails to render becomes a 500 response showing
+    the traceback, so the error is visible in the browser, and has no
+    dependencies.
+    """
+    dependencies = None
+    try:
+        with current_file(content_path):
+            html, dependencies = render_page(content_path, template_path, base_path, cache, content_dir)
+        status = HTTPStatus.OK
+    except Exception:
+        html = _error_html(content_path, traceback.format_exc())
+        status = HTTPStatus.INTERNAL_SERVER_ERROR
+    return _make_entry(status, html, live_reload), dependencies
+
+
+# Template generation last seen by this worker process; see DevServer.render
+_worker_templates = 0
+
+
+def _render_in_worker(content_path, template_path, base_path, content_dir, live_reload, templates):
+    from parallelrender import _worker_cache
+
+    global _worker_templates
+    if templates != _worker_templates:
+        get_loader(template_path).reset()
+        _worker_templates = templates
+    return _render_to_entry(content_path, template_path, base_path, _worker_cache, content_dir, live_reload)
+
+
+class DevServer():
+    """
+    Holds the rendered site in memory, keyed by output path relative to the
+    site root ("blog/tom/index.html"). Static files and non-markdown content
+    are served straight from their source directories. An in-memory
+    DependencyGraph maps every changed file to the pages built from it, and
+    an in-memory PageIndex feeds the generated blog listings, which are
+    rendered again whenever a page or a listing template changes.
+    """
+
+    def __init__(self, content_dir="content", static_dir="static", template_path="template.html",
+                 base_path="/", cache=None, jobs=1, live_reload=False):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.base_path = base_path if base_path.endswith("/") else base_path + "/"
+        self.cache = cache
+        self.live_reload = live_reload
+        self.pages = {}
+        self.graph = DependencyGraph(None, content_dir, static_dir)
+        # Outputs are already relative to the site root, so the index needs
+        # no destination to strip
+        self.page_index = PageIndex("")
+        self.listings = ListingGenerator(template_path, "", self.base_path)
+        self.listing_pages = set()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.changed = threading.Condition()
+        # Bumped on every template, layout or partial edit so pool workers
+        # know to drop their own memoized layouts
+        self.templates = 0
+        self.executor = None
+        if jobs > 1:
+            # Started once and reused, so workers keep their imports,
+            # compiled templates, block memo and cache handles between rebuilds
+            self.executor = ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(cache, buildlog.verbose_enabled(), None, (blockmemo.DEFAULT_MAX_ENTRIES, False)),
+            )
+
+    def watched_paths(self):
+        template_dir = os.path.dirname(self.template_path)
+        return [
+            self.content_dir,
+            self.static_dir,
+            self.template_path,
+            os.path.join(template_dir, "layouts"),
+            os.path.join(template_dir, "partials"),
+            self.listings.listing_path,
+            self.listings.archive_path,
+        ]
+
+    def relative_output(self, content_path):
+        return os.path.relpath(content_path, self.content_dir).replace(".md", ".html").replace(os.sep, "/")
+
+    def render(self, content_paths):
+        """
+        Renders the given markdown files, returning {relative_output: Entry}.
+        """
+        self.graph.invalidate()
+        if self.executor is not None and len(content_paths) >= POOL_THRESHOLD:
+            futures = [
+                self.executor.submit(_render_in_worker, path, self.template_path, self.base_path,
+                                     self.content_dir, self.live_reload, self.templates)
+                for path in content_paths
+            ]
+            results = [future.result() for future in futures]
+        else:
+            results = [
+                _render_to_entry(path, self.template_path, self.base_path, self.cache,
+                                 self.content_dir, self.live_reload)
+                for path in content_paths
+            ]
+        entries = {}
+        for path, (entry, dependencies) in zip(content_paths, results):
+            relative = self.relative_output(path)
+            entries[relative] = entry
+            if dependencies is None:
+                self.graph.forget(path)
+            else:
+                self.graph.record(path, relative, dependencies)
+                self.page_index.update_page(path, relative, dependencies["meta"])
+        return entries
+
+    def render_listings(self, reserved):
+        """
+        Renders the blog listings from the page index, returning
+        {relative_output: Entry}. Listings that would replace a page in
+        reserved, rendered from markdown, are left out.
+        """
+        self.page_index.retain([path for path in self.page_index.pages if os.path.exists(path)])
+        pages, failures = self.listings.render(self.page_index, reserved)
+        entries = {relative: _make_entry(HTTPStatus.OK, html, self.live_reload) for relative, html in pages.items()}
+        for relative, error in failures:
+            entries[relative] = _make_entry(HTTPStatus.INTERNAL_SERVER_ERROR, _error_html(relative, error),
+                                            self.live_reload)
+        return entries
+
+    def update_pages(self, rendered, removed=(), listings=None):
+        """
+        Replaces rendered pages, drops removed ones and, when listings are
+        given, swaps them in for the previous ones.
+        """
+        with self.lock:
+            self.pages.update(rendered)
+            for relative in removed:
+                self.pages.pop(relative, None)
+            if listings is not None:
+                for relative in self.listing_pages:
+                    self.pages.pop(relative, None)
+                self.pages.update(listings)
+                self.listing_pages = set(listings)
+
+    def all_pages(self):
+        return [markdown_path for markdown_path, _ in discover_pages(self.content_dir, "")]
+
+    def build(self):
+        pages = self.render(self.all_pages())
+        listings = self.render_listings(set(pages))
+        with self.lock:
+            self.pages = {**pages, **listings}
+            self.listing_pages = set(listings)
+        return len(pages) + len(listings)
+
+    def affected_pages(self, changed):
+        """
+        Maps changed source files to the markdown files that must be
+        re-rendered, and returns (to_render, removed_outputs): edited and new
+        markdown files plus every page the dependency graph records as
+        built from a changed file, such as a layout or an embedded image.
+        """
+        content_prefix = os.path.join(self.content_dir, "")
+        template_dirs = tuple(os.path.join(path, "") for path in self.watched_paths()[3:5])
+        if any(path == self.template_path or path.startswith(template_dirs) for path in changed):
+            # A layout that was added or removed is not seen by the loader's
+            # memoized lookups, here or in the workers
+            get_loader(self.template_path).reset()
+            self.templates += 1
+
+        to_render = set()
+        removed = []
+        for path in changed:
+            if path.startswith(content_prefix) and path.endswith(".md"):
+                if os.path.exists(path):
+                    to_render.add(path)
+                else:
+                    removed.append(self.relative_output(path))
+                    self.graph.forget(path)
+            to_render.update(dependent for dependent in self.graph.dependents(path) if os.path.exists(dependent))
+        return sorted(to_render), removed
+
+    def rebuild(self, changed):
+        start = time.perf_counter()
+        to_render, removed = self.affected_pages(changed)
+        rendered = self.render(to_render)
+        listings = None
+        listing_templates = (self.listings.listing_path, self.listings.archive_path)
+        if to_render or removed or any(path in listing_templates for path in changed):
+            with self.lock:
+                markdown_pages = set(self.pages) - self.listing_pages
+            listings = self.render_listings((markdown_pages | set(rendered)) - set(removed))
+        self.update_pages(rendered, removed, listings)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Rebuilt {len(to_render)} page(s), removed {len(removed)} in {elapsed:.1f} ms "
+              f"({len(changed)} changed file(s))")
+        self.notify()
+
+    def notify(self):
+        with self.changed:
+            self.generation += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, generation, timeout):
+        with self.changed:
+            self.changed.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+    def lookup(self, url_path):
+        """
+        Resolves a request path to ("page", Entry), ("file", path),
+        ("redirect", location) or None.
+        """
+        if not url_path.startswith(self.base_path):
+            return None
+        relative = url_path[len(self.base_path):]
+        if relative == "" or relative.endswith("/"):
+            relative += "index.html"
+        # The path is already percent-decoded, so "%2F" and "%2E%2E" arrive
+        # here as "/" and ".."; anything that is absolute or climbs out of
+        # the site root once normalized is refused
+        relative = posixpath.normpath(relative)
+        if posixpath.isabs(relative) or os.path.isabs(relative) or relative.split("/")[0] == "..":
+            return None
+        with self.lock:
+            entry = self.pages.get(relative)
+            directory_index = relative + "/index.html" in self.pages
+        if entry is not None:
+            return "page", entry
+        if directory_index:
+            return "redirect", url_path + "/"
+        if relative.endswith(".md"):
+            return None
+        # Later sources win, matching the asset sync used by full builds
+        for source in (self.content_dir, self.static_dir):
+            path = os.path.join(source, relative)
+            root = os.path.realpath(source)
+            if os.path.commonpath([root, os.path.realpath(path)]) != root:
+                continue
+            if os.path.isfile(path):
+                return "file", path
+            if os.path.isdir(path):
+                return "redirect", url_path + "/"
+        return None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class DevRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ssg-devserver"
+
+    def log_message(self, format, *args):
+        log.info("%s %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path)
+        site = self.server.site
+        if path == LIVERELOAD_PATH:
+            return self.serve_events(site)
+
+        found = site.lookup(path)
+        if found is None:
+            return self.send_body(HTTPStatus.NOT_FOUND, b"Not found", "text/plain; charset=utf-8", None)
+        kind, value = found
+        if kind == "redirect":
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif kind == "page":
+            self.send_body(value.status, value.body, value.content_type, value.etag)
+        else:
+            stat = os.stat(value)
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            content_type = mimetypes.guess_type(value)[0] or "application/octet-stream"
+            if self.not_modified(etag):
+                return
+            with open(value, "rb") as f:
+                self.send_body(HTTPStatus.OK, f.read(), content_type, etag, check=False)
+
+    def not_modified(self, etag):
+        if etag is not None and etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return True
+        return False
+
+    def send_body(self, status, body, content_type, etag, check=True):
+        if check and status == HTTPStatus.OK and self.not_modified(etag):
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            # Always revalidate; the ETag makes that a cheap 304
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_events(self, site):
+        # Taken before the headers go out so a rebuild that finishes while
+        # the browser connects still produces a reload
+        generation = site.generation
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while not self.server.stopping.is_set():
+                latest = site.wait_for_change(generation, KEEPALIVE_SECONDS)
+                if latest != generation:
+                    generation = latest
+                    self.wfile.write(f"event: reload\ndata: {generation}\n\n".encode())
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class DevHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, site):
+        super().__init__(address, DevRequestHandler)
+        self.site = site
+        self.stopping = threading.Event()
+
+    def shutdown(self):
+        self.stopping.set()
+        self.site.notify()
+        super().shutdown()
+
+
+def serve(argv=None):
+    args = parse_args(argv)
+    buildlog.configure(args.verbose)
+    cache = None if args.no_cache else RenderCache(args.cache_dir, DEFAULT_MAX_BYTES)
+    # An edit usually touches a few blocks of one page; the rest come from here
+    blockmemo.enable(blockmemo.BlockMemo())
+    site = DevServer(base_path=args.base_path, cache=cache, jobs=args.jobs, live_reload=args.watch)
+
+    start = time.perf_counter()
+    count = site.build()
+    print(f"Rendered {count} pages in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    stop = threading.Event()
+    if args.watch:
+        watcher = Watcher(site.watched_paths(), args.poll_interval)
+        threading.Thread(target=watcher.run, args=(site.rebuild, stop), daemon=True).start()
+
+    server = DevHTTPServer((args.host, args.port), site)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}{site.base_path}"
+          + (" (watching for changes)" if args.watch else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.stopping.set()
+        server.server_close()
+        site.close()
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import posixpath
+import tempfile
+
+from assetsync import hash_file, scan_tree
+
+FINGERPRINT_EXTENSIONS = (
+    ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf",
+)
+HASH_LENGTH = 10
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_active = None
+
+
+def enable(manifest):
+    global _active
+    _active = manifest
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    return _active
+
+
+def fingerprinted_name(relative, digest):
+    """
+    Returns "images/tom.<hash>.png" for "images/tom.png".
+    """
+    directory, name = posixpath.split(relative)
+    stem, extension = posixpath.splitext(name)
+    return posixpath.join(directory, f"{stem}.{digest[:HASH_LENGTH]}{extension}")
+
+
+class AssetManifest():
+    """
+    Maps the site URLs of static assets to their fingerprinted URLs
+    ("/index.css" -> "/index.3f2a9c1b0e.css"), along with the source file
+    each one is copied from.
+
+    The hash is taken from the file's content, so an asset keeps its name
+    for as long as its bytes stay the same. key identifies the whole
+    mapping, for cache keys of anything rendered with it.
+    """
+
+    def __init__(self, assets=None):
+        # relative path -> (fingerprinted relative path, source path)
+        self.assets = dict(assets or {})
+        digest = hashlib.sha256()
+        for relative, (fingerprinted, _) in sorted(self.assets.items()):
+            digest.update(f"{relative}\0{fingerprinted}\0".encode("utf-8"))
+        self.key = digest.hexdigest()
+
+    def rename(self, relative):
+        """
+        Returns the output path of an asset, for assetsync.sync_tree.
+        """
+        entry = self.assets.get(relative)
+        return relative if entry is None else entry[0]
+
+    def lookup(self, url):
+        """
+        Returns (fingerprinted_url, source_path) for a root-relative URL of a
+        fingerprinted asset, keeping any query or fragment, or None.
+        """
+        path = url
+        suffix = ""
+        for separator in ("?", "#"):
+            index = path.find(separator)
+            if index != -1:
+                path, suffix = path[:index], path[index:] + suffix
+        entry = self.assets.get(path[1:])
+        if entry is None:
+            return None
+        fingerprinted, source_path = entry
+        return "/" + fingerprinted + suffix, source_path
+
+    def headers(self, base_path):
+        """
+        Returns a _headers file (the format read by Netlify and Cloudflare
+        Pages) marking every fingerprinted URL as immutable.
+        """
+        prefix = base_path.rstrip("/")
+        lines = []
+        for fingerprinted, _ in sorted(self.assets.values()):
+            lines.append(f"{prefix}/{fingerprinted}")
+            lines.append(f"  Cache-Control: {IMMUTABLE_CACHE_CONTROL}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def build_manifest(sources, cache_path=None, transforms=None):
+    """
+    Hashes the fingerprintable files of sources (the (directory, exclude)
+    pairs given to assetsync.sync_tree; later sources win) and returns an
+    AssetManifest. Hashes are kept in cache_path by size and mtime, so only
+    files that changed are read again. transforms is the same mapping given
+    to sync_tree; a transformed file's name also depends on the transform,
+    so its URL changes when its output does.
+    """
+    cached = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path, "r") as cache_file:
+            cached = json.load(cache_file)
+
+    wanted = {}
+    for source, exclude in sources:
+        if not os.path.isdir(source):
+            continue
+        for relative, stat in scan_tree(source, exclude).items():
+            if relative.lower().endswith(FINGERPRINT_EXTENSIONS):
+                wanted[relative] = (os.path.join(source, relative), stat)
+
+    hashes = {}
+    assets = {}
+    for relative, (source_path, stat) in sorted(wanted.items()):
+        recorded = cached.get(source_path)
+        if recorded is not None and recorded[:2] == [stat.st_size, stat.st_mtime_ns]:
+            digest = recorded[2]
+        else:
+            digest = hash_file(source_path)
+        hashes[source_path] = [stat.st_size, stat.st_mtime_ns, digest]
+        transform = (transforms or {}).get(posixpath.splitext(relative)[1].lower())
+        if transform is not None:
+            digest = hashlib.sha256(f"{digest}\0{transform.__name__}".encode("utf-8")).hexdigest()
+        assets[relative] = (fingerprinted_name(relative, digest), source_path)
+
+    if cache_path is not None:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(hashes, cache_file)
+        os.replace(tmp_path, cache_path)
+    return AssetManifest(assets)
+
+
+def write_headers(path, text):
+    """
+    Writes the headers file atomically, leaving it untouched when its
+    content is the same. Returns True when it was written.
+    """
+    if os.path.exists(path):
+        with open(path, "r") as headers_file:
+            if headers_file.read() == text:
+                return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as headers_file:
+            headers_file.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
@@ -0,0 +1,125 @@
+import re
+
+from buildlog import warn
+from blocktype import BlockType
+from inlinetokenizer import tokenize_inline
+from textnode import TextType
+
+_OPENING = re.compile(r"---[ \t]*\n")
+_CLOSING = re.compile(r"\n(?:---|\.\.\.)[ \t]*(?:\n|$)")
+_FIELD = re.compile(r"([A-Za-z_][\w-]*)[ \t]*:(?:[ \t]+(.*?))?[ \t]*$")
+_ITEM = re.compile(r"[ \t]+-[ \t]+(.*?)[ \t]*$")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?")
+SUMMARY_LENGTH = 280
+
+
+def _scalar(text):
+    """
+    Returns a front matter value without its quotes; [a, b] is a list.
+    """
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text.startswith("[") and text.endswith("]"):
+        return [_scalar(item.strip()) for item in text[1:-1].split(",") if item.strip()]
+    return text
+
+
+def parse_front_matter(source):
+    """
+    Parses a YAML-style front matter block at the very start of a page:
+
+        ---
+        title: Why Tom Bombadil Was a Mistake
+        date: 2024-05-01
+        tags: [tolkien, characters]
+        ---
+
+    Values are strings, quoted or not; lists are written [a, b] or as
+    "  - item" lines under an empty key. Lines starting with "#" are
+    comments. Returns (fields, offset of the markdown after it); without a
+    closed front matter block, fields is empty and the offset 0.
+    """
+    opening = _OPENING.match(source)
+    if opening is None:
+        return {}, 0
+    closing = _CLOSING.search(source, opening.end() - 1)
+    if closing is None:
+        return {}, 0
+
+    fields = {}
+    key = None
+    for line in source[opening.end():closing.start()].split("\n"):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        item = _ITEM.match(line)
+        if item is not None and key is not None and isinstance(fields[key], list):
+            fields[key].append(_scalar(item.group(1)))
+            continue
+        field = _FIELD.match(line)
+        if field is None:
+            warn("front-matter", "Front matter line not understood: %s", line)
+            key = None
+            continue
+        key, value = field.groups()
+        fields[key] = _scalar(value) if value else []
+    return fields, closing.end()
+
+
+def plain_text(markdown, prose_only=False):
+    """
+    Returns inline markdown as plain text: "**Tom** is [here](/tom)" ->
+    "Tom is here". Image alt text is left out. Markup that does not parse
+    is kept as written. With prose_only, text made only of links and
+    images (such as a "Back home" link) gives "".
+    """
+    try:
+        nodes = tokenize_inline(markdown)
+    except Exception:
+        return " ".join(markdown.split())
+    if prose_only and all(node.text_type in (TextType.LINK, TextType.IMAGE) or not (node.text or "").strip()
+                          for node in nodes):
+        return ""
+    return " ".join("".join(node.text or "" for node in nodes if node.text_type != TextType.IMAGE).split())
+
+
+def _summary(text):
+    if len(text) <= SUMMARY_LENGTH:
+        return text
+    return text[:SUMMARY_LENGTH].rsplit(" ", 1)[0] + "\u2026"
+
+
+def page_metadata(source, page, default_title=""):
+    """
+    Returns the title, date, tags and summary of a page from its
+    blocklexer.LexedPage. Front matter fields win; the title falls back to
+    the first h1, then to default_title, and the summary to the start of
+    the first paragraph that is more than links and images. Dates must start with YYYY-MM-DD; tags may be a
+    list or a comma-separated string.
+    """
+    fields = page.fields
+    title = fields.get("title")
+    if not title or not isinstance(title, str):
+        title = default_title
+        if page.title_span is not None:
+            _, start, end = page.title_span
+            title = plain_text(source[start:end].strip()[1:]) or default_title
+
+    date = fields.get("date") or None
+    if date is not None and (not isinstance(date, str) or _DATE.match(date) is None):
+        warn("front-matter", "Ignoring date that is not YYYY-MM-DD: %s", date)
+        date = None
+
+    tags = fields.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    tags = [tag.strip() for tag in tags if isinstance(tag, str) and tag.strip()]
+
+    summary = fields.get("summary") or fields.get("description")
+    if not summary or not isinstance(summary, str):
+        summary = ""
+        for block_type, start, end in page.spans:
+            if block_type == BlockType.paragraph:
+                summary = _summary(plain_text(source[start:end], prose_only=True))
+                if summary:
+                    break
+    return {"title": title, "date": date, "tags": tags, "summary": summary}
@@ -1,17 +1,93 @@
+import sys
+from types import MappingProxyType
+from buildlog import warn
+import minify
+
+# Chunks are joined and flushed to the output file once this many
+# characters have been buffered
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def write_chunks(fp, chunks, buffer_size=WRITE_BUFFER_SIZE):
+    """
+    Writes an iterable of strings to fp in buffered batches.
+    """
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= buffer_size:
+            fp.write("".join(buffer))
+            buffer = []
+            buffered = 0
+    if buffer:
+        fp.write("".join(buffer))
+
+
+VOID_TAGS = frozenset(["img", "input", "br", "hr"])
+
+# Identical props mappings (the same link or image used again and again)
+# share one read-only mapping instead of a dict per node
+MAX_SHARED_PROPS = 65536
+_shared_props = {}
+
+
+def share_props(props):
+    """
+    Returns a read-only view of props, reusing an existing one when an
+    identical mapping has been seen before.
+    """
+    if props is None or type(props) is MappingProxyType:
+        return props
+    try:
+        key = tuple(props.items())
+        shared = _shared_props.get(key)
+    except TypeError:
+        # Unhashable values cannot be shared, but are still made read-only
+        return MappingProxyType(dict(props))
+    if shared is None:
+        shared = MappingProxyType(dict(props))
+        if len(_shared_props) < MAX_SHARED_PROPS:
+            _shared_props[key] = shared
+    return shared
+
+
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        self.tag = sys.intern(tag) if type(tag) is str else tag
         self.value = value
         self.children = children
-        self.props = props
+        self.props = share_props(props)
 
     def to_html(self):
         raise NotImplementedError
+
+    def iter_html(self):
+        """
+        Yields the node's HTML in chunks. Subclasses that only implement
+        to_html() are emitted as a single chunk.
+        """
+        yield self.to_html()
+
+    def write_to(self, fp, buffer_size=WRITE_BUFFER_SIZE):
+        """
+        Streams the node's HTML to a file object without building the
+        whole document in memory first.
+        """
+        write_chunks(fp, self.iter_html(), buffer_size)
     
     def props_to_html(self):
         if not self.props:
             return ""
         return " " + " ".join(f'{key}="{value}"' for key, value in self.props.items())
+
+    def minified_props_to_html(self):
+        if not self.props:
+            return ""
+        return " " + " ".join(minify.attribute(key, value) for key, value in self.props.items())
     
     def __repr__(self):
         return (f"tag = {self.tag}\n"
@@ -21,10 +97,14 @@ class HTMLNode():
       
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
         if value is None or value.strip() == "":
-            print(f"Warning: Creating a LeafNode with an empty or None value. Tag: {tag}, Props: {props}")
+            # Void tags like <img> are empty by design
+            if tag is not None and tag not in VOID_TAGS:
+                warn("empty-leaf", "Creating a LeafNode with an empty or None value. Tag: %s, Props: %s", tag, props)
             self.value = ""  # Default to an empty string instead of raising an exception
 
     def to_html(self):
@@ -32,7 +112,7 @@ class LeafNode(HTMLNode):
             return self.value or ""
         
         if self.value is None or self.value == "":
-            if self.tag in ["img", "input", "br", "hr"]:
+            if self.tag in VOID_TAGS:
                 props_html = self.props_to_html()
                 return f"<{self.tag}{props_html}>"
             else:
@@ -42,32 +122,120 @@ class LeafNode(HTMLNode):
         return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
     
     
+class RawHTMLNode(HTMLNode):
+    """
+    HTML that was serialized earlier, such as a memoized block, and is
+    emitted exactly as given.
+    """
+    __slots__ = ()
+
+    def __init__(self, html):
+        super().__init__(None, html)
+
+    def to_html(self):
+        return self.value
+
+
+# Marks where a pre/code element ends on the serializer's stack
+_LEAVE_RAW = object()
+
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
         if not children:
-            print(f"Warning: Creating a ParentNode with no children. Tag: {tag}, Props: {props}")
+            warn("empty-parent", "Creating a ParentNode with no children. Tag: %s, Props: %s", tag, props)
             self.children = [LeafNode(None, "")]  # Default to an empty child
     
     def to_html(self):
-        if not self.tag:
-            raise ValueError("ParentNode requires a tag")
-        if not self.children:
-            # If there are no children, return a self-closing tag or an empty tag
-            return f"<{self.tag}></{self.tag}>"
-
-        node_to_html = f"<{self.tag}"
-        if self.props:
-            node_to_html += self.props_to_html()
-        node_to_html += ">"
-
-        for child in self.children:
-            # Check if the child is a TextNode from the textnode module
-            if hasattr(child, 'text_type') and hasattr(child, 'text'):
-                # It's a TextNode, just add its text directly
-                node_to_html += child.to_html()
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        """
+        Serializes the tree with an explicit stack instead of recursion, so
+        deep trees cannot hit the recursion limit and wide nodes are not
+        built up by repeated string concatenation. While minify is enabled,
+        the minified form is produced in the same walk.
+        """
+        if minify.enabled():
+            return self._iter_minified()
+        return self._iter_html()
+
+    def _iter_html(self):
+        # The stack holds nodes still to be visited and closing tags (str)
+        # waiting to be emitted once a node's children are done
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if type(node) is str:
+                yield node
+            elif node is self or _serializes_inline(node):
+                if not node.tag:
+                    raise ValueError("ParentNode requires a tag")
+                if not node.children:
+                    # If there are no children, return an empty tag
+                    yield f"<{node.tag}></{node.tag}>"
+                    continue
+                yield f"<{node.tag}{node.props_to_html()}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            elif isinstance(node, HTMLNode):
+                yield from node.iter_html()
             else:
-                # It's an HTMLNode, call its to_html method
-                node_to_html += child.to_html()
+                # A TextNode or similar child that renders its own text
+                yield node.to_html()
+
+    def _iter_minified(self):
+        """
+        Like _iter_html, but with unquoted attribute values where possible
+        and whitespace runs in text collapsed, except inside pre, code and
+        the other elements whose text is kept as written.
+        """
+        stack = [self]
+        raw = 0
+        while stack:
+            node = stack.pop()
+            node_type = type(node)
+            if node_type is str:
+                yield node
+            elif node is _LEAVE_RAW:
+                raw -= 1
+            elif node_type is LeafNode:
+                value = node.value if raw or node.tag in minify.RAW_TAGS else minify.collapse_whitespace(node.value)
+                if node.tag is None:
+                    yield value
+                elif node.value:
+                    yield f"<{node.tag}{node.minified_props_to_html()}>{value}</{node.tag}>"
+                elif node.tag in VOID_TAGS:
+                    yield f"<{node.tag}{node.minified_props_to_html()}>"
+                else:
+                    raise ValueError("LeafNode value cannot be empty or None")
+            elif node is self or _serializes_inline(node):
+                if not node.tag:
+                    raise ValueError("ParentNode requires a tag")
+                if not node.children:
+                    yield f"<{node.tag}></{node.tag}>"
+                    continue
+                yield f"<{node.tag}{node.minified_props_to_html()}>"
+                if node.tag in minify.RAW_TAGS:
+                    raw += 1
+                    stack.append(_LEAVE_RAW)
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            elif isinstance(node, HTMLNode):
+                yield from node.iter_html()
+            else:
+                yield node.to_html()
+
 
-        return node_to_html + f"</{self.tag}>"
\ No newline at end of file
+def _serializes_inline(node):
+    # Subclasses that customise their own output are asked for it instead
+    # of being walked here
+    node_type = type(node)
+    return node_type is ParentNode or (
+        isinstance(node, ParentNode)
+        and node_type.iter_html is ParentNode.iter_html
+        and node_type.to_html is ParentNode.to_html
+    )
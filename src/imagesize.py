@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import struct
+
+from assetsync import scan_tree
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+DEFAULT_EAGER_IMAGES = 2
+# JPEG start-of-frame markers; C4, C8 and CC are other segments
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# JPEG markers that carry no length field
+_JPEG_STANDALONE = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+_active = None
+
+
+def enable(sizer):
+    global _active
+    _active = sizer
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    return _active
+
+
+def _jpeg_size(image_file):
+    """
+    Walks the JPEG segment headers, seeking over segment bodies, until the
+    start-of-frame segment that holds the dimensions.
+    """
+    image_file.seek(2)
+    while True:
+        byte = image_file.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = image_file.read(1)
+        while marker == b"\xff":
+            marker = image_file.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in _JPEG_STANDALONE:
+            continue
+        header = image_file.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack(">H", header)[0]
+        if marker in _JPEG_SOF:
+            frame = image_file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        image_file.seek(length - 2, os.SEEK_CUR)
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        bits = struct.unpack("<I", head[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def read_image_size(path):
+    """
+    Returns (width, height) of a PNG, GIF, WebP or JPEG file from its header
+    alone, or None when the format is not recognised. Nothing is decoded;
+    only JPEG needs more than the first 30 bytes, and it seeks past
+    segment bodies instead of reading them.
+    """
+    with open(path, "rb") as image_file:
+        head = image_file.read(30)
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) == 30:
+            return _webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            return _jpeg_size(image_file)
+    return None
+
+
+class ImageSizer():
+    """
+    Knows the dimensions of every image under content_dir and static_dir
+    and picks the extra attributes for <img> tags:
+
+      - width and height for every local image it knows, so the browser can
+        reserve the space before the image arrives
+      - loading="lazy" and decoding="async" for every image after the first
+        eager_images on a page
+
+    Sizes are read once per build and kept in cache_path by file size and
+    mtime, so unchanged images are not opened again. key changes whenever
+    any dimension or eager_images changes, for cache keys of anything
+    rendered with it.
+    """
+
+    def __init__(self, content_dir="content", static_dir="static", cache_path=None,
+                 eager_images=DEFAULT_EAGER_IMAGES):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.eager_images = eager_images
+        self.sizes = {}
+        self.read = 0
+
+        cached = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, "r") as cache_file:
+                cached = json.load(cache_file)
+        entries = {}
+        for directory in (content_dir, static_dir):
+            if not os.path.isdir(directory):
+                continue
+            for relative, stat in scan_tree(directory).items():
+                if not relative.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(directory, relative)
+                recorded = cached.get(path)
+                if recorded is not None and recorded[:2] == [stat.st_size, stat.st_mtime_ns]:
+                    size = recorded[2]
+                else:
+                    try:
+                        size = read_image_size(path)
+                    except (OSError, struct.error):
+                        size = None
+                    self.read += 1
+                entries[path] = [stat.st_size, stat.st_mtime_ns, list(size) if size else None]
+                if size:
+                    self.sizes[path] = tuple(size)
+
+        digest = hashlib.sha256(f"{eager_images}\0".encode("utf-8"))
+        for path, (width, height) in sorted(self.sizes.items()):
+            digest.update(f"{path}\0{width}\0{height}\0".encode("utf-8"))
+        self.key = digest.hexdigest()
+
+        if cache_path is not None:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "w") as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(tmp_path, cache_path)
+
+    def size_for_url(self, url):
+        """
+        Returns (width, height) for a root-relative image URL; content/ wins
+        over static/, like the asset sync.
+        """
+        path = url.split("?", 1)[0].split("#", 1)[0].lstrip("/")
+        for directory in (self.content_dir, self.static_dir):
+            size = self.sizes.get(os.path.join(directory, path))
+            if size is not None:
+                return size
+        return None
+
+    def attributes(self, url, index):
+        """
+        Returns the extra props for the index-th image on a page (counting
+        from 0); url is its root-relative URL, or None for external images.
+        """
+        props = {}
+        size = self.size_for_url(url) if url is not None else None
+        if size is not None:
+            props["width"] = str(size[0])
+            props["height"] = str(size[1])
+        if index >= self.eager_images:
+            props["loading"] = "lazy"
+            props["decoding"] = "async"
+        return props
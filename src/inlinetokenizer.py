@@ -0,0 +1,71 @@
+import re
+from textnode import TextNode, TextType
+from extractmarkdown import IMAGE_PATTERN, LINK_PATTERN
+
+# Characters that can start inline markup. Everything between them is plain
+# text and is skipped by a single regex search.
+SPECIAL_CHARS = re.compile(r"[*_`!\[]")
+
+DELIMITER_TYPES = {
+    "**": TextType.BOLD,
+    "*": TextType.ITALIC,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+
+def tokenize_inline(text):
+    """
+    Splits inline markdown into TextNodes in one left-to-right pass.
+
+    Produces the same nodes as running split_nodes_delimiter for "**", "*",
+    "_" and "`" followed by split_nodes_image and split_nodes_link, but
+    without copying the remaining text or recursing for every match.
+    Text inside a delimited span or a link is kept literally.
+
+    Raises:
+        Exception: If a delimiter is opened but never closed
+    """
+    match = SPECIAL_CHARS.search(text)
+    if match is None:
+        # Fast path: plain text
+        return [TextNode(text, TextType.TEXT)]
+
+    nodes = []
+    start = 0  # Start of the pending plain text run
+    while match is not None:
+        index = match.start()
+        char = text[index]
+
+        if char == "!" or char == "[":
+            pattern = IMAGE_PATTERN if char == "!" else LINK_PATTERN
+            link = pattern.match(text, index)
+            if link is None:
+                match = SPECIAL_CHARS.search(text, index + 1)
+                continue
+            if index > start:
+                nodes.append(TextNode(text[start:index], TextType.TEXT))
+            text_type = TextType.IMAGE if char == "!" else TextType.LINK
+            nodes.append(TextNode(link.group(1), text_type, link.group(2)))
+            start = link.end()
+            match = SPECIAL_CHARS.search(text, start)
+            continue
+
+        if char == "*" and text.startswith("**", index):
+            delimiter = "**"
+        else:
+            delimiter = char
+        opening_end = index + len(delimiter)
+        closing_index = text.find(delimiter, opening_end)
+        if closing_index == -1:
+            raise Exception(f"No closing delimiter '{delimiter}' found")
+
+        if index > start:
+            nodes.append(TextNode(text[start:index], TextType.TEXT))
+        nodes.append(TextNode(text[opening_end:closing_index], DELIMITER_TYPES[delimiter]))
+        start = closing_index + len(delimiter)
+        match = SPECIAL_CHARS.search(text, start)
+
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+    return nodes
@@ -0,0 +1,222 @@
+import json
+import os
+import traceback
+from html import escape
+
+from buildlog import log
+from htmlnode import write_chunks
+from rendercache import GENERATOR_VERSION, hash_text
+from template import get_loader
+from urlrewrite import page_url_for
+import fingerprint
+import profiler
+
+PAGE_SIZE = 10
+ARCHIVE_PAGE_SIZE = 50
+
+
+def _page_path(root, number):
+    """
+    Returns the output path of page number of a listing at root:
+    "blog/index.html", "blog/page/2/index.html", ...
+    """
+    if number == 1:
+        return f"{root}/index.html"
+    return f"{root}/page/{number}/index.html"
+
+
+def _paginate(entries, page_size):
+    pages = [entries[start:start + page_size] for start in range(0, len(entries), page_size)]
+    return pages or [[]]
+
+
+class ListingGenerator():
+    """
+    Generates the paginated index and archive of a section from a
+    pageindex.PageIndex, so neither needs any page's markdown:
+
+      - <section>/index.html, <section>/page/2/index.html, ...: the newest
+        pages first, PAGE_SIZE per page, with their summaries, from
+        listing.html
+      - <section>/archive/index.html, ...: every page grouped by year, from
+        archive.html
+
+    Both templates live next to the page template, and their output is
+    wrapped in the layout the section's own pages use. A listing whose
+    template is missing is not generated.
+
+    Each listing page is keyed by the entries and links it shows, the
+    templates and the base path. Only pages whose key differs from the one
+    recorded in state_path at the last build, or whose output is missing,
+    are rendered again; editing one post rewrites the listing pages that
+    show it and leaves the rest alone.
+    """
+
+    def __init__(self, template_path, destination, base_path, state_path=None, section="blog",
+                 page_size=PAGE_SIZE, archive_page_size=ARCHIVE_PAGE_SIZE):
+        root = os.path.dirname(template_path)
+        self.template_path = template_path
+        self.listing_path = os.path.join(root, "listing.html")
+        self.archive_path = os.path.join(root, "archive.html")
+        self.destination = destination
+        self.base_path = base_path
+        self.state_path = state_path
+        self.section = section
+        self.page_size = page_size
+        self.archive_page_size = archive_page_size
+        self.keys = {}
+        if state_path is not None and os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+            if state.get("destination") == os.path.abspath(destination):
+                self.keys = state["keys"]
+        self.written = []
+        self.unchanged = []
+        self.pages = []
+
+    def _url(self, url):
+        return escape(self.base_path + url[1:])
+
+    def _item(self, entry):
+        return {"url": self._url(entry["url"]), "title": escape(entry["title"]),
+                "dates": [escape(entry["date"][:10])] if entry.get("date") else [],
+                "summary": escape(entry.get("summary") or ""),
+                "tags": [escape(tag) for tag in entry.get("tags", [])]}
+
+    def _links(self, root, number, count):
+        newer = [self._url("/" + _page_path(root, number - 1)[:-len("index.html")])] if number > 1 else []
+        older = [self._url("/" + _page_path(root, number + 1)[:-len("index.html")])] if number < count else []
+        return {"Newer": newer, "Older": older, "PageNumber": str(number), "PageCount": str(count)}
+
+    def plan(self, page_index):
+        """
+        Returns (relative output path, listing template path, title,
+        context) for every listing page of the section. A section without
+        pages has none.
+        """
+        section_url = f"/{self.section}/"
+        entries = page_index.newest_first(section_url)
+        if not entries:
+            return []
+        title = self.section.capitalize()
+        for entry in page_index.entries(section_url):
+            if entry["url"] == section_url:
+                title = entry["title"] or title
+        archive_root = f"{self.section}/archive"
+        common = {"Index": self._url(section_url), "Archive": self._url(f"/{archive_root}/")}
+
+        listings = []
+        if os.path.isfile(self.listing_path):
+            pages = _paginate(entries, self.page_size)
+            for number, chunk in enumerate(pages, 1):
+                page_title = title if number == 1 else f"{title}, page {number}"
+                context = dict(common, Title=escape(page_title), Pages=[self._item(entry) for entry in chunk],
+                               **self._links(self.section, number, len(pages)))
+                listings.append((_page_path(self.section, number), self.listing_path, page_title, context))
+        if os.path.isfile(self.archive_path):
+            pages = _paginate(entries, self.archive_page_size)
+            for number, chunk in enumerate(pages, 1):
+                years = []
+                for entry in chunk:
+                    year = entry["date"][:4] if entry.get("date") else "Undated"
+                    if not years or years[-1]["year"] != year:
+                        years.append({"year": year, "pages": []})
+                    years[-1]["pages"].append(self._item(entry))
+                page_title = f"{title} archive" if number == 1 else f"{title} archive, page {number}"
+                context = dict(common, Title=escape(page_title), Years=years,
+                               **self._links(archive_root, number, len(pages)))
+                listings.append((_page_path(archive_root, number), self.archive_path, page_title, context))
+        return listings
+
+    def generate(self, page_index, writer=None, reserved=()):
+        """
+        Writes the listing pages whose key changed, through writer when
+        given (see outputwriter.OutputWriter). Listing pages that would
+        replace a page in reserved, the outputs of the markdown pages, are
+        left out. Returns (every listing output path, written or not,
+        failures as (path, error) pairs). The listing pages are then also
+        available as PageIndex-style entries from entries().
+        """
+        reserved = {os.path.normpath(path) for path in reserved}
+        assets = fingerprint.active()
+        page_template = get_loader(self.template_path).get(self.base_path, self.section, assets)
+        outputs = []
+        failures = []
+        keys = {}
+        self.pages = []
+        for relative, listing_path, title, context in self.plan(page_index):
+            output_path = os.path.join(self.destination, relative)
+            if os.path.normpath(output_path) in reserved:
+                log.info("Not generating %s over a page written from markdown", relative)
+                continue
+            outputs.append(output_path)
+            self.pages.append({"url": page_url_for(relative), "output": relative, "title": title})
+            try:
+                template = get_loader(listing_path).get(self.base_path, "", assets)
+                key = hash_text(json.dumps([GENERATOR_VERSION, template.key, page_template.key, self.base_path,
+                                            context], sort_keys=True))
+                missing = writer.missing_outputs(output_path) if writer is not None else (
+                    [] if os.path.exists(output_path) else [output_path])
+                if self.keys.get(relative) == key and not missing:
+                    keys[relative] = key
+                    self.unchanged.append(relative)
+                    continue
+                with profiler.stage("template_fill"):
+                    chunks = self._render(page_template, template, context)
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    if writer is not None:
+                        writer.write(output_path, chunks)
+                    else:
+                        with open(output_path, "w") as output_file:
+                            write_chunks(output_file, chunks)
+            except Exception:
+                failures.append((relative, traceback.format_exc()))
+                continue
+            keys[relative] = key
+            self.written.append(relative)
+            log.info("Generated listing %s", relative)
+        self.keys = keys
+        return outputs, failures
+
+    def _render(self, page_template, template, context):
+        return page_template.iter_render({"Content": template.render(context), "Title": context["Title"]})
+
+    def render(self, page_index, reserved=()):
+        """
+        Renders every listing page in memory, without writing it or
+        comparing keys, for the development server. Listing pages whose
+        relative output path is in reserved are left out. Returns
+        ({relative output path: html}, failures as (path, error) pairs).
+        """
+        assets = fingerprint.active()
+        page_template = get_loader(self.template_path).get(self.base_path, self.section, assets)
+        pages = {}
+        failures = []
+        for relative, listing_path, title, context in self.plan(page_index):
+            if relative in reserved:
+                continue
+            try:
+                template = get_loader(listing_path).get(self.base_path, "", assets)
+                pages[relative] = "".join(self._render(page_template, template, context))
+            except Exception:
+                failures.append((relative, traceback.format_exc()))
+        return pages, failures
+
+    def entries(self):
+        """
+        Returns the url, output and title of the listing pages of the last
+        generate(), for the sitemap.
+        """
+        return list(self.pages)
+
+    def save(self):
+        if self.state_path is None:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump({"destination": os.path.abspath(self.destination), "keys": self.keys}, state_file)
+        os.replace(tmp_path, self.state_path)
+
+    def summary(self):
+        return f"{len(self.written)} rendered, {len(self.unchanged)} unchanged"
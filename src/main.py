@@ -1,30 +1,338 @@
+import argparse
 import os
+import re
 import shutil
 import sys
-from utils import copy_directory_recursive, generate_pages_recursive
+import blockmemo
+import buildlog
+import fingerprint
+import imagesize
+import minify
+import profiler
+import searchindex
+from rendercache import RenderCache, DEFAULT_MAX_BYTES
+from assetsync import sync_tree
+from depgraph import DependencyGraph
+from precompress import precompress_tree, DEFAULT_MIN_SIZE
+from listings import ListingGenerator
+from pageindex import PageIndex
+from pipeline import DEFAULT_READ_AHEAD, DEFAULT_WRITE_BEHIND, DEFAULT_WRITERS, Pipeline
+from sitemap import SitemapWriter
+from outputwriter import BASE_PATH_PLACEHOLDER, MultiTargetWriter, OutputWriter, write_changes
+from utils import generate_pages_recursive
+
+
+def parse_target(value):
+    """
+    Parses a --target value, "BASE:OUTDIR".
+    """
+    base_path, separator, output_dir = value.partition(":")
+    if not separator or not base_path.startswith("/") or not output_dir:
+        raise argparse.ArgumentTypeError(f"expected BASE:OUTDIR, such as /blog/:build/blog, got '{value}'")
+    return (base_path if base_path.endswith("/") else base_path + "/"), output_dir
+
+
+def target_slug(output_dir):
+    return re.sub(r"[^A-Za-z0-9]+", "-", os.path.normpath(output_dir)).strip("-")
+
+
+def target_cache_path(name, output_dir, default_output_dir="docs"):
+    """
+    Returns where a per-output manifest lives: .cache/<name>.json for the
+    default output directory, .cache/<name>.<slug>.json for others.
+    """
+    if os.path.normpath(output_dir) == default_output_dir:
+        return os.path.join(".cache", f"{name}.json")
+    return os.path.join(".cache", f"{name}.{target_slug(output_dir)}.json")
+
+
+def write_sitemaps_and_feeds(sitemap_writer, page_index, listings, modified_ns):
+    """
+    Writes the sitemap, which lists the generated blog index and archive
+    pages as well as the markdown pages, and the feeds, which only list
+    the markdown pages.
+    """
+    entries = page_index.entries()
+    sitemap_entries = entries
+    if listings is not None:
+        sitemap_entries = sorted(entries + listings.entries(), key=lambda entry: entry["url"])
+    sitemap_writer.write_sitemaps(sitemap_entries, modified_ns)
+    sitemap_writer.write_feeds(entries, modified_ns)
+    sitemap_writer.finish()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site.",
+                                     epilog="Run 'main.py serve --help' for the development server.")
+    parser.add_argument("base_path", nargs="?", default="/",
+                        help="URL prefix the site is served from (default: /)")
+    parser.add_argument("--target", action="append", type=parse_target, metavar="BASE:OUTDIR",
+                        help="build for this base path into this directory; repeat to build several targets "
+                             "from one render (replaces base_path and docs/)")
+    parser.add_argument("--cache-dir", default=os.path.join(".cache", "render"),
+                        help="directory for the persistent render cache")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="size cap for the render cache in megabytes")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="render every page from scratch, ignoring the dependency graph")
+    parser.add_argument("--explain", action="store_true",
+                        help="print why each page is rebuilt")
+    parser.add_argument("--block-memo-size", type=int, default=blockmemo.DEFAULT_MAX_ENTRIES,
+                        help="rendered blocks kept in memory for reuse (0 disables)")
+    parser.add_argument("--block-store", action="store_true",
+                        help="also keep rendered blocks in the render cache between builds")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes used to render pages")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="read upcoming pages and write finished ones on background threads while rendering "
+                             "(without -j), and report how busy each stage was")
+    parser.add_argument("--read-ahead", type=int, default=DEFAULT_READ_AHEAD,
+                        help="pages --pipeline reads ahead of the renderer (default: %(default)s)")
+    parser.add_argument("--write-behind", type=int, default=DEFAULT_WRITE_BEHIND,
+                        help="rendered pages --pipeline holds waiting to be written (default: %(default)s)")
+    parser.add_argument("--writer-threads", type=int, default=DEFAULT_WRITERS,
+                        help="threads --pipeline writes pages on (default: %(default)s)")
+    parser.add_argument("--clean", action="store_true",
+                        help="delete the output directory before building")
+    parser.add_argument("--changes-file", default=os.path.join(".cache", "changes.json"),
+                        help="where to write the added, changed and removed URLs of this build "
+                             "(with several targets, one file per target next to it)")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write .gz files next to HTML, CSS, JS, SVG and JSON outputs")
+    parser.add_argument("--precompress-min-size", type=int, default=DEFAULT_MIN_SIZE,
+                        help="smallest file in bytes that --precompress compresses")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="copy assets as name.<hash>.ext, point every reference at them "
+                             "and write a _headers file marking them immutable")
+    parser.add_argument("--minify", action="store_true",
+                        help="write pages without optional whitespace, quotes and comments, and minify CSS")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="scheme and host the site is served from, such as https://example.com; "
+                             "writes sitemap.xml and RSS and Atom feeds for blog/")
+    parser.add_argument("--search", action="store_true",
+                        help="write a sharded search index under search/ and give headings anchors")
+    parser.add_argument("--no-listings", action="store_true",
+                        help="do not generate the paginated blog index and archive from page metadata")
+    parser.add_argument("--no-image-sizes", action="store_true",
+                        help="do not add width, height and lazy loading to images")
+    parser.add_argument("--eager-images", type=int, default=imagesize.DEFAULT_EAGER_IMAGES,
+                        help="images per page loaded eagerly before the rest are lazy (default: %(default)s)")
+    parser.add_argument("--hardlink-assets", action="store_true",
+                        help="hardlink static files into the output instead of copying them")
+    parser.add_argument("--verify-assets", action="store_true",
+                        help="also compare content hashes when syncing static files")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log every page, block and warning as it happens")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every build stage and write a Chrome trace")
+    parser.add_argument("--profile-dir", default=os.path.join(".cache", "profile"),
+                        help="where --profile and --cprofile write their output")
+    parser.add_argument("--profile-top", type=int, default=10,
+                        help="number of slowest pages listed by --profile")
+    parser.add_argument("--cprofile", metavar="GLOB",
+                        help="run cProfile on pages whose markdown path matches GLOB")
+    args = parser.parse_args(argv)
+    if args.pipeline and args.jobs > 1:
+        parser.error("--pipeline renders in a single process; use it without -j")
+    return args
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["serve"]:
+        from devserver import serve
+        return serve(argv[1:])
 
-def main():
     # Define paths
     source_dir = "static"
     destination_dir = "docs"  # Change to "docs" for GitHub Pages
     content_dir = "content"
     template_path = "template.html"
 
-    # Get the base path from the command-line argument or default to "/"
-    base_path = sys.argv[1] if len(sys.argv) > 1 else "/"
+    # Get the base path from the command-line argument or default to "/";
+    # --target replaces both with one or more base path and output pairs
+    args = parse_args(argv)
+    base_path = args.base_path
+    targets = args.target or [(base_path, destination_dir)]
+    buildlog.configure(args.verbose)
+
+    cache = None
+    graph = None
+    if not args.no_cache:
+        cache = RenderCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+        graph = DependencyGraph(os.path.join(".cache", "depgraph.json"), content_dir, source_dir,
+                                {"base_path": base_path if not args.target else [f"{base}:{out}" for base, out in targets],
+                                 "template": template_path,
+                                 "fingerprint": args.fingerprint,
+                                 "image_sizes": None if args.no_image_sizes else args.eager_images,
+                                 "minify": args.minify,
+                                 "search": args.search})
+    memo = None
+    if not args.no_cache and args.block_memo_size > 0:
+        memo = blockmemo.BlockMemo(args.block_memo_size, cache if args.block_store else None)
+        blockmemo.enable(memo)
+
+    build_profiler = None
+    if args.profile or args.cprofile:
+        build_profiler = profiler.Profiler(args.cprofile, args.profile_dir)
+        profiler.enable(build_profiler)
+
+    with profiler.stage("build"):
+        # Step 1: Clear the docs directory, only when asked to
+        for _, output_dir in targets:
+            if args.clean and os.path.exists(output_dir):
+                print(f"Clearing the docs directory: {output_dir}")
+                shutil.rmtree(output_dir)
+
+        # Step 2: Sync static files, and non-markdown files under content/,
+        # to the docs directory
+        sources = [(source_dir, None), (content_dir, lambda path: path.endswith(".md"))]
+        transforms = None
+        if args.minify:
+            minify.enable()
+            transforms = {".css": minify.minify_css}
+        assets = None
+        if args.fingerprint:
+            assets = fingerprint.build_manifest(sources, os.path.join(".cache", "fingerprints.json"), transforms)
+            fingerprint.enable(assets)
+        sync_results = []
+        for target_base_path, output_dir in targets:
+            print(f"Syncing static files from {source_dir} and {content_dir} to {output_dir}")
+            with profiler.stage("copy_static"):
+                sync_result = sync_tree(sources, output_dir, target_cache_path("sync", output_dir),
+                                        hardlink=args.hardlink_assets, verify_hash=args.verify_assets,
+                                        rename=assets.rename if assets is not None else None, transforms=transforms)
+            print(f"Static files: {sync_result.summary()}")
+            sync_results.append(sync_result)
+            if assets is not None:
+                headers_path = os.path.join(output_dir, "_headers")
+                if fingerprint.write_headers(headers_path, assets.headers(target_base_path)):
+                    print(f"Wrote cache headers for {len(assets.assets)} fingerprinted assets to {headers_path}")
+
+        # Step 3: Generate HTML pages recursively with the base path. With
+        # several targets every page is rendered once and written to each
+        if not args.no_image_sizes:
+            with profiler.stage("image_sizes"):
+                sizer = imagesize.ImageSizer(content_dir, source_dir, os.path.join(".cache", "imagesizes.json"),
+                                             args.eager_images)
+            imagesize.enable(sizer)
+            buildlog.log.info("Read the size of %d image(s)", sizer.read)
+        writers = [OutputWriter(output_dir, target_cache_path("outputs", output_dir)) for _, output_dir in targets]
+        primary_dir = targets[0][1]
+        if len(targets) == 1:
+            render_base_path = targets[0][0]
+            writer = writers[0]
+            print(f"Generating HTML pages from {content_dir} with base path: {render_base_path}")
+        else:
+            render_base_path = BASE_PATH_PLACEHOLDER
+            writer = MultiTargetWriter([(target[0], target_writer) for target, target_writer in zip(targets, writers)],
+                                       primary_dir)
+            print(f"Generating HTML pages from {content_dir} for {len(targets)} targets: "
+                  + ", ".join(f"{target_base_path} -> {output_dir}" for target_base_path, output_dir in targets))
+        search = None
+        if args.search:
+            searchindex.enable()
+            search = searchindex.SearchIndex(primary_dir, os.path.join(".cache", "search.json"))
+        page_index = PageIndex(primary_dir, os.path.join(".cache", "pages.json"))
+        listings = None
+        if not args.no_listings:
+            listings = ListingGenerator(template_path, primary_dir, render_base_path,
+                                        None if args.no_cache else os.path.join(".cache", "listings.json"))
+        pipeline = None
+        if args.pipeline:
+            pipeline = Pipeline(args.read_ahead, args.write_behind, writers=args.writer_threads)
+        failures = generate_pages_recursive(content_dir, template_path, primary_dir, render_base_path, cache,
+                                            args.jobs, graph, args.explain, writer, search, page_index, listings,
+                                            pipeline)
+        if pipeline is not None:
+            print("Pipeline stages:")
+            for line in pipeline.report():
+                print(f"  {line}")
+        if graph is not None:
+            graph.save()
+        page_index.save()
+        if listings is not None:
+            listings.save()
+            print(f"Listing pages: {listings.summary()}")
+
+        for (target_base_path, output_dir), target_writer, sync_result in zip(targets, writers, sync_results):
+            prefix = f"{output_dir}: " if len(targets) > 1 else ""
+            print(f"{prefix}Pages written: {target_writer.summary()}")
+            added = target_writer.paths_with_status("added") + sync_result.added
+            changed = (target_writer.paths_with_status("changed")
+                       + sorted(set(sync_result.copied) - set(sync_result.added)))
+            removed = target_writer.removed + sync_result.removed
+
+            # Step 4: Write the search index shards that changed, only when asked to
+            if search is not None:
+                with profiler.stage("search_index"):
+                    search_result = search.write(output_dir)
+                print(f"{prefix}Search index files: {search_result.summary()}")
+                added += search_result.added
+                changed += search_result.changed
+                removed += search_result.removed
+
+            # Step 5: Write the sitemap and feeds whose pages changed, when the
+            # site's address is known
+            if args.site_url:
+                with profiler.stage("sitemap"):
+                    sitemap_writer = SitemapWriter(output_dir, target_base_path, args.site_url,
+                                                   target_cache_path("sitemap", output_dir))
+                    write_sitemaps_and_feeds(sitemap_writer, page_index, listings, target_writer.modified_ns)
+                print(f"{prefix}Sitemap and feeds: {sitemap_writer.summary()}")
+                added += sitemap_writer.added
+                changed += sitemap_writer.changed
+                removed += sitemap_writer.removed
+
+            # Step 6: Record which URLs changed, for purging CDN caches
+            changes_file = args.changes_file
+            if len(targets) > 1:
+                root, extension = os.path.splitext(args.changes_file)
+                changes_file = f"{root}.{target_slug(output_dir)}{extension}"
+            changes = write_changes(changes_file, target_base_path, added, changed, removed)
+            print(f"{prefix}Wrote {sum(len(urls) for urls in changes.values())} changed URL(s) to {changes_file}")
+
+            # Step 7: Precompress text outputs, only when asked to
+            if args.precompress:
+                with profiler.stage("precompress"):
+                    precompress_result = precompress_tree(output_dir, target_cache_path("precompress", output_dir),
+                                                          args.precompress_min_size)
+                print(f"{prefix}Precompressed files: {precompress_result.summary()}")
+        if search is not None:
+            search.save()
+
+    if cache is not None:
+        evicted = cache.prune()
+        print(cache.summary())
+        if evicted:
+            print(f"Evicted {evicted} render cache entries")
+    if memo is not None:
+        print(memo.summary())
 
-    # Step 1: Clear the docs directory
-    if os.path.exists(destination_dir):
-        print(f"Clearing the docs directory: {destination_dir}")
-        shutil.rmtree(destination_dir)
+    warning_lines = buildlog.warning_summary()
+    if warning_lines:
+        print("Warnings:")
+        for line in warning_lines:
+            print(line)
 
-    # Step 2: Copy static files to the docs directory
-    print(f"Copying static files from {source_dir} to {destination_dir}")
-    copy_directory_recursive(source_dir, destination_dir)
+    if build_profiler is not None:
+        profiler.disable()
+        if args.profile:
+            trace_path = os.path.join(args.profile_dir, "trace.json")
+            build_profiler.write_trace(trace_path)
+            for line in build_profiler.report(args.profile_top):
+                print(line)
+            print(f"Wrote Chrome trace to {trace_path}")
+        if args.cprofile:
+            print(f"Wrote cProfile stats for pages matching {args.cprofile} to {args.profile_dir}")
 
-    # Step 3: Generate HTML pages recursively with the base path
-    print(f"Generating HTML pages from {content_dir} with base path: {base_path}")
-    generate_pages_recursive(content_dir, template_path, destination_dir, base_path)
+    if failures:
+        print(f"{len(failures)} page(s) failed to render:")
+        for markdown_path, error in failures:
+            print(f"--- {markdown_path}")
+            print(error, end="")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
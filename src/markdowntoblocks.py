@@ -1,11 +1,63 @@
+import re
+
+from buildlog import log, verbose_enabled
+from blocklexer import FENCE
+
+_INDENT = re.compile(r"[ \t]*")
+_BLANK_LINE = re.compile(r"\n[ \t]*\n")
+_HEADING_LINE = re.compile(r"^([ \t]*#{1,6}[ \t][^\n]*)$", re.M)
+
+
+def _fence_lines(markdown):
+    """
+    Yields the (start, end) offsets of every line that starts with a fence,
+    found with str.find so the text between fences is never walked in Python.
+    """
+    pos = markdown.find(FENCE)
+    while pos != -1:
+        start = markdown.rfind("\n", 0, pos) + 1
+        end = markdown.find("\n", pos)
+        end = len(markdown) if end == -1 else end
+        if _INDENT.match(markdown, start, pos).end() == pos:
+            yield start, end
+        pos = markdown.find(FENCE, end)
+
+
+def _text_blocks(text, blocks):
+    for chunk in _BLANK_LINE.split(text):
+        # Headings are blocks of their own line even without blank lines
+        # around them; only chunks with a "#" can hold one
+        pieces = _HEADING_LINE.split(chunk) if "#" in chunk else (chunk,)
+        for piece in pieces:
+            piece = piece.strip()
+            if "\n" in piece:
+                block = "\n".join([line for line in map(str.strip, piece.split("\n")) if line])
+            else:
+                block = piece
+            if block:
+                blocks.append(block)
+
+
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    print(f"Generated blocks: {blocks}")
-    clean_blocks = [
-        "\n".join(line.strip() for line in block.split("\n") if line.strip())
-        for block in blocks if block.strip()
-    ]
-    print(f"Cleaned blocks: {clean_blocks}")
-    return clean_blocks
-            
-    
\ No newline at end of file
+    """
+    Returns the text of every block, the same blocks blocklexer.lex_blocks
+    finds, without classifying them or computing their offsets. Fence lines
+    pair up into code blocks, kept as written; the text between them splits
+    at blank lines and around heading lines, and each block is reduced to
+    its stripped, non-blank lines.
+    """
+    blocks = []
+    pos = 0
+    fences = _fence_lines(markdown)
+    for start, _ in fences:
+        closing = next(fences, None)
+        if closing is None:
+            # A fence that is never closed is ordinary text
+            break
+        _text_blocks(markdown[pos:start], blocks)
+        blocks.append(markdown[start:closing[1]])
+        pos = closing[1]
+    _text_blocks(markdown[pos:], blocks)
+    if verbose_enabled():
+        log.debug("Generated blocks: %s", blocks)
+    return blocks
@@ -1,12 +1,21 @@
-from markdowntoblocks import markdown_to_blocks
+from blocklexer import lex_page, block_lines, code_content
 from blocktype import block_to_block_type, BlockType
 from htmlnode import HTMLNode, LeafNode, ParentNode
 from textnode import TextNode, TextType
-from splitnodes import split_nodes_image, split_nodes_link
-from splitdelimiter import split_nodes_delimiter
+from inlinetokenizer import tokenize_inline
+from buildlog import log, verbose_enabled, warn
+from profiler import stage
+import blockmemo
 
 
-def text_node_to_html_node(text_node):
+def text_node_to_html_node(text_node, rewriter=None):
+    """
+    Converts a TextNode to an HTMLNode. When a UrlRewriter is given, link
+    and image URLs are rewritten here, on the node props, so the finished
+    HTML never needs a second pass. When the rewriter carries an
+    imagesize.ImageSizer, images also get their dimensions and, past the
+    first few on the page, lazy loading.
+    """
     if text_node.text_type == TextType.TEXT:
         return LeafNode(None, text_node.text or "")
     elif text_node.text_type == TextType.BOLD:
@@ -16,9 +25,18 @@ def text_node_to_html_node(text_node):
     elif text_node.text_type == TextType.CODE:
         return ParentNode("code", [LeafNode(None, text_node.text or "")])
     elif text_node.text_type == TextType.LINK:
-        return ParentNode("a", [LeafNode(None, text_node.text or "")], {"href": text_node.url})
+        href = text_node.url if rewriter is None else rewriter.rewrite_link(text_node.url)
+        return ParentNode("a", [LeafNode(None, text_node.text or "")], {"href": href})
     elif text_node.text_type == TextType.IMAGE:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+        if rewriter is None:
+            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+        recorded = len(rewriter.images)
+        props = {"src": rewriter.rewrite_image(text_node.url), "alt": text_node.text}
+        if rewriter.sizer is not None:
+            url = rewriter.images[-1] if len(rewriter.images) > recorded else None
+            props.update(rewriter.sizer.attributes(url, rewriter.image_index))
+            rewriter.image_index += 1
+        return LeafNode("img", "", props)
     else:
         raise ValueError(f"Invalid text type: {text_node.text_type}")
 
@@ -27,98 +45,149 @@ def extract_markdown_text(text):
     if not text:
         return [TextNode("", TextType.TEXT)]
     
-    # Start with a single text node
-    nodes = [TextNode(text, TextType.TEXT)]
-    
-    # Process delimiters for bold, italic, code
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    
-    # Process links and images
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    # Bold, italic, code, images and links in a single pass
+    nodes = tokenize_inline(text)
     
     # Ensure we return at least one node
     if not nodes:
-        print(f"Warning: No nodes extracted from text: {text}")
+        warn("no-inline-nodes", "No nodes extracted from text: %.60s", text)
         return [TextNode("", TextType.TEXT)]
     
     return nodes
 
 
-def text_to_children(text):
+def text_to_children(text, rewriter=None):
     # First, parse the text into TextNode objects (bold, italic, links, etc.)
-    text_nodes = extract_markdown_text(text)
+    with stage("inline_parsing", aggregate=True):
+        text_nodes = extract_markdown_text(text)
     
     # Convert TextNode objects to appropriate HTML nodes
-    children = []
-    for node in text_nodes:
-        html_node = text_node_to_html_node(node)
-        children.append(html_node)
+    with stage("node_construction", aggregate=True):
+        children = []
+        for node in text_nodes:
+            html_node = text_node_to_html_node(node, rewriter)
+            children.append(html_node)
+
+    # Keep the plain text for the search index while it is at hand
+    if rewriter is not None and rewriter.text is not None:
+        for node in text_nodes:
+            if node.text:
+                rewriter.text.add(node.text)
     
     return children
 
 
-def markdown_to_html_node(markdown):
+def markdown_to_html_node(markdown, rewriter=None, page=None):
+    """
+    Converts a markdown document into a div of block nodes. Blocks come from
+    blocklexer.lex_page already classified, as offsets into markdown, after
+    any front matter; page is the result of lex_page(markdown) when the
+    caller lexed it already. When a blockmemo.BlockMemo is active, blocks
+    seen before are taken from it instead of being rendered again. When the
+    rewriter carries a searchindex.PageText, every block's plain text is
+    added to it, and headings get an id, unique on the page, to link search
+    results to.
+    """
     if not markdown.strip():
-        print("Warning: Markdown content is empty or invalid.")
+        warn("empty-document", "Markdown content is empty or invalid.")
         return ParentNode("div", [LeafNode(None, "")])  # Return an empty div
     
-    blocks = markdown_to_blocks(markdown)
     all_nodes = []
+    memo = blockmemo.active()
+    text = rewriter.text if rewriter is not None else None
     
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        print(f"Processing block: {block[:30]}... (type: {block_type})")
-
-        # Handle each block type
-        if block_type == BlockType.heading:
-            level = block.count("#")
-            content = block[level:].strip()
-            if not content:
-                print(f"Warning: Empty heading block detected: {block}")
-                continue
-            children = text_to_children(content)
-            all_nodes.append(ParentNode(f"h{level}", children))
-
-        elif block_type == BlockType.paragraph:
-            children = text_to_children(block)
-            if not children:
-                print(f"Warning: Empty paragraph block detected: {block}")
-                continue
-            all_nodes.append(ParentNode("p", children))
-
-        elif block_type == BlockType.code:
-            content = "\n".join(block.split("\n")[1:-1])  # Remove backticks
-            if not content.strip():
-                print(f"Warning: Empty code block detected: {block}")
-                continue
-            code_node = ParentNode("pre", [ParentNode("code", [LeafNode(None, content)])])
-            all_nodes.append(code_node)
-
-        elif block_type == BlockType.quote:
-            content = "\n".join([line[1:].strip() for line in block.split("\n") if line.strip()])
-            if not content.strip():
-                print(f"Warning: Empty quote block detected: {block}")
-                continue
-            
-            # Create a LeafNode with the raw content
-            all_nodes.append(ParentNode("blockquote", [LeafNode(None, content)]))
-
-        elif block_type == BlockType.unordered_list:
-            items = [line[2:].strip() for line in block.split("\n") if line.strip()]
-            list_items = [ParentNode("li", text_to_children(item)) for item in items]
-            all_nodes.append(ParentNode("ul", list_items))
-
-        elif block_type == BlockType.ordered_list:
-            items = [line.split(". ", 1)[1].strip() for line in block.split("\n") if ". " in line]
-            list_items = [ParentNode("li", text_to_children(item)) for item in items]
-            all_nodes.append(ParentNode("ol", list_items))
+    if page is None:
+        with stage("block_lexing"):
+            page = lex_page(markdown)
+    for block_type, start, end in page.spans:
+        block = markdown[start:end]
+        if verbose_enabled():
+            log.debug("Processing block: %.30s... (type: %s)", block, block_type)
+        # A heading's anchor depends on the headings before it on the page,
+        # so a memoized one could repeat an anchor already taken
+        if memo is not None and not (text is not None and block_type == BlockType.heading):
+            node = memo.render(block, rewriter, block_to_html_node, block_type)
+        else:
+            node = block_to_html_node(block, rewriter, block_type)
+        if node is not None:
+            all_nodes.append(node)
+        if text is not None:
+            text.add("\n")
 
     if not all_nodes:
-        print("Warning: No valid nodes found in the Markdown content.")
+        warn("no-nodes", "No valid nodes found in the Markdown content.")
         return ParentNode("div", [LeafNode(None, "")])  # Return an empty div
     
-    return ParentNode("div", all_nodes)
\ No newline at end of file
+    return ParentNode("div", all_nodes)
+
+
+def block_to_html_node(block, rewriter=None, block_type=None):
+    """
+    Renders a single block, or returns None for a block that is skipped.
+    The block is classified first unless its type is given.
+    """
+    if block_type is None:
+        block_type = block_to_block_type(block)
+
+    text = rewriter.text if rewriter is not None else None
+
+    # Handle each block type
+    if block_type == BlockType.heading:
+        heading = block.strip()
+        level = len(heading) - len(heading.lstrip("#"))
+        content = heading[level:].strip()
+        if not content:
+            warn("empty-block", "Empty heading block detected: %s", block)
+            return None
+        if text is None:
+            return ParentNode(f"h{level}", text_to_children(content, rewriter))
+        mark = len(text.pieces)
+        children = text_to_children(content, rewriter)
+        return ParentNode(f"h{level}", children, {"id": text.heading(level, mark)})
+
+    elif block_type == BlockType.paragraph:
+        children = text_to_children("\n".join(block_lines(block)), rewriter)
+        if not children:
+            warn("empty-block", "Empty paragraph block detected: %s", block)
+            return None
+        return ParentNode("p", children)
+
+    elif block_type == BlockType.code:
+        content = code_content(block)
+        if not content.strip():
+            warn("empty-block", "Empty code block detected: %s", block)
+            return None
+        if text is not None:
+            text.add(content)
+        return ParentNode("pre", [ParentNode("code", [LeafNode(None, content)])])
+
+    elif block_type == BlockType.quote:
+        content = "\n".join([line[1:].strip() for line in block_lines(block)])
+        if not content.strip():
+            warn("empty-block", "Empty quote block detected: %s", block)
+            return None
+        if text is not None:
+            text.add(content)
+
+        # Create a LeafNode with the raw content
+        return ParentNode("blockquote", [LeafNode(None, content)])
+
+    elif block_type == BlockType.unordered_list:
+        items = [line[2:].strip() for line in block_lines(block)]
+        return ParentNode("ul", _list_items(items, rewriter))
+
+    elif block_type == BlockType.ordered_list:
+        items = [line.split(". ", 1)[1].strip() for line in block_lines(block) if ". " in line]
+        return ParentNode("ol", _list_items(items, rewriter))
+
+    return None
+
+
+def _list_items(items, rewriter):
+    list_items = []
+    for item in items:
+        list_items.append(ParentNode("li", text_to_children(item, rewriter)))
+        if rewriter is not None and rewriter.text is not None:
+            # Keep the last word of one item from running into the next
+            rewriter.text.add("\n")
+    return list_items
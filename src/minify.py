@@ -0,0 +1,177 @@
+import re
+
+# Elements whose text is kept exactly as written
+RAW_TAGS = frozenset(["pre", "code", "textarea", "script", "style"])
+# Elements around which whitespace never renders, so it can be dropped
+BLOCK_TAGS = frozenset([
+    "html", "head", "body", "title", "meta", "link", "base", "script", "style", "noscript",
+    "article", "aside", "section", "nav", "header", "footer", "main", "div", "p", "pre",
+    "blockquote", "ul", "ol", "li", "dl", "dt", "dd", "figure", "figcaption", "hr", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6", "table", "thead", "tbody", "tfoot", "tr", "th", "td",
+    "form", "fieldset", "legend", "details", "summary",
+])
+VOID_TAGS = frozenset(["area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source",
+                       "track", "wbr"])
+
+_WHITESPACE = re.compile(r"\s+")
+# Attribute values that need no quotes. A "/" is fine: self-closing
+# slashes are dropped, so a value is always followed by a space or ">"
+_UNQUOTED_VALUE = re.compile(r"[^\s\"'=<>`]+")
+_HTML_TOKEN = re.compile(r"<!--(?!\[if).*?-->|<!--(?!\[if).*$|<[^>]*>|<[^>]*$|[^<]+", re.S)
+_TAG_NAME = re.compile(r"</?([a-zA-Z][a-zA-Z0-9-]*)")
+_ATTRIBUTE = re.compile(r"""\s+([^\s"'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?""")
+_CSS_TOKEN = re.compile(r"""/\*.*?\*/|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|\s+|[{};,>:()]|[^\s"'/{};,>:()]+|/""",
+                        re.S)
+
+_enabled = False
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def collapse_whitespace(text):
+    return _WHITESPACE.sub(" ", text)
+
+
+def attribute(key, value):
+    """
+    Returns key=value, quoting the value only when HTML requires it.
+    """
+    if value and _UNQUOTED_VALUE.fullmatch(value):
+        return f"{key}={value}"
+    return f'{key}="{value}"'
+
+
+def minify_tag(tag):
+    """
+    Rewrites a complete start or end tag with single spaces between
+    attributes, unquoted values where possible and no self-closing slash.
+    """
+    match = _TAG_NAME.match(tag)
+    if match is None or tag.startswith("</"):
+        return tag if match is None else f"</{match.group(1)}>"
+    body = tag[match.end():-1].rstrip()
+    if body.endswith("/"):
+        body = body[:-1]
+    parts = [f"<{match.group(1)}"]
+    position = 0
+    for attr in _ATTRIBUTE.finditer(body):
+        if body[position:attr.start()].strip():
+            # Something this parser does not understand; leave the tag alone
+            return tag
+        position = attr.end()
+        key, double, single, bare = attr.groups()
+        value = double if double is not None else single if single is not None else bare
+        parts.append(key if value is None else attribute(key, value))
+    if body[position:].strip():
+        return tag
+    return " ".join(parts) + ">"
+
+
+class HtmlMinifier():
+    """
+    Minifies HTML fed to it in pieces, such as the literal text between a
+    template's placeholders, keeping track of where one piece left off:
+
+      - comments are dropped, except conditional comments
+      - whitespace runs become one space, and whitespace next to block-level
+        tags is dropped
+      - tags lose optional quotes and self-closing slashes
+      - pre, code, textarea, script and style contents are kept as written,
+        except that style contents go through minify_css
+
+    A tag cut off by a placeholder is passed through unchanged.
+    """
+
+    def __init__(self):
+        self.raw_tag = None
+        self.in_tag = False
+        # Whether the output so far ends where whitespace may be dropped
+        self.after_block = True
+
+    def feed(self, text):
+        output = []
+        # Index of a trailing collapsed text piece, which may lose its
+        # final space when a block-level tag follows
+        text_index = None
+        position = 0
+        if self.in_tag:
+            end = text.find(">")
+            if end == -1:
+                return text
+            output.append(text[:end + 1])
+            position = end + 1
+            self.in_tag = False
+            self.after_block = False
+
+        for token in _HTML_TOKEN.finditer(text, position):
+            piece = token.group()
+            if self.raw_tag is not None:
+                closing = re.search(rf"</{self.raw_tag}\s*>", piece, re.I) if piece.startswith("</") else None
+                if closing is None:
+                    output.append(minify_css(piece) if self.raw_tag == "style" and not piece.startswith("<")
+                                  else piece)
+                    continue
+                self.raw_tag = None
+            if piece.startswith("<!--"):
+                continue
+            if piece.startswith("<"):
+                if not piece.endswith(">"):
+                    self.in_tag = True
+                    output.append(piece)
+                    continue
+                name_match = _TAG_NAME.match(piece)
+                name = name_match.group(1).lower() if name_match else ""
+                if name in BLOCK_TAGS and text_index == len(output) - 1:
+                    output[-1] = output[-1].rstrip(" ")
+                output.append(minify_tag(piece) if name_match else piece)
+                self.after_block = name in BLOCK_TAGS
+                if name in RAW_TAGS and not piece.startswith("</") and name not in VOID_TAGS:
+                    self.raw_tag = name
+                continue
+            piece = collapse_whitespace(piece)
+            if self.after_block:
+                piece = piece.lstrip(" ")
+            if piece:
+                output.append(piece)
+                text_index = len(output) - 1
+                self.after_block = False
+        return "".join(output)
+
+
+def minify_css(text):
+    """
+    Drops comments (except /*! ... */ notices) and the whitespace CSS does
+    not need: around braces, semicolons, commas and child combinators,
+    after colons, and before a closing brace's last semicolon. Strings are
+    kept as written.
+    """
+    output = []
+    for token in _CSS_TOKEN.finditer(text):
+        piece = token.group()
+        if piece.startswith("/*"):
+            if piece.startswith("/*!"):
+                output.append(piece)
+            continue
+        if piece.isspace():
+            previous = output[-1][-1:] if output else ""
+            if previous and previous not in "{};,>:(":
+                output.append(" ")
+            continue
+        if piece[0] in "{};,>)" and output and output[-1] == " ":
+            output.pop()
+        if piece[0] == "}" and output and output[-1].endswith(";"):
+            output[-1] = output[-1][:-1]
+        output.append(piece)
+    return "".join(output).strip()
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from assetsync import hash_file, remove_empty_dirs
+from buildlog import log
+from htmlnode import write_chunks
+from urlrewrite import page_url_for
+
+# Rendered in place of the base path when one render feeds several targets;
+# private-use characters, so it never collides with page text
+BASE_PATH_PLACEHOLDER = "\ue000base\ue000/"
+
+# Guards the creation of MultiTargetWriter thread pools, for callers that
+# write from several threads (see pipeline.Pipeline)
+_executor_lock = threading.Lock()
+
+
+class _HashingFile():
+    """
+    Text-mode stand-in for write_chunks that encodes, hashes and writes
+    each buffered chunk to a binary file.
+    """
+
+    def __init__(self, binary_file):
+        self.binary_file = binary_file
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.digest.update(data)
+        self.size += len(data)
+        self.binary_file.write(data)
+
+
+class OutputWriter():
+    """
+    Writes generated pages so that unchanged files keep their mtime.
+
+    Every page is streamed to a temporary file next to its destination
+    while its sha256 is computed. The temporary file only replaces the
+    destination when the hash differs from the one recorded in the output
+    manifest; otherwise it is thrown away. Files without a manifest entry
+    are compared with the existing file instead. finish() deletes outputs
+    that no longer have a source and saves the manifest, which also records
+    when each output last changed (see modified_ns).
+
+    In worker processes the same writer is used with take_results(), and the
+    parent folds the results in with merge_results().
+    """
+
+    def __init__(self, destination, manifest_path=None):
+        self.destination = destination
+        self.manifest_path = manifest_path
+        self.previous = {}
+        self.modified = {}
+        if manifest_path is not None and os.path.exists(manifest_path):
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("destination") == os.path.abspath(destination):
+                self.previous = manifest.get("files", {})
+                self.modified = manifest.get("modified", {})
+        self.results = {}
+        self.removed = []
+
+    def relative(self, path):
+        return os.path.relpath(path, self.destination).replace(os.sep, "/")
+
+    def write(self, path, chunks):
+        """
+        Writes an iterable of strings to path. Returns "added", "changed" or
+        "unchanged".
+        """
+        relative = self.relative(path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as binary_file:
+                hashing_file = _HashingFile(binary_file)
+                write_chunks(hashing_file, chunks)
+            digest = hashing_file.digest.hexdigest()
+
+            recorded = self.previous.get(relative)
+            existed = os.path.exists(path)
+            if recorded is None and existed and os.path.getsize(path) == hashing_file.size:
+                # Built before the manifest existed; compare with the file itself
+                recorded = hash_file(path)
+            if recorded == digest and existed:
+                os.remove(tmp_path)
+                status = "unchanged"
+            else:
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+                if recorded is None:
+                    # A file the manifest does not know but that was there
+                    # already, such as one from before the manifest, changed
+                    status = "changed" if existed else "added"
+                else:
+                    status = "unchanged" if recorded == digest else "changed"
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        modified = None if status == "unchanged" else os.stat(path).st_mtime_ns
+        self.results[relative] = (digest, status, modified)
+        return status
+
+    def missing_outputs(self, path):
+        return [] if os.path.exists(path) else [path]
+
+    def take_results(self):
+        results = self.results
+        self.results = {}
+        return results
+
+    def merge_results(self, results):
+        self.results.update(results)
+
+    def finish(self, expected_paths):
+        """
+        Deletes outputs recorded in the manifest that are not among
+        expected_paths (every page the build knows about, written this time
+        or not) and saves the manifest. Returns the removed relative paths.
+        """
+        expected = {self.relative(path) for path in expected_paths}
+        files = {relative: digest for relative, digest in self.previous.items() if relative in expected}
+        modified = {relative: mtime_ns for relative, mtime_ns in self.modified.items() if relative in expected}
+        for relative, (digest, _, mtime_ns) in self.results.items():
+            files[relative] = digest
+            if mtime_ns is not None:
+                modified[relative] = mtime_ns
+        self.modified = modified
+
+        for relative in sorted(set(self.previous) - expected):
+            try:
+                os.remove(os.path.join(self.destination, relative))
+                log.info("Removed stale output: %s", relative)
+            except FileNotFoundError:
+                pass
+            self.removed.append(relative)
+        remove_empty_dirs(self.destination, self.removed)
+
+        if self.manifest_path is not None:
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as manifest_file:
+                json.dump({"destination": os.path.abspath(self.destination), "files": files, "modified": modified},
+                          manifest_file)
+            os.replace(tmp_path, self.manifest_path)
+        return self.removed
+
+    def modified_ns(self, relative):
+        """
+        Returns when an output's content last changed, in nanoseconds since
+        the epoch, or None for a file that does not exist. Outputs written
+        before the manifest recorded this fall back to the file's mtime,
+        which is only touched when the content changes.
+        """
+        mtime_ns = self.modified.get(relative)
+        if mtime_ns is None:
+            try:
+                mtime_ns = os.stat(os.path.join(self.destination, relative)).st_mtime_ns
+            except FileNotFoundError:
+                return None
+        return mtime_ns
+
+    def paths_with_status(self, status):
+        return sorted(relative for relative, (_, result, _) in self.results.items() if result == status)
+
+    def summary(self):
+        added = len(self.paths_with_status("added"))
+        changed = len(self.paths_with_status("changed"))
+        unchanged = len(self.paths_with_status("unchanged"))
+        return f"{added} added, {changed} changed, {unchanged} unchanged, {len(self.removed)} removed"
+
+
+class MultiTargetWriter():
+    """
+    Writes every page to several targets, each with its own base path and
+    output directory, from a single render.
+
+    Pages are rendered once for destination with BASE_PATH_PLACEHOLDER as
+    the base path; write() puts each target's base path in its place and
+    hands the result to that target's OutputWriter. The targets of a page
+    are written concurrently on a thread pool. It stands in for an
+    OutputWriter everywhere, so callers need not tell the two apart.
+    """
+
+    def __init__(self, targets, destination):
+        # targets is a list of (base_path, OutputWriter) pairs
+        self.targets = targets
+        self.destination = destination
+        self._executor = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    def target_path(self, writer, path):
+        return os.path.join(writer.destination, os.path.relpath(path, self.destination))
+
+    def write(self, path, chunks):
+        html = "".join(chunks)
+
+        def write_target(target):
+            base_path, writer = target
+            target_path = self.target_path(writer, path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            return writer.write(target_path, [html.replace(BASE_PATH_PLACEHOLDER, base_path)])
+
+        with _executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(self.targets))
+        return list(self._executor.map(write_target, self.targets))
+
+    def missing_outputs(self, path):
+        missing = []
+        for _, writer in self.targets:
+            missing.extend(writer.missing_outputs(self.target_path(writer, path)))
+        return missing
+
+    def take_results(self):
+        return [writer.take_results() for _, writer in self.targets]
+
+    def merge_results(self, results):
+        for (_, writer), target_results in zip(self.targets, results):
+            writer.merge_results(target_results)
+
+    def finish(self, expected_paths):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        expected_paths = list(expected_paths)
+        for _, writer in self.targets:
+            writer.finish([self.target_path(writer, path) for path in expected_paths])
+
+
+def write_changes(path, base_path, added, changed, removed):
+    """
+    Writes the URLs of added, changed and removed output files as JSON, for
+    feeding CDN cache purges. Paths are relative to the output directory.
+    """
+    prefix = base_path.rstrip("/")
+
+    def urls(paths):
+        return sorted({prefix + page_url_for(relative) for relative in paths})
+
+    changes = {"added": urls(added), "changed": urls(changed), "removed": urls(removed)}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as changes_file:
+        json.dump(changes, changes_file, indent=2)
+        changes_file.write("\n")
+    os.replace(tmp_path, path)
+    return changes
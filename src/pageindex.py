@@ -0,0 +1,91 @@
+import json
+import os
+
+from urlrewrite import page_url_for
+
+INDEX_VERSION = 2
+
+
+class PageIndex():
+    """
+    Metadata of every page of the site, kept in path between builds so
+    that listings of all pages (sitemaps, feeds, archives) need neither
+    the pages that were skipped as up to date nor any page's markdown:
+
+      - url: the page's root-relative URL, without the base path
+      - output: its output path relative to destination
+      - title, date, tags, summary: see frontmatter.page_metadata
+
+    Entries are replaced as pages are rendered and dropped when their
+    markdown disappears.
+    """
+
+    def __init__(self, destination, path=None):
+        self.destination = destination
+        self.path = path
+        self.pages = {}
+        # Whether pages differ from what is saved at path
+        self.changed = True
+        if path is not None and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as index_file:
+                data = json.load(index_file)
+            if data.get("version") == INDEX_VERSION and data.get("destination") == os.path.abspath(destination):
+                self.pages = data["pages"]
+                self.changed = False
+
+    def has_page(self, markdown_path):
+        return markdown_path in self.pages
+
+    def update_page(self, markdown_path, output_path, metadata):
+        prefix = os.path.join(self.destination, "")
+        if output_path.startswith(prefix):
+            relative = output_path[len(prefix):]
+        else:
+            relative = os.path.relpath(output_path, self.destination)
+        relative = relative.replace(os.sep, "/")
+        entry = dict(metadata, url=page_url_for(relative), output=relative)
+        if self.pages.get(markdown_path) != entry:
+            self.pages[markdown_path] = entry
+            self.changed = True
+
+    def retain(self, markdown_paths):
+        """
+        Drops pages whose markdown no longer exists.
+        """
+        keep = set(markdown_paths)
+        for markdown_path in list(self.pages):
+            if markdown_path not in keep:
+                del self.pages[markdown_path]
+                self.changed = True
+
+    def entries(self, url_prefix="/"):
+        """
+        Returns the entries whose URL starts with url_prefix, ordered by URL.
+        """
+        return sorted((entry for entry in self.pages.values() if entry["url"].startswith(url_prefix)),
+                      key=lambda entry: entry["url"])
+
+    def newest_first(self, url_prefix="/", tag=None):
+        """
+        Returns the entries under url_prefix (not counting the page at
+        url_prefix itself), optionally only those tagged tag, newest first.
+        Pages without a date come last, ordered by URL.
+        """
+        entries = [entry for entry in self.entries(url_prefix)
+                   if entry["url"] != url_prefix and (tag is None or tag in entry["tags"])]
+        entries.sort(key=lambda entry: entry["date"] or "", reverse=True)
+        return entries
+
+    def save(self):
+        """
+        Writes the index to path, unless it is unchanged since it was read.
+        """
+        if self.path is None or not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as index_file:
+            json.dump({"version": INDEX_VERSION, "destination": os.path.abspath(self.destination),
+                       "pages": self.pages}, index_file)
+        os.replace(tmp_path, self.path)
+        self.changed = False
@@ -0,0 +1,168 @@
+import contextlib
+import io
+import math
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import blockmemo
+import buildlog
+import fingerprint
+import imagesize
+import minify
+import profiler
+import searchindex
+from buildlog import log
+
+# Per-worker state, set up once by _init_worker
+_worker_cache = None
+_worker_writer = None
+
+
+def chunk_pages(pages, jobs, chunks_per_worker=4):
+    """
+    Splits the page list into chunks so each task sent to a worker carries
+    several pages. A few chunks per worker keeps the load balanced without
+    paying IPC costs for every single page.
+    """
+    if not pages:
+        return []
+    size = max(1, math.ceil(len(pages) / (jobs * chunks_per_worker)))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+
+def render_one(page, template_path, base_path, cache, content_dir=None, writer=None):
+    """
+    Renders a single page with its stdout and log output captured. Returns a
+    (markdown_path, output_path, log, error, dependencies) tuple; error is
+    None on success and a formatted traceback otherwise, so one bad page
+    does not stop the build.
+    """
+    from utils import generate_page
+
+    markdown_path, output_path = page
+    log = io.StringIO()
+    error = None
+    dependencies = None
+    with contextlib.redirect_stdout(log):
+        try:
+            with buildlog.current_file(markdown_path):
+                dependencies = generate_page(markdown_path, template_path, output_path, base_path, cache,
+                                             content_dir, writer)
+        except Exception:
+            error = traceback.format_exc()
+    return markdown_path, output_path, log.getvalue(), error, dependencies
+
+
+def _init_worker(cache, verbose, profile_settings, memo_settings=None, writer=None, assets=None, sizer=None,
+                 minified=False, search=False):
+    global _worker_cache, _worker_writer
+    _worker_cache = cache
+    _worker_writer = writer
+    if assets is not None:
+        fingerprint.enable(assets)
+    else:
+        fingerprint.disable()
+    if sizer is not None:
+        imagesize.enable(sizer)
+    else:
+        imagesize.disable()
+    if minified:
+        minify.enable()
+    else:
+        minify.disable()
+    if search:
+        searchindex.enable()
+    else:
+        searchindex.disable()
+    if memo_settings is not None:
+        max_entries, use_store = memo_settings
+        blockmemo.enable(blockmemo.BlockMemo(max_entries, cache if use_store else None))
+    else:
+        blockmemo.disable()
+    buildlog.configure(verbose)
+    buildlog.take_warnings()
+    if profile_settings is not None:
+        profiler.enable(profiler.Profiler(*profile_settings))
+    else:
+        profiler.disable()
+
+
+def _render_chunk(chunk, template_path, base_path, content_dir):
+    cache = _worker_cache
+    if cache is not None:
+        hits_before = dict(cache.hits)
+        misses_before = dict(cache.misses)
+
+    writer = _worker_writer
+    results = [render_one(page, template_path, base_path, cache, content_dir, writer) for page in chunk]
+
+    stats = None
+    if cache is not None:
+        stats = (
+            {kind: cache.hits[kind] - hits_before[kind] for kind in cache.KINDS},
+            {kind: cache.misses[kind] - misses_before[kind] for kind in cache.KINDS},
+        )
+    timings = None
+    if profiler.active() is not None:
+        timings = profiler.active().take_results()
+    memo_stats = None
+    if blockmemo.active() is not None:
+        memo_stats = blockmemo.active().take_stats()
+    written = writer.take_results() if writer is not None else None
+    return results, stats, buildlog.take_warnings(), timings, memo_stats, written
+
+
+def render_pages_parallel(pages, template_path, base_path, cache=None, jobs=2, content_dir=None, graph=None,
+                          writer=None, search=None, page_index=None):
+    """
+    Renders (markdown_path, output_path) pairs on a pool of worker processes.
+
+    Worker output is captured per page and printed by the parent, so logs
+    from different pages never interleave. The dependencies of rendered
+    pages are recorded in graph, when given. With an OutputWriter, each
+    worker writes through its own copy and the parent merges what they
+    wrote. The text of rendered pages goes to search, a
+    searchindex.SearchIndex, and their metadata to page_index, a
+    pageindex.PageIndex, when given. Returns the list of
+    (markdown_path, error) pairs for pages that failed.
+    """
+    failures = []
+    chunks = chunk_pages(pages, jobs)
+    parent_profiler = profiler.active()
+    profile_settings = None
+    if parent_profiler is not None:
+        profile_settings = (parent_profiler.cprofile_glob, parent_profiler.cprofile_dir)
+    memo = blockmemo.active()
+    memo_settings = None
+    if memo is not None:
+        memo_settings = (memo.max_entries, memo.store is not None)
+    initargs = (cache, buildlog.verbose_enabled(), profile_settings, memo_settings, writer, fingerprint.active(),
+                imagesize.active(), minify.enabled(), searchindex.collecting())
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as executor:
+        futures = [executor.submit(_render_chunk, chunk, template_path, base_path, content_dir) for chunk in chunks]
+        for future in as_completed(futures):
+            results, stats, warnings, timings, memo_stats, written = future.result()
+            buildlog.merge_warnings(warnings)
+            if parent_profiler is not None and timings is not None:
+                parent_profiler.merge_results(timings)
+            for markdown_path, output_path, output, error, dependencies in results:
+                log.info("Generated page for %s -> %s", markdown_path, output_path)
+                if output:
+                    print(output, end="")
+                if error is not None:
+                    failures.append((markdown_path, error))
+                if graph is not None:
+                    if error is None:
+                        graph.record(markdown_path, output_path, dependencies)
+                    else:
+                        graph.forget(markdown_path)
+                if search is not None and error is None:
+                    search.update_page(markdown_path, output_path, dependencies["text"])
+                if page_index is not None and error is None:
+                    page_index.update_page(markdown_path, output_path, dependencies["meta"])
+            if cache is not None and stats is not None:
+                cache.merge_stats(*stats)
+            if memo is not None and memo_stats is not None:
+                memo.merge_stats(memo_stats)
+            if writer is not None and written is not None:
+                writer.merge_results(written)
+    return failures
@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+import traceback
+
+from buildlog import current_file, log
+from htmlnode import write_chunks
+
+DEFAULT_READ_AHEAD = 16
+DEFAULT_WRITE_BEHIND = 16
+DEFAULT_READERS = 2
+DEFAULT_WRITERS = 2
+
+# Put on a queue by each thread of a stage once it has no more work
+_DONE = object()
+
+
+class StageStats():
+    """
+    What one pipeline stage did, summed over its threads: items handled,
+    seconds spent working, waiting for input (idle) and waiting for room
+    in the next queue (blocked), and the depth of the queue it feeds,
+    sampled on every put.
+    """
+
+    def __init__(self, name, threads=1):
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self.depth_total = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+        self._lock = threading.Lock()
+
+    def add(self, busy=0.0, idle=0.0, blocked=0.0, items=0):
+        with self._lock:
+            self.busy += busy
+            self.idle += idle
+            self.blocked += blocked
+            self.items += items
+
+    def sample(self, depth):
+        with self._lock:
+            self.depth_total += depth
+            self.depth_samples += 1
+            self.depth_max = max(self.depth_max, depth)
+
+    def summary(self):
+        line = (f"{self.name}: {self.items} pages on {self.threads} thread(s), busy {self.busy:.3f}s, "
+                f"idle {self.idle:.3f}s, blocked {self.blocked:.3f}s")
+        if self.depth_samples:
+            line += (f", output queue depth {self.depth_total / self.depth_samples:.1f} avg, "
+                     f"{self.depth_max} max")
+        return line
+
+
+class Pipeline():
+    """
+    Renders pages in three overlapping stages, so the CPU does not sit
+    idle while files are read or written on slow filesystems:
+
+      - read: reader threads read upcoming markdown files ahead of the
+        renderer, at most read_ahead of them at a time
+      - render: the calling thread renders each page to a string with
+        utils.render_page, so the render cache, block memo, profiler and
+        dependency graph are only ever used from one thread
+      - write: writer threads write finished pages, through an
+        outputwriter.OutputWriter when given, at most write_behind of
+        them waiting at a time
+
+    Both queues are bounded: a stage that gets ahead blocks until the next
+    one catches up, which caps the pages held in memory at about
+    read_ahead + write_behind. The time each stage spent working, idle and
+    blocked is kept in stats for the build report.
+    """
+
+    def __init__(self, read_ahead=DEFAULT_READ_AHEAD, write_behind=DEFAULT_WRITE_BEHIND, readers=DEFAULT_READERS,
+                 writers=DEFAULT_WRITERS):
+        self.read_ahead = max(1, read_ahead)
+        self.write_behind = max(1, write_behind)
+        self.readers = max(1, readers)
+        self.writers = max(1, writers)
+        self.stats = [StageStats("read", self.readers), StageStats("render"), StageStats("write", self.writers)]
+
+    def _put(self, target, item, stats):
+        start = time.perf_counter()
+        target.put(item)
+        stats.add(blocked=time.perf_counter() - start)
+        stats.sample(target.qsize())
+
+    def _get(self, source, stats):
+        start = time.perf_counter()
+        item = source.get()
+        stats.add(idle=time.perf_counter() - start)
+        return item
+
+    def _read(self, pages, lock, read_queue):
+        stats = self.stats[0]
+        while True:
+            with lock:
+                page = next(pages, None)
+            if page is None:
+                break
+            start = time.perf_counter()
+            try:
+                with open(page[0], "r") as content_file:
+                    item = (page, content_file.read(), None)
+            except Exception:
+                item = (page, None, traceback.format_exc())
+            stats.add(busy=time.perf_counter() - start, items=1)
+            self._put(read_queue, item, stats)
+        read_queue.put(_DONE)
+
+    def _write(self, write_queue, writer, written):
+        stats = self.stats[2]
+        while True:
+            item = self._get(write_queue, stats)
+            if item is _DONE:
+                break
+            page, html, dependencies = item
+            start = time.perf_counter()
+            try:
+                if writer is not None:
+                    writer.write(page[1], [html])
+                else:
+                    with open(page[1], "w") as output_file:
+                        write_chunks(output_file, [html])
+                error = None
+            except Exception:
+                error = traceback.format_exc()
+            stats.add(busy=time.perf_counter() - start, items=1)
+            written.append((page, dependencies, error))
+
+    def run(self, pages, template_path, base_path, cache=None, content_dir=None, graph=None, writer=None,
+            search=None, page_index=None):
+        """
+        Renders (markdown_path, output_path) pairs like
+        utils.generate_pages_recursive does without jobs. Dependencies,
+        text and metadata of pages are recorded in graph, search and
+        page_index, when given, once their output is written. Returns the
+        list of (markdown_path, error) pairs for pages that failed.
+        """
+        from utils import render_page
+
+        read_queue = queue.Queue(self.read_ahead)
+        write_queue = queue.Queue(self.write_behind)
+        written = []
+        failures = []
+        lock = threading.Lock()
+        page_iter = iter(pages)
+        readers = [threading.Thread(target=self._read, args=(page_iter, lock, read_queue), daemon=True)
+                   for _ in range(self.readers)]
+        writers = [threading.Thread(target=self._write, args=(write_queue, writer, written), daemon=True)
+                   for _ in range(self.writers)]
+        for thread in readers + writers:
+            thread.start()
+
+        stats = self.stats[1]
+        remaining = len(readers)
+        while remaining:
+            item = self._get(read_queue, stats)
+            if item is _DONE:
+                remaining -= 1
+                continue
+            (markdown_path, output_path), markdown_content, error = item
+            start = time.perf_counter()
+            if error is None:
+                log.info("Generating page for %s -> %s", markdown_path, output_path)
+                try:
+                    with current_file(markdown_path):
+                        html, dependencies = render_page(markdown_path, template_path, base_path, cache,
+                                                         content_dir, markdown_content)
+                except Exception:
+                    error = traceback.format_exc()
+            stats.add(busy=time.perf_counter() - start, items=1)
+            if error is not None:
+                failures.append((markdown_path, error))
+                if graph is not None:
+                    graph.forget(markdown_path)
+                continue
+            self._put(write_queue, ((markdown_path, output_path), html, dependencies), stats)
+
+        for _ in writers:
+            write_queue.put(_DONE)
+        for thread in readers + writers:
+            thread.join()
+
+        for (markdown_path, output_path), dependencies, error in written:
+            if error is not None:
+                failures.append((markdown_path, error))
+                if graph is not None:
+                    graph.forget(markdown_path)
+                continue
+            if graph is not None:
+                graph.record(markdown_path, output_path, dependencies)
+            if search is not None:
+                search.update_page(markdown_path, output_path, dependencies["text"])
+            if page_index is not None:
+                page_index.update_page(markdown_path, output_path, dependencies["meta"])
+        return failures
+
+    def report(self):
+        return [stats.summary() for stats in self.stats]
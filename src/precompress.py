@@ -0,0 +1,136 @@
+import gzip
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from assetsync import hash_file, load_manifest, remove_empty_dirs, save_manifest, scan_tree
+from buildlog import log
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json")
+DEFAULT_MIN_SIZE = 1024
+# Fraction of the original size the .gz must save to be worth serving
+DEFAULT_MIN_SAVINGS = 0.1
+
+
+class PrecompressResult():
+    def __init__(self):
+        self.compressed = []
+        self.unchanged = []
+        self.skipped = []
+        self.removed = []
+
+    def summary(self):
+        return (f"{len(self.compressed)} compressed, {len(self.unchanged)} unchanged, "
+                f"{len(self.skipped)} skipped, {len(self.removed)} removed")
+
+
+def _write_gzip(path, data, source_stat):
+    """
+    Writes data gzipped at the maximum level to path + ".gz", atomically.
+    The gzip header carries no timestamp, so the same input always gives
+    the same bytes; the file itself gets the source's mtime.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".gz-")
+    try:
+        with os.fdopen(fd, "wb") as gz_file:
+            gz_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tmp_path, path + ".gz")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _remove_gzip(path):
+    try:
+        os.remove(path + ".gz")
+    except FileNotFoundError:
+        pass
+
+
+def compress_file(path, source_stat, min_size=DEFAULT_MIN_SIZE, min_savings=DEFAULT_MIN_SAVINGS):
+    """
+    Writes the .gz sibling of path when the file is large enough and
+    compresses well enough, and removes a stale one otherwise. Returns
+    True when a .gz was written.
+    """
+    if source_stat.st_size < min_size:
+        _remove_gzip(path)
+        return False
+    with open(path, "rb") as source_file:
+        # The scanned stat only has the size and mtime; the .gz also gets
+        # the source's atime
+        file_stat = os.fstat(source_file.fileno())
+        data = source_file.read()
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) > len(data) * (1 - min_savings):
+        _remove_gzip(path)
+        return False
+    _write_gzip(path, compressed, file_stat)
+    return True
+
+
+def precompress_tree(destination, manifest_path=None, min_size=DEFAULT_MIN_SIZE, min_savings=DEFAULT_MIN_SAVINGS,
+                     jobs=8):
+    """
+    Writes .gz siblings for the HTML, CSS, JS, SVG and JSON files under
+    destination, so the web server can send them as they are.
+
+    A file is only compressed again when its content hash differs from the
+    one recorded in the manifest at the last run; the hash is only computed
+    when the file's size or mtime changed. Compression runs on a thread
+    pool (zlib releases the GIL). Files smaller than min_size, or whose .gz
+    would not save at least min_savings of their size, get no .gz. A .gz
+    whose source is gone is deleted.
+    """
+    result = PrecompressResult()
+    previous = load_manifest(manifest_path, destination)
+    files = {relative: stat for relative, stat in scan_tree(destination).items()
+             if relative.endswith(COMPRESSIBLE_EXTENSIONS)}
+
+    manifest = {}
+    to_compress = []
+    for relative, stat in sorted(files.items()):
+        path = os.path.join(destination, relative)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        recorded = previous.get(relative, {})
+        same_stat = recorded.get("size") == stat.st_size and recorded.get("mtime_ns") == stat.st_mtime_ns
+        entry["sha256"] = recorded.get("sha256") if same_stat else hash_file(path)
+        gz_present = not recorded.get("gzip") or os.path.exists(path + ".gz")
+        if "gzip" in recorded and recorded.get("sha256") == entry["sha256"] and gz_present:
+            entry["gzip"] = recorded["gzip"]
+            result.unchanged.append(relative)
+        else:
+            to_compress.append((relative, path, stat))
+        manifest[relative] = entry
+
+    def compress(item):
+        relative, path, stat = item
+        return relative, compress_file(path, stat, min_size, min_savings)
+
+    if len(to_compress) > 1 and jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            outcomes = list(executor.map(compress, to_compress))
+    else:
+        outcomes = [compress(item) for item in to_compress]
+    for relative, written in outcomes:
+        manifest[relative]["gzip"] = written
+        if written:
+            result.compressed.append(relative)
+            log.info("Compressed file: %s", relative)
+        else:
+            result.skipped.append(relative)
+
+    for relative in sorted(set(previous) - set(files)):
+        if previous[relative].get("gzip"):
+            _remove_gzip(os.path.join(destination, relative))
+            log.info("Removed stale file: %s.gz", relative)
+            result.removed.append(relative + ".gz")
+    # The page's own output went first, leaving its directory to the .gz
+    remove_empty_dirs(destination, result.removed)
+
+    if manifest_path is not None:
+        save_manifest(manifest_path, destination, manifest)
+    return result
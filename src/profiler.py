@@ -0,0 +1,174 @@
+import contextlib
+import cProfile
+import fnmatch
+import json
+import os
+import threading
+import time
+
+# The profiler for this process, or None when profiling is off. The
+# module-level stage()/page() helpers check it so instrumented code costs
+# one function call and a no-op context manager when profiling is disabled.
+_active = None
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+def enable(profiler):
+    global _active
+    _active = profiler
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    return _active
+
+
+def stage(name, aggregate=False):
+    """
+    Times a build stage. Stages that run once per page become their own
+    trace events; aggregate=True is for stages that run per block, which are
+    summed into the page's totals instead of flooding the trace.
+    """
+    if _active is None:
+        return _NULL_CONTEXT
+    return _active.stage(name, aggregate)
+
+
+def page(path):
+    """
+    Times everything done for one page, attributing nested stages to it.
+    """
+    if _active is None:
+        return _NULL_CONTEXT
+    return _active.page(path)
+
+
+def _now_us():
+    return time.perf_counter_ns() / 1000.0
+
+
+class Profiler():
+    """
+    Collects per-stage timings as Chrome trace events ("ph": "X") plus
+    per-page totals for the slowest-pages table. Pages whose path matches
+    cprofile_glob are additionally run under cProfile and dumped to
+    cprofile_dir as .prof files.
+    """
+
+    def __init__(self, cprofile_glob=None, cprofile_dir=None):
+        self.cprofile_glob = cprofile_glob
+        self.cprofile_dir = cprofile_dir
+        self.events = []
+        self.pages = []  # (duration_us, path, {stage: duration_us})
+        self._page_path = None
+        self._page_stages = None
+
+    def _event(self, name, start, duration, args=None):
+        event = {
+            "name": name,
+            "cat": "build",
+            "ph": "X",
+            "ts": start,
+            "dur": duration,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def stage(self, name, aggregate=False):
+        start = _now_us()
+        try:
+            yield
+        finally:
+            duration = _now_us() - start
+            if self._page_stages is not None:
+                self._page_stages[name] = self._page_stages.get(name, 0.0) + duration
+            if not aggregate:
+                args = {"page": self._page_path} if self._page_path else None
+                self._event(name, start, duration, args)
+
+    @contextlib.contextmanager
+    def page(self, path):
+        previous = (self._page_path, self._page_stages)
+        self._page_path = path
+        self._page_stages = {}
+        profile = None
+        if self.cprofile_glob and fnmatch.fnmatch(path, self.cprofile_glob):
+            profile = cProfile.Profile()
+            profile.enable()
+        start = _now_us()
+        try:
+            yield
+        finally:
+            duration = _now_us() - start
+            if profile is not None:
+                profile.disable()
+                self._dump_cprofile(profile, path)
+            stages = self._page_stages
+            self._event("page", start, duration, {"page": path, **{k: round(v, 1) for k, v in stages.items()}})
+            self.pages.append((duration, path, stages))
+            self._page_path, self._page_stages = previous
+
+    def _dump_cprofile(self, profile, path):
+        os.makedirs(self.cprofile_dir, exist_ok=True)
+        name = path.replace(os.sep, "_").replace("/", "_") + ".prof"
+        profile.dump_stats(os.path.join(self.cprofile_dir, name))
+
+    def take_results(self):
+        """
+        Returns and clears the collected events and page totals, so a
+        worker process can send them back to the parent.
+        """
+        results = (self.events, self.pages)
+        self.events = []
+        self.pages = []
+        return results
+
+    def merge_results(self, results):
+        events, pages = results
+        self.events.extend(events)
+        self.pages.extend(pages)
+
+    def write_trace(self, path):
+        """
+        Writes the events in Chrome trace-event format; open the file in
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, trace_file)
+
+    def stage_totals(self):
+        totals = {}
+        for _, _, stages in self.pages:
+            for name, duration in stages.items():
+                totals[name] = totals.get(name, 0.0) + duration
+        for event in self.events:
+            if event["name"] != "page" and "page" not in event.get("args", {}):
+                totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"]
+        return totals
+
+    def report(self, top=10):
+        """
+        Returns the report lines: time per stage over the whole build,
+        then the slowest pages with their own stage breakdown.
+        """
+        lines = ["Time per stage:"]
+        for name, duration in sorted(self.stage_totals().items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<22} {duration / 1000:10.2f} ms")
+
+        lines.append(f"Slowest {min(top, len(self.pages))} of {len(self.pages)} pages:")
+        for duration, path, stages in sorted(self.pages, key=lambda item: -item[0])[:top]:
+            slowest = sorted(stages.items(), key=lambda item: -item[1])[:3]
+            breakdown = ", ".join(f"{name} {value / 1000:.2f}" for name, value in slowest)
+            lines.append(f"  {duration / 1000:10.2f} ms  {path}  ({breakdown})")
+        return lines
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import tempfile
+
+# Bump this whenever the rendered output changes for the same input, so
+# entries written by an older generator are never served again.
+GENERATOR_VERSION = "9"
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def hash_text(text):
+    """
+    Returns the hex sha256 digest of a string.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RenderCache():
+    """
+    On-disk, content-addressed cache for rendered markdown.
+
+    Entries are stored by kind:
+      - "fragments": the HTML produced by markdown_to_html_node(...).to_html(),
+        keyed by the markdown and the UrlRewriter signature it was built with
+      - "pages": the final page with the template applied
+      - "refs": JSON listing the image and link URLs a fragment references,
+        so a cache hit can still report the page's dependencies
+      - "blocks": single rendered blocks, stored by blockmemo.BlockMemo
+      - "text": JSON of a fragment's plain text for the search index, so a
+        cache hit can still update it
+
+    Every entry is a single file, written atomically, so several build
+    processes can share one cache directory. A hit refreshes the file's
+    mtime, which prune() uses to evict the least recently used entries
+    once the cache grows beyond max_bytes.
+    """
+
+    KINDS = ("fragments", "pages", "refs", "blocks", "text")
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = {kind: 0 for kind in self.KINDS}
+        self.misses = {kind: 0 for kind in self.KINDS}
+
+    def fragment_key(self, markdown, rewriter_signature=""):
+        return hash_text(f"{GENERATOR_VERSION}\0{rewriter_signature}\0{markdown}")
+
+    def page_key(self, fragment_key, template_key, base_path, title):
+        return hash_text(f"{GENERATOR_VERSION}\0{fragment_key}\0{template_key}\0{base_path}\0{title}")
+
+    def _entry_path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key[:2], key)
+
+    def get(self, kind, key):
+        """
+        Returns the cached text for key, or None on a miss.
+        """
+        path = self._entry_path(kind, key)
+        try:
+            with open(path, "r", encoding="utf-8") as entry_file:
+                text = entry_file.read()
+        except FileNotFoundError:
+            self.misses[kind] += 1
+            return None
+
+        # Mark the entry as recently used for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits[kind] += 1
+        return text
+
+    def put(self, kind, key, text):
+        """
+        Stores text under key. The write goes to a temporary file first and
+        is renamed into place, so readers never see a partial entry.
+        """
+        path = self._entry_path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                tmp_file.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def prune(self):
+        """
+        Evicts the least recently used entries until the cache fits in
+        max_bytes. Returns the number of entries removed.
+        """
+        entries = []
+        total = 0
+        for kind in self.KINDS:
+            kind_dir = os.path.join(self.cache_dir, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for bucket in os.scandir(kind_dir):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if not entry.is_file() or entry.name.startswith(".tmp-"):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        removed = 0
+        if total <= self.max_bytes:
+            return removed
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def merge_stats(self, hits, misses):
+        """
+        Adds counters collected elsewhere, e.g. in a worker process.
+        """
+        for kind in self.KINDS:
+            self.hits[kind] += hits.get(kind, 0)
+            self.misses[kind] += misses.get(kind, 0)
+
+    def summary(self):
+        parts = []
+        for kind in self.KINDS:
+            hits = self.hits[kind]
+            misses = self.misses[kind]
+            lookups = hits + misses
+            if not lookups:
+                continue
+            rate = 100.0 * hits / lookups
+            parts.append(f"{kind}: {hits} hits / {misses} misses ({rate:.1f}%)")
+        return "Render cache " + (", ".join(parts) if parts else "not used")
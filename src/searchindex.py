@@ -0,0 +1,318 @@
+import json
+import os
+import re
+import tempfile
+
+from buildlog import log
+from urlrewrite import page_url_for
+
+PREFIX_LENGTH = 2
+INDEX_DIR = "search"
+INDEX_VERSION = 1
+
+_WORD = re.compile(r"\w+")
+_NOT_SLUG = re.compile(r"[^\w\s-]")
+_SHARD_NAME = re.compile(r"[a-z0-9]+")
+
+_collecting = False
+
+
+def enable():
+    global _collecting
+    _collecting = True
+
+
+def disable():
+    global _collecting
+    _collecting = False
+
+
+def collecting():
+    return _collecting
+
+
+def slugify(text):
+    """
+    Returns the anchor for a heading: "A Break from Coherence" ->
+    "a-break-from-coherence".
+    """
+    return "-".join(_NOT_SLUG.sub("", text.lower()).split())
+
+
+def unique_slug(text, used):
+    """
+    Returns slugify(text), with "-2", "-3", ... appended when used, the set
+    of anchors already taken on the page, holds it, and adds the result to
+    used.
+    """
+    slug = anchor = slugify(text)
+    count = 1
+    while anchor in used:
+        count += 1
+        anchor = f"{slug}-{count}"
+    used.add(anchor)
+    return anchor
+
+
+def shard_name(prefix):
+    """
+    Returns the file name of a prefix's shard; prefixes that are not plain
+    ASCII letters and digits are hex-encoded so every name is safe on disk.
+    """
+    if _SHARD_NAME.fullmatch(prefix):
+        return f"{prefix}.json"
+    return f"_{prefix.encode('utf-8').hex()}.json"
+
+
+class PageText():
+    """
+    Collects the plain text of a page while its markdown is parsed.
+
+    pieces is the text in document order: strings for text, and
+    [level, title] lists for headings. Consecutive strings belong to the
+    same block and are joined as written; markdown_to_html_node ends every
+    block with a newline. Headings with the same title get the anchors
+    "title", "title-2", "title-3", ... in document order.
+    """
+
+    def __init__(self, pieces=None):
+        self.pieces = list(pieces or [])
+        self.anchors = set()
+        for piece in self.pieces:
+            if not isinstance(piece, str):
+                unique_slug(piece[1], self.anchors)
+
+    def add(self, text):
+        self.pieces.append(text)
+
+    def heading(self, level, mark):
+        """
+        Turns the text added since mark (len(pieces) before the heading's
+        inline text was parsed) into a heading, and returns its anchor.
+        """
+        title = " ".join("".join(self.pieces[mark:]).split())
+        del self.pieces[mark:]
+        self.pieces.append([level, title])
+        return unique_slug(title, self.anchors)
+
+    def postings(self):
+        """
+        Returns (terms, headings). headings is a list of [anchor, title];
+        the text after the n-th heading is section n + 1, the text before
+        the first one section 0. terms maps every lowercased word to where
+        it occurs, as a flat [section, offset, section, offset, ...] list,
+        offset counting the words of the section from 0 (a heading's own
+        title starts its section). Counting per section keeps an edit from
+        moving the words of the rest of the page.
+        """
+        terms = {}
+        headings = []
+        anchors = set()
+        section = 0
+        offset = 0
+
+        def index(text):
+            nonlocal offset
+            for word in _WORD.findall(text.lower()):
+                terms.setdefault(word, []).extend((section, offset))
+                offset += 1
+
+        run = []
+        for piece in self.pieces:
+            if isinstance(piece, str):
+                run.append(piece)
+                continue
+            index("".join(run))
+            run = []
+            _, title = piece
+            headings.append([unique_slug(title, anchors), title])
+            section = len(headings)
+            offset = 0
+            index(title)
+        index("".join(run))
+        return terms, headings
+
+
+def _write_if_changed(path, text):
+    """
+    Writes text to path atomically unless the file already holds exactly
+    that text. Returns "added", "changed" or "unchanged".
+    """
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as existing_file:
+            if existing_file.read() == text:
+                return "unchanged"
+        status = "changed"
+    else:
+        status = "added"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as index_file:
+            index_file.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return status
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+
+
+class SearchResult():
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.removed = []
+
+    def summary(self):
+        return (f"{len(self.added)} added, {len(self.changed)} changed, {len(self.unchanged)} unchanged, "
+                f"{len(self.removed)} removed")
+
+
+class SearchIndex():
+    """
+    An inverted index of words to the pages they occur on, written as
+    static JSON under search/ for a client-side search box:
+
+      - search/index.json lists the shard file of every word prefix (the
+        first PREFIX_LENGTH characters), so a query only fetches the
+        shards of its own words
+      - search/pages.json maps page ids to [url, title, headings], each
+        heading being [anchor, title]
+      - each shard maps its words to [page_id, section, offset, section,
+        offset, ...] lists, section n > 0 being the text under the page's
+        n-th heading (see PageText.postings); offsets count words, so
+        phrases can be matched
+
+    URLs are root-relative, without the base path, for pages rendered into
+    destination. The postings of every page are kept in state_path, so a
+    build only tokenizes the pages it rendered and only rewrites the shards
+    whose words they touched.
+    """
+
+    def __init__(self, destination, state_path=None):
+        self.destination = destination
+        self.state_path = state_path
+        self.pages = {}
+        self.next_id = 0
+        if state_path is not None and os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+            if state.get("version") == INDEX_VERSION:
+                self.pages = state["pages"]
+                self.next_id = state["next_id"]
+        self.dirty = set()
+        self.pages_changed = False
+
+    def has_page(self, markdown_path):
+        return markdown_path in self.pages
+
+    def _touch(self, terms):
+        self.dirty.update(term[:PREFIX_LENGTH] for term in terms)
+
+    def update_page(self, markdown_path, output_path, pieces):
+        """
+        Replaces the postings of a page with those of its freshly parsed
+        text (PageText.pieces). The first level 1 heading is the page's
+        title in results, or else the markdown file's name.
+        """
+        terms, headings = PageText(pieces).postings()
+        url = page_url_for(os.path.relpath(output_path, self.destination))
+        title = os.path.basename(markdown_path).replace(".md", "")
+        for piece in pieces:
+            if not isinstance(piece, str) and piece[0] == 1:
+                title = piece[1]
+                break
+        previous = self.pages.get(markdown_path)
+        if previous is None:
+            page_id = self.next_id
+            self.next_id += 1
+        else:
+            page_id = previous["id"]
+            if (previous["terms"], previous["url"], previous["title"], previous["headings"]) == \
+                    (terms, url, title, headings):
+                return
+            # Words the page lost, or whose positions moved
+            self._touch(term for term, positions in previous["terms"].items() if terms.get(term) != positions)
+        self._touch(term for term, positions in terms.items()
+                    if previous is None or previous["terms"].get(term) != positions)
+        self.pages_changed = True
+        self.pages[markdown_path] = {"id": page_id, "url": url, "title": title, "headings": headings,
+                                     "terms": terms}
+
+    def retain(self, markdown_paths):
+        """
+        Drops pages whose markdown no longer exists.
+        """
+        keep = set(markdown_paths)
+        for markdown_path in list(self.pages):
+            if markdown_path not in keep:
+                self._touch(self.pages.pop(markdown_path)["terms"])
+                self.pages_changed = True
+
+    def prefixes(self):
+        return sorted({term[:PREFIX_LENGTH] for page in self.pages.values() for term in page["terms"]})
+
+    def _shards(self, prefixes):
+        shards = {prefix: {} for prefix in prefixes}
+        for page in sorted(self.pages.values(), key=lambda page: page["id"]):
+            for term, positions in page["terms"].items():
+                shard = shards.get(term[:PREFIX_LENGTH])
+                if shard is not None:
+                    shard.setdefault(term, []).append([page["id"]] + positions)
+        return shards
+
+    def write(self, output_dir):
+        """
+        Writes the index under output_dir/search, rewriting only the shards
+        touched since the last build plus any that are missing, and deletes
+        shards no word maps to any more. Can be called for several output
+        directories. Returns a SearchResult of paths relative to output_dir.
+        """
+        result = SearchResult()
+        index_dir = os.path.join(output_dir, INDEX_DIR)
+        prefixes = self.prefixes()
+        names = {prefix: shard_name(prefix) for prefix in prefixes}
+        wanted = [prefix for prefix in prefixes
+                  if prefix in self.dirty or not os.path.exists(os.path.join(index_dir, names[prefix]))]
+
+        files = {"index.json": _dumps({"version": INDEX_VERSION, "prefix_length": PREFIX_LENGTH, "shards": names})}
+        if self.pages_changed or not os.path.exists(os.path.join(index_dir, "pages.json")):
+            files["pages.json"] = _dumps({str(page["id"]): [page["url"], page["title"], page["headings"]]
+                                          for page in self.pages.values()})
+        for prefix, shard in self._shards(wanted).items():
+            files[names[prefix]] = _dumps(shard)
+
+        for name, text in sorted(files.items()):
+            status = _write_if_changed(os.path.join(index_dir, name), text)
+            getattr(result, status).append(f"{INDEX_DIR}/{name}")
+
+        if os.path.isdir(index_dir):
+            expected = set(names.values()) | {"index.json", "pages.json"}
+            for name in sorted(os.listdir(index_dir)):
+                if name.endswith(".json") and name not in expected:
+                    os.remove(os.path.join(index_dir, name))
+                    log.info("Removed stale search shard: %s", name)
+                    result.removed.append(f"{INDEX_DIR}/{name}")
+        return result
+
+    def save(self):
+        """
+        Saves the postings and forgets what was touched, once every output
+        directory has been written.
+        """
+        self.dirty = set()
+        self.pages_changed = False
+        if self.state_path is None:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump({"version": INDEX_VERSION, "next_id": self.next_id, "pages": self.pages}, state_file)
+        os.replace(tmp_path, self.state_path)
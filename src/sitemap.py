@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from buildlog import log
+from htmlnode import write_chunks
+
+# The most URLs the sitemap protocol allows in one file
+SHARD_SIZE = 50000
+FEED_ITEMS = 20
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+
+
+def _datetime(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc).replace(microsecond=0)
+
+
+def w3c_datetime(mtime_ns):
+    """
+    Returns "2024-05-01T12:30:00+00:00", for sitemaps and Atom.
+    """
+    return _datetime(mtime_ns).isoformat()
+
+
+def rfc822_datetime(mtime_ns):
+    """
+    Returns "Wed, 01 May 2024 12:30:00 +0000", for RSS.
+    """
+    return format_datetime(_datetime(mtime_ns))
+
+
+def date_ns(date):
+    """
+    Returns a front matter date ("2024-05-01", optionally with a time) as
+    nanoseconds since the epoch, read as UTC, or None.
+    """
+    if not date:
+        return None
+    try:
+        parsed = datetime.fromisoformat(date)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp()) * 10**9
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value).encode("utf-8")).hexdigest()
+
+
+def _write_stream(path, chunks):
+    """
+    Streams an iterable of strings to path atomically.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as output_file:
+            write_chunks(output_file, chunks)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SitemapWriter():
+    """
+    Writes sitemap.xml and feeds for the pages of a pageindex.PageIndex
+    into one output directory, with absolute URLs made of site_url and
+    base_path. lastmod is when a page's output last changed, as recorded
+    by the outputwriter.OutputWriter that wrote it.
+
+    Files are streamed to disk, so no sitemap is ever held in memory. Each
+    file's entries are hashed first, and a file is only written when that
+    hash differs from the one recorded in state_path at the last build.
+    Sitemap shards are hashed in one pass over the entries and a changed
+    shard is rendered straight from them, so no list of a shard's URLs is
+    built; what stays in memory is the page index and the URL-to-shard
+    assignment.
+    Pages keep the sitemap shard they were first put in, and new pages go
+    to the first shard with room, so adding or changing a page rewrites
+    its own shard and the sitemap index rather than every shard after it.
+    """
+
+    def __init__(self, destination, base_path, site_url, state_path=None, shard_size=SHARD_SIZE):
+        self.destination = destination
+        self.prefix = site_url.rstrip("/") + base_path.rstrip("/")
+        self.state_path = state_path
+        self.shard_size = shard_size
+        self.shards = {}
+        self.digests = {}
+        if state_path is not None and os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+            if state.get("destination") == os.path.abspath(destination) and state.get("prefix") == self.prefix:
+                self.shards = state["shards"]
+                self.digests = state["digests"]
+        self.written = {}
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.removed = []
+
+    def _write(self, relative, digest, render):
+        """
+        Writes the chunks of render() to relative unless digest, the hash
+        of its entries, is the same as last time and the file is still
+        there.
+        """
+        path = os.path.join(self.destination, relative)
+        self.written[relative] = digest
+        exists = os.path.exists(path)
+        if exists and self.digests.get(relative) == digest:
+            self.unchanged.append(relative)
+            return
+        _write_stream(path, render())
+        log.info("Wrote %s", relative)
+        (self.changed if exists else self.added).append(relative)
+
+    def _assign_shards(self, urls):
+        shards = {}
+        counts = {}
+        new = []
+        for url in urls:
+            shard = self.shards.get(url)
+            if shard is None:
+                new.append(url)
+                continue
+            shards[url] = shard
+            counts[shard] = counts.get(shard, 0) + 1
+        shard = 1
+        for url in new:
+            while counts.get(shard, 0) >= self.shard_size:
+                shard += 1
+            shards[url] = shard
+            counts[shard] = counts.get(shard, 0) + 1
+        self.shards = shards
+
+    def _shard_urls(self, entries, shard, modified_ns):
+        for entry in entries:
+            if self.shards[entry["url"]] == shard:
+                yield self.prefix + entry["url"], modified_ns(entry["output"])
+
+    def write_sitemaps(self, entries, modified_ns):
+        """
+        Writes sitemap-<n>.xml shards of up to shard_size URLs and the
+        sitemap.xml index listing them. entries are PageIndex entries, and
+        are iterated more than once; modified_ns(output) returns an
+        output's last change.
+        """
+        self._assign_shards(entry["url"] for entry in entries)
+        hashes = {}
+        lastmods = {}
+        for entry in entries:
+            shard = self.shards[entry["url"]]
+            mtime_ns = modified_ns(entry["output"])
+            if shard not in hashes:
+                hashes[shard] = hashlib.sha256()
+            hashes[shard].update(json.dumps([self.prefix + entry["url"], mtime_ns]).encode("utf-8") + b"\n")
+            if mtime_ns is not None:
+                lastmods[shard] = max(lastmods.get(shard, mtime_ns), mtime_ns)
+
+        index = []
+        for shard in sorted(hashes):
+            name = f"sitemap-{shard}.xml"
+            self._write(name, hashes[shard].hexdigest(),
+                        lambda shard=shard: self._render_urlset(self._shard_urls(entries, shard, modified_ns)))
+            index.append([f"{self.prefix}/{name}", lastmods.get(shard)])
+        self._write("sitemap.xml", _digest(index), lambda: self._render_index(index))
+
+    def _render_urlset(self, urls):
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+        for url, mtime_ns in urls:
+            yield f"  <url><loc>{escape(url)}</loc>"
+            if mtime_ns is not None:
+                yield f"<lastmod>{w3c_datetime(mtime_ns)}</lastmod>"
+            yield "</url>\n"
+        yield "</urlset>\n"
+
+    def _render_index(self, sitemaps):
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n'
+        for url, mtime_ns in sitemaps:
+            yield f"  <sitemap><loc>{escape(url)}</loc>"
+            if mtime_ns is not None:
+                yield f"<lastmod>{w3c_datetime(mtime_ns)}</lastmod>"
+            yield "</sitemap>\n"
+        yield "</sitemapindex>\n"
+
+    def write_feeds(self, entries, modified_ns, section="blog", title=None, limit=FEED_ITEMS):
+        """
+        Writes <section>/feed.xml (RSS 2.0) and <section>/atom.xml (Atom)
+        with the newest pages under /<section>/: by their date when they
+        have one, else by when they last changed. Summaries become the item
+        descriptions. The section's own index page gives the feed its
+        title. No feeds are written for a section without pages.
+        """
+        section_url = f"/{section}/"
+        if not any(entry["url"].startswith(section_url) for entry in entries):
+            return
+        items = []
+        for entry in entries:
+            if entry["url"] == section_url:
+                title = title or entry["title"]
+            elif entry["url"].startswith(section_url):
+                mtime_ns = modified_ns(entry["output"])
+                if mtime_ns is not None:
+                    published_ns = date_ns(entry.get("date")) or mtime_ns
+                    items.append([self.prefix + entry["url"], entry["title"], entry.get("summary") or "",
+                                  published_ns, mtime_ns])
+        items.sort(key=lambda item: (-item[3], item[0]))
+        feed = [self.prefix + section_url, title or section.capitalize(), items[:limit]]
+        digest = _digest(feed)
+        self._write(f"{section}/feed.xml", digest, lambda: self._render_rss(feed))
+        self._write(f"{section}/atom.xml", digest, lambda: self._render_atom(feed))
+
+    def _render_rss(self, feed):
+        link, title, items = feed
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               f'<rss version="2.0" xmlns:atom="{ATOM_NAMESPACE}">\n<channel>\n'
+               f"  <title>{escape(title)}</title>\n  <link>{escape(link)}</link>\n"
+               f"  <description>{escape(title)}</description>\n"
+               f'  <atom:link href="{escape(link)}feed.xml" rel="self" type="application/rss+xml"/>\n')
+        if items:
+            yield f"  <lastBuildDate>{rfc822_datetime(max(item[4] for item in items))}</lastBuildDate>\n"
+        for url, item_title, summary, published_ns, _ in items:
+            yield (f"  <item><title>{escape(item_title)}</title><link>{escape(url)}</link>"
+                   f'<guid isPermaLink="true">{escape(url)}</guid>')
+            if summary:
+                yield f"<description>{escape(summary)}</description>"
+            yield f"<pubDate>{rfc822_datetime(published_ns)}</pubDate></item>\n"
+        yield "</channel>\n</rss>\n"
+
+    def _render_atom(self, feed):
+        link, title, items = feed
+        updated = w3c_datetime(max(item[4] for item in items)) if items else "1970-01-01T00:00:00+00:00"
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               f'<feed xmlns="{ATOM_NAMESPACE}">\n'
+               f"  <title>{escape(title)}</title>\n  <id>{escape(link)}</id>\n"
+               f'  <link href="{escape(link)}"/>\n  <link href="{escape(link)}atom.xml" rel="self"/>\n'
+               f"  <updated>{updated}</updated>\n  <author><name>{escape(title)}</name></author>\n")
+        for url, item_title, summary, published_ns, mtime_ns in items:
+            yield (f"  <entry><title>{escape(item_title)}</title><id>{escape(url)}</id>"
+                   f'<link href="{escape(url)}"/><published>{w3c_datetime(published_ns)}</published>'
+                   f"<updated>{w3c_datetime(mtime_ns)}</updated>")
+            if summary:
+                yield f"<summary>{escape(summary)}</summary>"
+            yield "</entry>\n"
+        yield "</feed>\n"
+
+    def finish(self):
+        """
+        Deletes sitemap shards and feeds written at the last build but not
+        this time, and saves the state.
+        """
+        for relative in sorted(set(self.digests) - set(self.written)):
+            try:
+                os.remove(os.path.join(self.destination, relative))
+                log.info("Removed stale file: %s", relative)
+            except FileNotFoundError:
+                pass
+            self.removed.append(relative)
+        self.digests = self.written
+        if self.state_path is not None:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as state_file:
+                json.dump({"destination": os.path.abspath(self.destination), "prefix": self.prefix,
+                           "shards": self.shards, "digests": self.digests}, state_file)
+            os.replace(tmp_path, self.state_path)
+
+    def summary(self):
+        return (f"{len(self.added)} added, {len(self.changed)} changed, {len(self.unchanged)} unchanged, "
+                f"{len(self.removed)} removed")
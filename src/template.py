@@ -0,0 +1,265 @@
+import hashlib
+import os
+import re
+import types
+
+import minify
+
+# {{ Name }}, {{ item.field }}, {{> partial }}, {% for item in Items %}, {% endfor %}
+TAG_PATTERN = re.compile(
+    r"\{\{\s*(?P<partial>>)?\s*(?P<name>[\w.]+)\s*\}\}"
+    r"|\{%\s*(?:for\s+(?P<loop_var>\w+)\s+in\s+(?P<loop_items>[\w.]+)|(?P<endfor>endfor))\s*%\}"
+)
+
+
+class TemplateError(Exception):
+    pass
+
+
+ROOT_URL_PATTERN = re.compile(r'\b(href|src)="/(?!/)([^"]*)"')
+
+
+def rewrite_root_urls(text, base_path, assets=None, used=None):
+    """
+    Points root-relative href and src attributes at the base path. With a
+    fingerprint.AssetManifest, asset URLs are replaced by their fingerprinted
+    form and the source files of those assets are added to used.
+    """
+    if assets is not None:
+        def replace(match):
+            url = "/" + match.group(2)
+            found = assets.lookup(url)
+            if found is not None:
+                url, source_path = found
+                if used is not None:
+                    used.add(source_path)
+            return f'{match.group(1)}="{base_path}{url[1:]}"'
+        return ROOT_URL_PATTERN.sub(replace, text)
+    if base_path == "/":
+        return text
+    text = text.replace('href="/', f'href="{base_path}')
+    return text.replace('src="/', f'src="{base_path}')
+
+
+def _lookup(context, name):
+    value = context
+    for part in name.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, "")
+        else:
+            value = getattr(value, part, "")
+    return value
+
+
+class CompiledTemplate():
+    """
+    A template pre-split into a flat list of segments:
+      - str: literal text, already rewritten for the base path
+      - ("var", name): a placeholder filled from the render context
+      - ("loop", var, items, body): body repeated for every entry in items
+
+    Filling a page walks the segments once and joins the pieces, instead of
+    copying the whole document for every placeholder.
+    """
+
+    def __init__(self, segments, key, files, assets=()):
+        self.segments = segments
+        self.key = key
+        self.files = files
+        # Source files of the fingerprinted assets the template links to
+        self.assets = list(assets)
+
+    def render(self, context):
+        return "".join(self.iter_render(context))
+
+    def iter_render(self, context):
+        """
+        Yields the filled template in chunks. A context value that is an
+        HTMLNode or a generator of strings is streamed rather than joined.
+        """
+        return self._iter_segments(self.segments, context)
+
+    def _iter_segments(self, segments, context):
+        for segment in segments:
+            if isinstance(segment, str):
+                yield segment
+            elif segment[0] == "var":
+                value = _lookup(context, segment[1])
+                if isinstance(value, str):
+                    yield value
+                elif hasattr(value, "iter_html"):
+                    yield from value.iter_html()
+                elif isinstance(value, types.GeneratorType):
+                    yield from value
+                else:
+                    yield str(value)
+            else:
+                _, var, items, body = segment
+                for item in _lookup(context, items) or ():
+                    yield from self._iter_segments(body, {**context, var: item})
+
+
+class TemplateLoader():
+    """
+    Compiles templates once per build and hands out the compiled form.
+
+    Partials live in partials_dir and are inlined with {{> name }} at compile
+    time, so they are read and rendered once. Per-directory layouts live in
+    layouts_dir: a page under content/blog/tom uses layouts/blog/tom.html,
+    then layouts/blog.html, falling back to the default template. A compiled
+    template is recompiled when any file it was built from has a newer mtime.
+    """
+
+    def __init__(self, template_path, layouts_dir=None, partials_dir=None):
+        root = os.path.dirname(template_path)
+        self.template_path = template_path
+        self.layouts_dir = layouts_dir if layouts_dir is not None else os.path.join(root, "layouts")
+        self.partials_dir = partials_dir if partials_dir is not None else os.path.join(root, "partials")
+        self._compiled = {}
+        self._layouts = {}
+
+    def layout_for(self, relative_dir):
+        """
+        Returns the template path that applies to pages in relative_dir.
+        """
+        if relative_dir in self._layouts:
+            return self._layouts[relative_dir]
+
+        path = self.template_path
+        for candidate in self.layout_candidates(relative_dir):
+            if os.path.isfile(candidate):
+                path = candidate
+                break
+        self._layouts[relative_dir] = path
+        return path
+
+    def layout_candidates(self, relative_dir):
+        """
+        Returns the layout paths checked for relative_dir, most specific first.
+        """
+        parts = [part for part in relative_dir.replace(os.sep, "/").split("/") if part and part != "."]
+        candidates = []
+        while parts:
+            candidates.append(os.path.join(self.layouts_dir, *parts) + ".html")
+            parts.pop()
+        return candidates
+
+    def get(self, base_path, relative_dir="", assets=None):
+        path = self.layout_for(relative_dir)
+        cache_key = (path, base_path, assets.key if assets is not None else None, minify.enabled())
+        entry = self._compiled.get(cache_key)
+        if entry is not None and not self._is_stale(entry):
+            return entry
+        entry = self.compile(path, base_path, assets)
+        self._compiled[cache_key] = entry
+        return entry
+
+    def reset(self):
+        self._compiled.clear()
+        self._layouts.clear()
+
+    def _is_stale(self, compiled):
+        for path, mtime in compiled.files.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
+
+    def compile(self, path, base_path, assets=None):
+        files = {}
+        digest = hashlib.sha256()
+        used = set()
+        if assets is not None:
+            digest.update(assets.key.encode("utf-8") + b"\0")
+        segments = self._compile_file(path, base_path, files, digest, (), assets, used)
+        if minify.enabled():
+            digest.update(b"minify\0")
+            segments = _minify_segments(segments, minify.HtmlMinifier())
+        return CompiledTemplate(segments, digest.hexdigest(), files, sorted(used))
+
+    def _compile_file(self, path, base_path, files, digest, including, assets=None, used=None):
+        if path in including:
+            raise TemplateError(f"Partial includes itself: {path}")
+        with open(path, "r") as template_file:
+            source = template_file.read()
+        files[path] = os.stat(path).st_mtime_ns
+        digest.update(path.encode("utf-8") + b"\0" + source.encode("utf-8") + b"\0")
+
+        # Each entry on the stack is the segment list currently being filled
+        stack = [[]]
+        loops = []
+        position = 0
+        for match in TAG_PATTERN.finditer(source):
+            self._append_literal(stack[-1], rewrite_root_urls(source[position:match.start()], base_path, assets, used))
+            position = match.end()
+
+            if match.group("partial"):
+                partial_path = os.path.join(self.partials_dir, match.group("name") + ".html")
+                if not os.path.isfile(partial_path):
+                    raise TemplateError(f"Unknown partial '{match.group('name')}' in {path}")
+                for segment in self._compile_file(partial_path, base_path, files, digest, including + (path,),
+                                                  assets, used):
+                    if isinstance(segment, str):
+                        self._append_literal(stack[-1], segment)
+                    else:
+                        stack[-1].append(segment)
+            elif match.group("name"):
+                stack[-1].append(("var", match.group("name")))
+            elif match.group("loop_var"):
+                loops.append((match.group("loop_var"), match.group("loop_items")))
+                stack.append([])
+            else:
+                if not loops:
+                    raise TemplateError(f"Unexpected endfor in {path}")
+                var, items = loops.pop()
+                body = stack.pop()
+                stack[-1].append(("loop", var, items, body))
+
+        if loops:
+            raise TemplateError(f"Unclosed for loop over '{loops[-1][1]}' in {path}")
+        self._append_literal(stack[-1], rewrite_root_urls(source[position:], base_path, assets, used))
+        return stack[0]
+
+    def _append_literal(self, segments, text):
+        if not text:
+            return
+        if segments and isinstance(segments[-1], str):
+            segments[-1] += text
+        else:
+            segments.append(text)
+
+
+def _minify_segments(segments, minifier):
+    """
+    Minifies the literal segments of a compiled template in document order,
+    loop bodies included, so the minifier sees tags cut by placeholders.
+    """
+    minified = []
+    for segment in segments:
+        if isinstance(segment, str):
+            segment = minifier.feed(segment)
+            if segment:
+                minified.append(segment)
+        elif segment[0] == "loop":
+            _, var, items, body = segment
+            minified.append(("loop", var, items, _minify_segments(body, minifier)))
+        else:
+            minified.append(segment)
+    return minified
+
+
+_loaders = {}
+
+
+def get_loader(template_path):
+    """
+    Returns the process-wide loader for a template, so repeated calls to
+    generate_page reuse the compiled form.
+    """
+    loader = _loaders.get(template_path)
+    if loader is None:
+        loader = TemplateLoader(template_path)
+        _loaders[template_path] = loader
+    return loader
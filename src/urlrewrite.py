@@ -0,0 +1,162 @@
+import os
+import posixpath
+import re
+
+import minify
+from extractmarkdown import IMAGE_PATTERN
+
+# "https:", "mailto:", "data:" ... and protocol-relative "//host" URLs are
+# left exactly as written
+EXTERNAL_URL = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//)")
+
+
+def page_url_for(relative_output_path):
+    """
+    Returns the site URL of an output file given its path relative to the
+    output directory: "blog/tom/index.html" -> "/blog/tom/".
+    """
+    url = "/" + relative_output_path.replace(os.sep, "/")
+    if url.endswith("/index.html"):
+        url = url[:-len("index.html")]
+    return url
+
+
+class UrlRewriter():
+    """
+    Rewrites link and image URLs while the HTMLNode tree is built, instead of
+    patching the finished HTML.
+
+    - Root-relative URLs ("/blog/tom") get the base path prefixed.
+    - Relative URLs ("../tom", "./photo.png") are resolved against the
+      page's own URL, then prefixed.
+    - A bare image filename ("tom.png") that does not exist next to the
+      page's markdown is mapped into image_dir ("/images/tom.png").
+    - External URLs and fragment-only links are left alone.
+    - With a fingerprint.AssetManifest, asset URLs get their fingerprinted
+      name ("/images/tom.png" -> "/images/tom.3f2a9c1b0e.png").
+
+    Every site URL it rewrites is recorded, root-relative and without the
+    base path, in images and links; the dependency graph uses them. Linked
+    fingerprinted assets are recorded with the images, since their files
+    decide the URL just like an image's.
+    page_relative is set once a URL needed the page's own location, so
+    callers can tell output that is only valid for this page. Whether a
+    bare image name exists next to the page is looked up once and kept in
+    probes; probe_images does this for a whole page up front, so the
+    results are part of its signature before any cache lookup.
+
+    sizer, an imagesize.ImageSizer, is carried along for the image nodes;
+    image_index counts the images of the page built so far. text, a
+    searchindex.PageText, collects the page's plain text for the search
+    index.
+    """
+
+    def __init__(self, base_path="/", page_url="/", source_dir=None, image_dir="/images/", assets=None,
+                 sizer=None, text=None):
+        self.base_path = base_path if base_path.endswith("/") else base_path + "/"
+        self.page_url = page_url
+        self.page_dir = page_url if page_url.endswith("/") else posixpath.dirname(page_url).rstrip("/") + "/"
+        self.source_dir = source_dir
+        self.image_dir = image_dir
+        self.assets = assets
+        self.sizer = sizer
+        self.text = text
+        self.image_index = 0
+        self.images = []
+        self.links = []
+        self.page_relative = False
+        self.probes = {}
+
+    def signature(self, include_page=True):
+        """
+        Identifies everything besides the markdown that influences the
+        rendered HTML (URL settings, asset names, image sizes, minification,
+        heading anchors, which bare image names exist next to the page),
+        for use in cache keys. Without include_page it only covers what is
+        the same for every page of a build.
+        """
+        shared = f"{self.base_path}\0{self.image_dir}"
+        if minify.enabled():
+            shared += "\0minify"
+        if self.assets is not None:
+            shared += f"\0{self.assets.key}"
+        if self.sizer is not None:
+            shared += f"\0{self.sizer.key}"
+        if self.text is not None:
+            shared += "\0search"
+        if not include_page:
+            return shared
+        probes = "".join(f"\0{name}={int(found)}" for name, found in sorted(self.probes.items()))
+        return f"{shared}\0{self.page_url}{probes}"
+
+    def probe_images(self, markdown):
+        """
+        Looks up every bare image name in markdown next to the page.
+        """
+        if self.image_dir and self.source_dir is not None:
+            for _, url in IMAGE_PATTERN.findall(markdown):
+                if url and "/" not in url and not url.startswith("#") and not EXTERNAL_URL.match(url):
+                    self._exists_next_to_page(url)
+
+    def absolute(self, url):
+        """
+        Resolves a relative URL against the page, returning a root-relative one.
+        """
+        path, separator, suffix = _split_suffix(url)
+        resolved = posixpath.normpath(posixpath.join(self.page_dir, path))
+        if path.endswith("/") and not resolved.endswith("/"):
+            resolved += "/"
+        return resolved + separator + suffix
+
+    def rewrite(self, url, kind="link"):
+        if not url or url.startswith("#") or EXTERNAL_URL.match(url):
+            return url
+        if kind == "image" and self.image_dir and "/" not in url:
+            self.page_relative = True
+            if not self._exists_next_to_page(url):
+                url = self.image_dir + url
+        if not url.startswith("/"):
+            self.page_relative = True
+            url = self.absolute(url)
+        if self.assets is not None:
+            found = self.assets.lookup(url)
+            if found is not None:
+                self.images.append(url)
+                return self.base_path + found[0][1:]
+        (self.images if kind == "image" else self.links).append(url)
+        return self.base_path + url[1:]
+
+    def references(self):
+        """
+        Returns the recorded URLs as {"images": [...], "links": [...]},
+        with "absent": the files bare image names were looked for next to
+        the page and not found, which would change the page by appearing.
+        """
+        absent = [os.path.join(self.source_dir, name) for name, found in self.probes.items() if not found]
+        return {"images": sorted(set(self.images)), "links": sorted(set(self.links)), "absent": sorted(absent)}
+
+    def rewrite_link(self, url):
+        return self.rewrite(url, "link")
+
+    def rewrite_image(self, url):
+        return self.rewrite(url, "image")
+
+    def _exists_next_to_page(self, name):
+        if self.source_dir is None:
+            return False
+        path, _, _ = _split_suffix(name)
+        if path not in self.probes:
+            self.probes[path] = os.path.isfile(os.path.join(self.source_dir, path))
+        return self.probes[path]
+
+
+def _split_suffix(url):
+    """
+    Splits "path?query#fragment" into (path, separator, rest) at whichever
+    of "?" and "#" comes first, so a "?" inside the fragment stays in it.
+    """
+    indexes = [index for index in (url.find("?"), url.find("#")) if index != -1]
+    if not indexes:
+        return url, "", ""
+    index = min(indexes)
+    return url[:index], url[index], url[index + 1:]
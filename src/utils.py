@@ -1,38 +1,19 @@
+import json
 import os
-import re
-import shutil
-from pathlib import Path
+import traceback
+from html import escape
 from markdowntohtmlnode import markdown_to_html_node
-from bs4 import BeautifulSoup
-import markdown
-
-
-def copy_directory_recursive(source, destination):
-    """
-    Recursively copies all contents from the source directory to the destination directory.
-    Clears the destination directory before copying.
-    Logs each file and directory being copied.
-    """
-    # Step 1: Ensure the destination directory is clean
-    if os.path.exists(destination):
-        print(f"Deleting contents of destination directory: {destination}")
-        shutil.rmtree(destination)  # Remove all contents of the destination directory
-    os.mkdir(destination)  # Recreate the destination directory
-
-    # Step 2: Recursively copy contents from source to destination
-    for item in os.listdir(source):
-        source_item = os.path.join(source, item)
-        destination_item = os.path.join(destination, item)
-
-        if os.path.isfile(source_item):
-            # Copy file and log the action
-            shutil.copy(source_item, destination_item)
-            print(f"Copied file: {source_item} -> {destination_item}")
-        elif os.path.isdir(source_item):
-            # Recursively copy subdirectory
-            print(f"Entering directory: {source_item}")
-            copy_directory_recursive(source_item, destination_item)
-
+from blocklexer import lex_page
+from frontmatter import page_metadata
+from template import get_loader
+from urlrewrite import UrlRewriter, page_url_for
+from htmlnode import write_chunks
+from buildlog import current_file, log
+import fingerprint
+import imagesize
+import profiler
+import searchindex
+from parallelrender import render_pages_parallel
 
 
 def extract_title(markdown):
@@ -60,34 +41,15 @@ def extract_title(markdown):
 
 
 
-def adjust_image_paths(html_content):
+def discover_pages(dir_path_content, dest_dir_path):
     """
-    Adjusts all image paths in the HTML to be absolute paths starting with /images/.
-
-    Args:
-        html_content (str): The HTML content.
-
-    Returns:
-        str: HTML content with updated image paths.
-    """
-    soup = BeautifulSoup(html_content, "html.parser")
-    for img in soup.find_all("img"):
-        src = img.get("src")
-        if src and not src.startswith("/images/"):
-            # Ensure images point to /images/ directory
-            filename = os.path.basename(src)  # Extract the image filename
-            img["src"] = f"/images/{filename}"  # Convert to absolute path
-
-    return str(soup)
-
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, base_path):
-    """
-    Recursively generates HTML pages for all Markdown files in the content directory.
-    The generated pages are written to the docs directory, maintaining the directory structure.
+    Walks the content directory and returns (markdown_path, output_path)
+    pairs for every Markdown file, in a stable order.
     """
+    pages = []
     for root, dirs, files in os.walk(dir_path_content):
-        for file in files:
+        dirs.sort()
+        for file in sorted(files):
             if file.endswith(".md"):  # Process only Markdown files
                 # Full path to the Markdown file
                 markdown_path = os.path.join(root, file)
@@ -100,41 +62,279 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
                 
                 # Full path to the output HTML file in the docs directory
                 output_path = os.path.join(dest_dir_path, output_file)
-                
-                # Ensure the destination directory exists
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                
-                # Generate the HTML page with the base path
-                print(f"Generating page for {markdown_path} -> {output_path}")
-                generate_page(markdown_path, template_path, output_path, base_path)
+                pages.append((markdown_path, output_path))
+    return pages
+
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, base_path, cache=None, jobs=1,
+                             graph=None, explain=False, writer=None, search=None, page_index=None, listings=None,
+                             pipeline=None):
+    """
+    Recursively generates HTML pages for all Markdown files in the content directory.
+    The generated pages are written to the docs directory, maintaining the directory structure.
+
+    All pages are discovered first. With a DependencyGraph, pages whose
+    recorded inputs are all unchanged are skipped, and with explain the
+    reason for every rebuild is printed. With jobs > 1 the remaining pages
+    are rendered on a process pool, and otherwise with a pipeline.Pipeline,
+    when given, which reads and writes other pages while each renders. A
+    page that fails to render does not stop the build; the failures are
+    returned as a list of (markdown_path, error) pairs.
 
+    With an outputwriter.OutputWriter, pages are only replaced when their
+    bytes changed, and outputs of markdown files that no longer exist are
+    deleted once every page has been rendered.
 
-def generate_page(content_path, template_path, output_path, base_path):
+    With a searchindex.SearchIndex, the text of every rendered page replaces
+    its postings there, and with a pageindex.PageIndex its metadata. Pages
+    either index does not know yet are rendered even when they are up to
+    date. With a listings.ListingGenerator as well, the section listings
+    are then generated from the page index; their failures are returned
+    with the pages'.
+    """
+    pages = discover_pages(dir_path_content, dest_dir_path)
+    markdown_paths = [markdown_path for markdown_path, _ in pages]
+    output_paths = [output_path for _, output_path in pages]
+
+    if graph is not None:
+        graph.retain(markdown_paths)
+        stale = []
+        for markdown_path, output_path in pages:
+            reasons = graph.reasons(markdown_path, output_path)
+            if not reasons and writer is not None:
+                # Other targets' copies may be gone even if this one is not
+                reasons = [f"{path} is missing" for path in writer.missing_outputs(output_path)]
+            if not reasons and search is not None and not search.has_page(markdown_path):
+                reasons = ["not in the search index"]
+            if not reasons and page_index is not None and not page_index.has_page(markdown_path):
+                reasons = ["not in the page index"]
+            if reasons:
+                stale.append((markdown_path, output_path))
+                if explain:
+                    print(f"Rebuilding {markdown_path}: {'; '.join(reasons)}")
+        if explain or len(stale) < len(pages):
+            print(f"{len(pages) - len(stale)} of {len(pages)} pages are up to date")
+        pages = stale
+
+    # Ensure the destination directories exist
+    for output_dir in sorted({os.path.dirname(output_path) for _, output_path in pages}):
+        os.makedirs(output_dir, exist_ok=True)
+
+    if jobs > 1 and len(pages) > 1:
+        failures = render_pages_parallel(pages, template_path, base_path, cache, jobs, dir_path_content, graph,
+                                         writer, search, page_index)
+    elif pipeline is not None:
+        failures = pipeline.run(pages, template_path, base_path, cache, dir_path_content, graph, writer, search,
+                                page_index)
+    else:
+        failures = []
+        for markdown_path, output_path in pages:
+            # Generate the HTML page with the base path
+            log.info("Generating page for %s -> %s", markdown_path, output_path)
+            try:
+                with current_file(markdown_path):
+                    dependencies = generate_page(markdown_path, template_path, output_path, base_path, cache,
+                                                 dir_path_content, writer)
+            except Exception:
+                failures.append((markdown_path, traceback.format_exc()))
+                if graph is not None:
+                    graph.forget(markdown_path)
+                continue
+            if graph is not None:
+                graph.record(markdown_path, output_path, dependencies)
+            if search is not None:
+                search.update_page(markdown_path, output_path, dependencies["text"])
+            if page_index is not None:
+                page_index.update_page(markdown_path, output_path, dependencies["meta"])
+
+    if page_index is not None:
+        page_index.retain(markdown_paths)
+        if listings is not None:
+            with profiler.stage("listings"):
+                listing_paths, listing_failures = listings.generate(page_index, writer, output_paths)
+            output_paths += listing_paths
+            failures += listing_failures
+    if writer is not None:
+        writer.finish(output_paths)
+    if search is not None:
+        search.retain(markdown_paths)
+    return failures
+
+
+def generate_page(content_path, template_path, output_path, base_path, cache=None, content_dir=None, writer=None):
     """
     Generates an HTML page from a Markdown file using a template.
-    Replaces href="/ and src="/ with href="{BASEPATH}" and src="{BASEPATH}".
+    Link and image URLs are rewritten for base_path while the node tree is
+    built (see urlrewrite.UrlRewriter); relative ones are resolved against
+    the page's own URL.
+
+    The template is compiled once per process (see template.get_loader) and
+    picked per directory when content_dir is given and a matching layout
+    exists. When a RenderCache is given, the finished page is looked up by
+    the hash of its inputs first. If only the template or base path changed,
+    the cached content fragment is reused and only the template is re-applied.
+    Without a cache the page is streamed to the output file chunk by chunk.
+    With an outputwriter.OutputWriter the file is written atomically and
+    left untouched when its bytes did not change.
+
+    Returns the page's dependencies for depgraph.DependencyGraph.record.
+    They come with the page's metadata (see frontmatter.page_metadata),
+    under "meta", and while a search index is being built (see
+    searchindex.enable) its plain text, under "text".
+    """
+    with profiler.page(content_path):
+        markdown_content, template, rewriter, page, metadata, templates = _prepare_page(
+            content_path, template_path, base_path, content_dir)
+        # Titles are plain text; the metadata keeps them unescaped for the
+        # listings and feeds, which escape them in their own context
+        title = escape(metadata["title"])
+
+        if cache is None:
+            # Convert Markdown to HTML and stream the page straight to disk;
+            # serialization and template fill happen inside the write stage
+            html_node = markdown_to_html_node(markdown_content, rewriter, page)
+            with profiler.stage("write"):
+                chunks = template.iter_render({"Content": html_node.iter_html(), "Title": title})
+                if writer is not None:
+                    writer.write(output_path, chunks)
+                else:
+                    with open(output_path, "w") as output_file:
+                        write_chunks(output_file, chunks)
+            return _dependencies(rewriter.references(), templates, rewriter, metadata)
+
+        html_output, references = _render_cached(markdown_content, page, template, rewriter, title, base_path,
+                                                 cache)
+
+        # Write the output HTML file here
+        with profiler.stage("write"):
+            if writer is not None:
+                writer.write(output_path, [html_output])
+            else:
+                with open(output_path, "w") as output_file:
+                    output_file.write(html_output)
+        return _dependencies(references, templates, rewriter, metadata)
+
+
+def _dependencies(references, templates, rewriter, metadata):
+    dependencies = dict(references, templates=templates, meta=metadata)
+    if rewriter.text is not None:
+        dependencies["text"] = rewriter.text.pieces
+    return dependencies
+
+
+def render_page(content_path, template_path, base_path, cache=None, content_dir=None, markdown_content=None):
+    """
+    Renders a Markdown file exactly like generate_page but returns the
+    finished HTML, along with the page's dependencies, instead of writing
+    it, for callers that keep pages in memory. Callers that read the file
+    already pass its text as markdown_content.
+    """
+    with profiler.page(content_path):
+        markdown_content, template, rewriter, page, metadata, templates = _prepare_page(
+            content_path, template_path, base_path, content_dir, markdown_content)
+        title = escape(metadata["title"])
+        if cache is None:
+            html_node = markdown_to_html_node(markdown_content, rewriter, page)
+            with profiler.stage("to_html"):
+                html_content = html_node.to_html()
+            return (fill_template(template, html_content, title),
+                    _dependencies(rewriter.references(), templates, rewriter, metadata))
+        html_output, references = _render_cached(markdown_content, page, template, rewriter, title, base_path,
+                                                 cache)
+        return html_output, _dependencies(references, templates, rewriter, metadata)
+
+
+def _prepare_page(content_path, template_path, base_path, content_dir, markdown_content=None):
+    """
+    Reads (unless markdown_content is given) and lexes a page's markdown
+    and picks its template and URL rewriter. Also returns its metadata,
+    whose title is the front matter title, else the first h1, else the
+    file name, and the template files the page depends on: the layouts
+    that would take precedence if they existed, every file its template
+    was compiled from, and the fingerprinted assets the template links to.
     """
     # Read the Markdown content
-    with open(content_path, "r") as content_file:
-        markdown_content = content_file.read()
+    if markdown_content is None:
+        with profiler.stage("read"):
+            with open(content_path, "r") as content_file:
+                markdown_content = content_file.read()
+    # Front matter, title and blocks come from a single lexing pass
+    with profiler.stage("block_lexing"):
+        page = lex_page(markdown_content)
+    metadata = page_metadata(markdown_content, page, os.path.basename(content_path).replace(".md", ""))
 
-    # Read the template
-    with open(template_path, "r") as template_file:
-        template = template_file.read()
+    relative_dir = ""
+    relative_output = os.path.basename(content_path).replace(".md", ".html")
+    if content_dir is not None:
+        relative_dir = os.path.relpath(os.path.dirname(content_path), content_dir)
+        relative_output = os.path.relpath(content_path, content_dir).replace(".md", ".html")
+    assets = fingerprint.active()
+    text = searchindex.PageText() if searchindex.collecting() else None
+    rewriter = UrlRewriter(base_path, page_url_for(relative_output), os.path.dirname(content_path), assets=assets,
+                           sizer=imagesize.active(), text=text)
+    # Settles where bare image names point before any cache key is taken
+    rewriter.probe_images(markdown_content)
+    loader = get_loader(template_path)
+    template = loader.get(base_path, relative_dir, assets)
 
-    # Convert Markdown to HTML
-    from markdowntohtmlnode import markdown_to_html_node
-    html_node = markdown_to_html_node(markdown_content)
-    html_content = html_node.to_html()
+    templates = []
+    for candidate in loader.layout_candidates(relative_dir):
+        if candidate in template.files:
+            break
+        templates.append(candidate)
+    templates.extend(template.files)
+    templates.extend(template.assets)
+
+    return markdown_content, template, rewriter, page, metadata, templates
 
-    # Replace placeholders in the template
-    html_output = template.replace("{{ Content }}", html_content)
-    html_output = html_output.replace("{{ Title }}", os.path.basename(content_path).replace(".md", ""))
-    
-    # Replace href="/ and src="/ with the base path
-    html_output = html_output.replace('href="/', f'href="{base_path}')
-    html_output = html_output.replace('src="/', f'src="{base_path}')
 
-    # Write the output HTML file here
-    with open(output_path, "w") as output_file:
-        output_file.write(html_output)
\ No newline at end of file
+def _render_cached(markdown_content, page, template, rewriter, title, base_path, cache):
+    """
+    Renders through the cache. Returns the page and the URLs it references;
+    on a cache hit the references come from the "refs" entry stored next to
+    the fragment, since no markdown was parsed, and the text for the search
+    index is put back into the rewriter from the "text" entry.
+    """
+    fragment_key = cache.fragment_key(markdown_content, rewriter.signature())
+    page_key = cache.page_key(fragment_key, template.key, base_path, title)
+    html_output = cache.get("pages", page_key)
+    parsed = False
+    if html_output is None:
+        html_content = cache.get("fragments", fragment_key)
+        if html_content is None:
+            html_node = markdown_to_html_node(markdown_content, rewriter, page)
+            parsed = True
+            with profiler.stage("to_html"):
+                html_content = html_node.to_html()
+            cache.put("fragments", fragment_key, html_content)
+        html_output = fill_template(template, html_content, title)
+        cache.put("pages", page_key, html_output)
+
+    references = None
+    if not parsed:
+        cached = cache.get("refs", fragment_key)
+        cached_text = cache.get("text", fragment_key) if rewriter.text is not None else "[]"
+        if cached is not None and cached_text is not None:
+            references = json.loads(cached)
+            if rewriter.text is not None:
+                rewriter.text.pieces = json.loads(cached_text)
+        else:
+            # Evicted on its own; parse again just to record the URLs and text
+            markdown_to_html_node(markdown_content, rewriter, page)
+            parsed = True
+    if parsed:
+        references = rewriter.references()
+        cache.put("refs", fragment_key, json.dumps(references))
+        if rewriter.text is not None:
+            cache.put("text", fragment_key, json.dumps(rewriter.text.pieces))
+    return html_output, references
+
+
+def fill_template(template, html_content, title):
+    """
+    Fills a compiled template with the rendered content and title. The
+    template's URLs were rewritten when it was compiled and the content's
+    while its nodes were built, so no pass over the finished HTML is needed.
+    """
+    with profiler.stage("template_fill"):
+        return template.render({"Content": html_content, "Title": title})
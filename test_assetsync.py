@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from assetsync import sync_tree
+
+
+class TestAssetSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.manifest = os.path.join(self.tmp.name, "cache", "sync.json")
+        self.write(self.static, "index.css", "body {}")
+        self.write(self.static, "images/a.png", "png-a")
+        self.write(self.content, "index.md", "# Home")
+        self.write(self.content, "blog/photo.png", "photo")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, root, relative, text):
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def read(self, relative):
+        with open(os.path.join(self.docs, relative)) as f:
+            return f.read()
+
+    def sync(self, **kwargs):
+        sources = [(self.static, None), (self.content, lambda path: path.endswith(".md"))]
+        return sync_tree(sources, self.docs, self.manifest, **kwargs)
+
+    def test_first_sync_copies_everything_but_markdown(self):
+        result = self.sync()
+        self.assertEqual(sorted(result.copied), ["blog/photo.png", "images/a.png", "index.css"])
+        self.assertEqual(sorted(result.added), sorted(result.copied))
+        self.assertEqual(self.read("images/a.png"), "png-a")
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.md")))
+
+    def test_second_sync_copies_nothing(self):
+        self.sync()
+        result = self.sync()
+        self.assertEqual(result.copied, [])
+        self.assertEqual(len(result.unchanged), 3)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        path = self.write(self.static, "index.css", "body { color: red }")
+        os.utime(path, ns=(1, 1))
+        result = self.sync()
+        self.assertEqual(result.copied, ["index.css"])
+        self.assertEqual(result.added, [])
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_verify_hash_catches_same_size_and_mtime(self):
+        self.sync(verify_hash=True)
+        path = os.path.join(self.static, "index.css")
+        stat = os.stat(path)
+        self.write(self.static, "index.css", "body {X")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.sync().copied, [])
+        self.assertEqual(self.sync(verify_hash=True).copied, ["index.css"])
+
+    def test_stale_files_are_removed_but_pages_are_kept(self):
+        self.sync()
+        self.write(self.docs, "index.html", "<p>generated page</p>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        result = self.sync()
+        self.assertEqual(result.removed, ["images/a.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+        self.assertEqual(self.read("index.html"), "<p>generated page</p>")
+
+    def test_hardlink_mode(self):
+        self.sync(hardlink=True)
+        self.assertTrue(os.path.samefile(os.path.join(self.static, "index.css"), os.path.join(self.docs, "index.css")))
+        self.assertEqual(self.sync(hardlink=True).copied, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.corpus import DEFAULT_BLOCK_MIX, generate_document, generate_site, parse_mix
+from benchmarks.run import compare
+from markdowntohtmlnode import markdown_to_html_node
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_document_size_and_validity(self):
+        document = generate_document(20000, seed=3)
+        self.assertGreaterEqual(len(document), 20000)
+        self.assertLess(len(document), 22000)
+        # Generated markup must be well formed enough to render
+        markdown_to_html_node(document).to_html()
+
+    def test_document_is_deterministic(self):
+        self.assertEqual(generate_document(5000, seed=1), generate_document(5000, seed=1))
+
+    def test_mix(self):
+        mix = parse_mix("code=0,heading=5", DEFAULT_BLOCK_MIX)
+        self.assertEqual(mix["code"], 0)
+        self.assertEqual(mix["heading"], 5)
+        self.assertNotIn("```", generate_document(20000, block_mix=mix))
+        with self.assertRaises(ValueError):
+            parse_mix("tables=1", DEFAULT_BLOCK_MIX)
+
+    def test_site(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            generate_site(tmp, 5, page_bytes=500)
+            pages = [name for _, _, files in os.walk(os.path.join(tmp, "content")) for name in files]
+            self.assertEqual(len(pages), 5)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "template.html")))
+
+    def test_compare(self):
+        baseline = {"stage": {"mb_per_s": 100.0, "peak_mb": 10.0}}
+        self.assertEqual(compare({"stage": {"mb_per_s": 90.0, "peak_mb": 11.0}}, baseline, 0.25), [])
+        self.assertEqual(len(compare({"stage": {"mb_per_s": 50.0, "peak_mb": 20.0}}, baseline, 0.25)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from blocklexer import code_content, lex_blocks
+from blocktype import BlockType
+from markdowntohtmlnode import markdown_to_html_node
+
+
+def lexed(source):
+    return [(block_type, source[start:end]) for block_type, start, end in lex_blocks(source)]
+
+
+class TestBlockLexer(unittest.TestCase):
+    def test_offsets_point_into_source(self):
+        source = "# Title\n\nSome text\nmore\n\n- a\n- b\n"
+        spans = list(lex_blocks(source))
+        self.assertEqual(spans, [
+            (BlockType.heading, 0, 7),
+            (BlockType.paragraph, 9, 23),
+            (BlockType.unordered_list, 25, 32),
+        ])
+
+    def test_classification(self):
+        source = "> quoted\n> more\n\n1. one\n2. two\n\n1. one\n3. three\n\n###### six\n\n####### seven"
+        self.assertEqual([block_type for block_type, _ in lexed(source)], [
+            BlockType.quote,
+            BlockType.ordered_list,
+            BlockType.paragraph,
+            BlockType.heading,
+            BlockType.paragraph,
+        ])
+
+    def test_fenced_code_keeps_blank_lines_and_indentation(self):
+        source = "Intro\n\n```\ndef f():\n\n    return 1\n```\n\nAfter"
+        self.assertEqual(lexed(source), [
+            (BlockType.paragraph, "Intro"),
+            (BlockType.code, "```\ndef f():\n\n    return 1\n```"),
+            (BlockType.paragraph, "After"),
+        ])
+
+    def test_fence_and_heading_interrupt_a_paragraph(self):
+        source = "text\n```\ncode\n```\nmore\n## Heading\nend"
+        self.assertEqual([block_type for block_type, _ in lexed(source)], [
+            BlockType.paragraph,
+            BlockType.code,
+            BlockType.paragraph,
+            BlockType.heading,
+            BlockType.paragraph,
+        ])
+
+    def test_unclosed_fence_is_text(self):
+        self.assertEqual(lexed("```\nnot code"), [(BlockType.paragraph, "```\nnot code")])
+
+    def test_code_content_strips_fence_indentation_only(self):
+        self.assertEqual(code_content("  ```\n  a\n      b\n  ```"), "a\n    b")
+        self.assertEqual(code_content("```\n```"), "")
+
+    def test_rendered_code_keeps_indentation(self):
+        html = markdown_to_html_node("```\nif x:\n\n    y()\n```").to_html()
+        self.assertEqual(html, "<div><pre><code>if x:\n\n    y()</code></pre></div>")
+
+    def test_heading_level_ignores_later_hashes(self):
+        html = markdown_to_html_node("## C# tips").to_html()
+        self.assertEqual(html, "<div><h2>C# tips</h2></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
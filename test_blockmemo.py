@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+
+import blockmemo
+from blockmemo import BlockMemo
+from markdowntohtmlnode import markdown_to_html_node
+from rendercache import RenderCache
+from urlrewrite import UrlRewriter
+
+DOCUMENT = "# Title\n\nFirst paragraph with **bold**.\n\n- one\n- [two](/two)\n\n```\ncode\n```"
+
+
+class TestBlockMemo(unittest.TestCase):
+    def setUp(self):
+        self.memo = BlockMemo()
+        blockmemo.enable(self.memo)
+
+    def tearDown(self):
+        blockmemo.disable()
+
+    def render(self, markdown, rewriter=None):
+        return markdown_to_html_node(markdown, rewriter).to_html()
+
+    def test_output_matches_unmemoized(self):
+        memoized_first = self.render(DOCUMENT)
+        memoized_again = self.render(DOCUMENT)
+        blockmemo.disable()
+        self.assertEqual(memoized_first, self.render(DOCUMENT))
+        self.assertEqual(memoized_again, memoized_first)
+
+    def test_edit_only_pays_for_changed_blocks(self):
+        self.render(DOCUMENT)
+        self.assertEqual((self.memo.hits, self.memo.misses), (0, 4))
+        self.render(DOCUMENT.replace("First paragraph", "Edited paragraph"))
+        self.assertEqual((self.memo.hits, self.memo.misses), (3, 5))
+
+    def test_hits_replay_recorded_urls(self):
+        self.render(DOCUMENT, UrlRewriter("/site/"))
+        rewriter = UrlRewriter("/site/", "/other/")
+        html = self.render(DOCUMENT, rewriter)
+        self.assertEqual(self.memo.misses, 4)
+        self.assertIn('href="/site/two"', html)
+        self.assertEqual(rewriter.links, ["/two"])
+
+    def test_base_path_is_part_of_the_key(self):
+        self.render("[home](/)", UrlRewriter("/a/"))
+        self.assertIn('href="/b/"', self.render("[home](/)", UrlRewriter("/b/")))
+
+    def test_relative_links_are_not_shared_between_pages(self):
+        tom = self.render("[up](../)", UrlRewriter("/", "/blog/tom/"))
+        about = self.render("[up](../)", UrlRewriter("/", "/blog/tom/notes/"))
+        self.assertIn('href="/blog/"', tom)
+        self.assertIn('href="/blog/tom/"', about)
+        self.assertIn('href="/blog/"', self.render("[up](../)", UrlRewriter("/", "/blog/tom/")))
+        self.assertEqual(self.memo.hits, 1)
+
+    def test_lru_is_bounded(self):
+        memo = BlockMemo(max_entries=2)
+        blockmemo.enable(memo)
+        self.render("a\n\nb\n\nc")
+        self.assertEqual(len(memo.entries), 2)
+
+    def test_store_survives_between_builds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            blockmemo.enable(BlockMemo(store=RenderCache(tmp)))
+            self.render(DOCUMENT)
+            memo = BlockMemo(store=RenderCache(tmp))
+            blockmemo.enable(memo)
+            self.render(DOCUMENT)
+            self.assertEqual((memo.hits, memo.store_hits, memo.misses), (4, 4, 0))
+            self.assertIn("4 of the hits from disk", memo.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
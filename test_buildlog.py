@@ -0,0 +1,59 @@
+import contextlib
+import io
+import unittest
+
+import buildlog
+from htmlnode import LeafNode, ParentNode
+from markdowntohtmlnode import markdown_to_html_node
+
+
+class TestBuildLog(unittest.TestCase):
+    def setUp(self):
+        buildlog.configure(verbose=False)
+        buildlog.take_warnings()
+
+    def tearDown(self):
+        buildlog.configure(verbose=False)
+        buildlog.take_warnings()
+
+    def test_quiet_by_default(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            markdown_to_html_node("# Title\n\nA paragraph with **bold** text.")
+            ParentNode("div", [])
+        self.assertEqual(out.getvalue(), "")
+
+    def test_warnings_are_counted_per_kind_and_file(self):
+        with buildlog.current_file("content/a.md"):
+            ParentNode("div", [])
+            ParentNode("span", None)
+        with buildlog.current_file("content/b.md"):
+            ParentNode("div", [])
+        self.assertEqual(buildlog.take_warnings(), {
+            ("empty-parent", "content/a.md"): 2,
+            ("empty-parent", "content/b.md"): 1,
+        })
+
+    def test_void_tags_do_not_warn(self):
+        LeafNode("img", "", {"src": "a.png"})
+        LeafNode(None, "")
+        self.assertEqual(buildlog.take_warnings(), {})
+
+    def test_summary(self):
+        buildlog.merge_warnings({("empty-block", "content/a.md"): 3, ("empty-block", "content/b.md"): 1})
+        self.assertEqual(buildlog.warning_summary(), [
+            "  empty-block: 4",
+            "    content/a.md: 3",
+            "    content/b.md: 1",
+        ])
+
+    def test_verbose_logs_details(self):
+        buildlog.configure(verbose=True)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            markdown_to_html_node("# Title")
+        self.assertIn("Processing block: # Title", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+from depgraph import DependencyGraph
+from markdowntohtmlnode import markdown_to_html_node
+from urlrewrite import UrlRewriter
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.graph_path = os.path.join(self.root, "depgraph.json")
+        self.page = self.write("content/blog/tom/index.md", "# Tom")
+        self.output = self.write("docs/blog/tom/index.html", "<h1>Tom</h1>")
+        self.template = self.write("template.html", "{{ Content }}")
+        self.image = self.write("static/images/tom.png", "png")
+        self.dependencies = {
+            "templates": [os.path.join(self.root, "layouts", "blog.html"), self.template],
+            "images": ["/images/tom.png"],
+            "links": ["/blog/majesty"],
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative, text):
+        path = os.path.join(self.root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def graph(self, base_path="/"):
+        return DependencyGraph(self.graph_path, self.content, self.static, {"base_path": base_path})
+
+    def build(self):
+        graph = self.graph()
+        graph.record(self.page, self.output, self.dependencies)
+        graph.save()
+
+    def touch(self, path):
+        os.utime(path, ns=(1, 1))
+
+    def test_unchanged_page_is_up_to_date(self):
+        self.build()
+        self.assertEqual(self.graph().reasons(self.page, self.output), [])
+
+    def test_new_page(self):
+        self.assertEqual(self.graph().reasons(self.page, self.output), ["not built before"])
+
+    def test_changed_inputs(self):
+        self.build()
+        self.touch(self.image)
+        self.touch(self.template)
+        reasons = self.graph().reasons(self.page, self.output)
+        self.assertEqual(reasons, [f"{self.template} changed", f"{self.image} changed"])
+
+    def test_added_layout_and_content_image(self):
+        self.build()
+        self.write("layouts/blog.html", "{{ Content }}")
+        self.write("content/images/tom.png", "override")
+        reasons = self.graph().reasons(self.page, self.output)
+        self.assertIn(f"{os.path.join(self.root, 'layouts', 'blog.html')} was added", reasons)
+        self.assertIn(f"{os.path.join(self.content, 'images', 'tom.png')} was added", reasons)
+
+    def test_image_appearing_next_to_page(self):
+        markdown = "![x](photo.png)"
+        rewriter = UrlRewriter("/", "/blog/tom/", os.path.dirname(self.page))
+        rewriter.probe_images(markdown)
+        self.assertIn('src="/images/photo.png"', markdown_to_html_node(markdown, rewriter).to_html())
+        self.dependencies = dict(self.dependencies, **rewriter.references())
+        self.build()
+        self.assertEqual(self.graph().reasons(self.page, self.output), [])
+
+        photo = self.write("content/blog/tom/photo.png", "png")
+        self.assertEqual(self.graph().reasons(self.page, self.output), [f"{photo} was added"])
+
+    def test_linked_page_appearing(self):
+        self.build()
+        linked = self.write("content/blog/majesty/index.md", "# Majesty")
+        self.assertEqual(self.graph().reasons(self.page, self.output), [f"linked page {linked} was added"])
+
+    def test_missing_output(self):
+        self.build()
+        os.remove(self.output)
+        self.assertEqual(self.graph().reasons(self.page, self.output), [f"{self.output} is missing"])
+
+    def test_settings_change_invalidates_everything(self):
+        self.build()
+        self.assertEqual(self.graph("/site/").reasons(self.page, self.output), ["build settings changed"])
+
+    def test_dependents_and_retain(self):
+        graph = self.graph()
+        graph.record(self.page, self.output, self.dependencies)
+        self.assertEqual(graph.dependents(self.image), [self.page])
+        self.assertEqual(graph.dependents(os.path.join(self.content, "blog", "majesty.md")), [self.page])
+        graph.retain([])
+        self.assertEqual(graph.dependents(self.image), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from devserver import DevHTTPServer, DevServer, Watcher, diff_snapshots
+
+
+class TestDevServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.site = DevServer(self.content, self.static, self.template, live_reload=True)
+        self.site.build()
+
+    def tearDown(self):
+        self.site.close()
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_build_renders_into_memory(self):
+        self.assertEqual(sorted(self.site.pages), ["blog/tom/index.html", "index.html"])
+        body = self.site.pages["index.html"].body.decode()
+        self.assertIn("<h1>Home</h1>", body)
+        self.assertIn("__livereload", body)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "docs")))
+
+    def test_diff_snapshots(self):
+        old = {"a": (1, 1), "b": (1, 1)}
+        new = {"a": (2, 1), "c": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), ["a", "b", "c"])
+
+    def test_watcher_sees_edits(self):
+        watcher = Watcher(self.site.watched_paths())
+        path = os.path.join(self.content, "index.md")
+        self.write(path, "# Home again")
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(watcher.poll(), [path])
+        self.assertEqual(watcher.poll(), [])
+
+    def test_only_edited_page_is_rerendered(self):
+        path = os.path.join(self.content, "index.md")
+        self.assertEqual(self.site.affected_pages([path]), ([path], []))
+        self.assertEqual(self.site.affected_pages([os.path.join(self.static, "index.css")]), ([], []))
+        pages, _ = self.site.affected_pages([self.template])
+        self.assertEqual(len(pages), 2)
+
+    def test_image_edit_rerenders_embedding_page(self):
+        image = os.path.join(self.static, "images", "tom.png")
+        self.write(image, "png")
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        self.write(tom, "# Tom\n\n![tom](/images/tom.png)")
+        self.site.rebuild([tom])
+        self.assertEqual(self.site.affected_pages([image]), ([tom], []))
+
+    def test_new_layout_rerenders_its_directory(self):
+        layout = os.path.join(self.tmp.name, "layouts", "blog.html")
+        self.write(layout, "<html><body>blog {{ Content }}</body></html>")
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        self.assertEqual(self.site.affected_pages([layout]), ([tom], []))
+        self.site.rebuild([layout])
+        self.assertIn("blog <div><h1>Tom</h1>", self.site.pages["blog/tom/index.html"].body.decode())
+
+    def test_rebuild_updates_and_removes(self):
+        old_etag = self.site.pages["index.html"].etag
+        home = os.path.join(self.content, "index.md")
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        self.write(home, "# Changed")
+        os.remove(tom)
+        self.site.rebuild([home, tom])
+        self.assertIn("<h1>Changed</h1>", self.site.pages["index.html"].body.decode())
+        self.assertNotEqual(self.site.pages["index.html"].etag, old_etag)
+        self.assertNotIn("blog/tom/index.html", self.site.pages)
+        self.assertEqual(self.site.generation, 1)
+
+    def test_blog_listings_are_served_and_rebuilt(self):
+        self.write(os.path.join(self.tmp.name, "listing.html"),
+                   "{% for page in Pages %}<a href=\"{{ page.url }}\">{{ page.title }}</a>{% endfor %}")
+        self.write(os.path.join(self.tmp.name, "archive.html"),
+                   "{% for group in Years %}{% for page in group.pages %}{{ page.title }};{% endfor %}{% endfor %}")
+        self.site.build()
+        kind, entry = self.site.lookup("/blog/")
+        self.assertEqual(kind, "page")
+        self.assertIn('<a href="/blog/tom/">Tom</a>', entry.body.decode())
+        self.assertIn("__livereload", entry.body.decode())
+        self.assertIn("Tom;", self.site.lookup("/blog/archive/")[1].body.decode())
+
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        glorfindel = os.path.join(self.content, "blog", "glorfindel", "index.md")
+        self.write(tom, "# Tom Bombadil")
+        self.write(glorfindel, "# Glorfindel")
+        self.site.rebuild([tom, glorfindel])
+        body = self.site.lookup("/blog/")[1].body.decode()
+        self.assertIn("Tom Bombadil</a>", body)
+        self.assertIn("Glorfindel</a>", body)
+
+        os.remove(tom)
+        os.remove(glorfindel)
+        self.site.rebuild([tom, glorfindel])
+        self.assertIsNone(self.site.lookup("/blog/"))
+        self.assertNotIn("blog/archive/index.html", self.site.pages)
+
+    def test_lookup(self):
+        self.assertEqual(self.site.lookup("/")[0], "page")
+        self.assertEqual(self.site.lookup("/blog/tom"), ("redirect", "/blog/tom/"))
+        self.assertEqual(self.site.lookup("/index.css"), ("file", os.path.join(self.static, "index.css")))
+        self.assertIsNone(self.site.lookup("/index.md"))
+        self.assertIsNone(self.site.lookup("/../template.html"))
+
+    def test_lookup_stays_inside_sources(self):
+        outside = os.path.join(self.tmp.name, "secret.txt")
+        self.write(outside, "secret")
+        # What do_GET passes on for "/%2F..." and "/%2E%2E/..." once decoded
+        self.assertIsNone(self.site.lookup("/" + outside))
+        self.assertIsNone(self.site.lookup("//" + outside.lstrip("/")))
+        self.assertIsNone(self.site.lookup("/../secret.txt"))
+        self.assertIsNone(self.site.lookup("/blog/../../secret.txt"))
+        os.symlink(outside, os.path.join(self.static, "link.txt"))
+        self.assertIsNone(self.site.lookup("/link.txt"))
+        # Normalizing still finds files reached through harmless segments
+        self.assertEqual(self.site.lookup("/blog/../index.css"), ("file", os.path.join(self.static, "index.css")))
+
+    def test_http_rejects_encoded_traversal(self):
+        outside = os.path.join(self.tmp.name, "secret.txt")
+        self.write(outside, "secret")
+        server = DevHTTPServer(("127.0.0.1", 0), self.site)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            for path in ["/%2F" + outside.lstrip("/").replace("/", "%2F"), "/%2E%2E/secret.txt"]:
+                with self.assertRaises(urllib.error.HTTPError) as raised:
+                    urllib.request.urlopen(base + path)
+                self.assertEqual(raised.exception.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_http_etag_and_reload_events(self):
+        server = DevHTTPServer(("127.0.0.1", 0), self.site)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(base + "/") as response:
+                etag = response.headers["ETag"]
+            request = urllib.request.Request(base + "/", headers={"If-None-Match": etag})
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                urllib.request.urlopen(request)
+            self.assertEqual(raised.exception.code, 304)
+
+            with urllib.request.urlopen(base + "/__livereload", timeout=5) as events:
+                self.site.notify()
+                self.assertEqual(events.readline(), b"event: reload\n")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
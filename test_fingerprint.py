@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from assetsync import sync_tree
+from fingerprint import AssetManifest, build_manifest, fingerprinted_name, write_headers
+from template import TemplateLoader
+from urlrewrite import UrlRewriter
+
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, "cache", "fingerprints.json")
+        self.write(self.static, "index.css", "body {}")
+        self.write(self.static, "images/tom.png", "png-tom")
+        self.write(self.static, "robots.txt", "User-agent: *")
+        self.write(self.content, "index.md", "# Home")
+        self.sources = [(self.static, None), (self.content, lambda path: path.endswith(".md"))]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, root, relative, text):
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name("images/tom.png", "0123456789abcdef"), "images/tom.0123456789.png")
+        self.assertEqual(fingerprinted_name("index.css", "0123456789abcdef"), "index.0123456789.css")
+
+    def test_only_asset_types_are_fingerprinted(self):
+        manifest = build_manifest(self.sources, self.cache)
+        self.assertEqual(sorted(manifest.assets), ["images/tom.png", "index.css"])
+        self.assertEqual(manifest.rename("robots.txt"), "robots.txt")
+        self.assertRegex(manifest.rename("index.css"), r"^index\.[0-9a-f]{10}\.css$")
+
+    def test_unchanged_assets_keep_their_hashes(self):
+        first = build_manifest(self.sources, self.cache)
+        os.utime(os.path.join(self.static, "index.css"), ns=(1, 1))
+        second = build_manifest(self.sources, self.cache)
+        self.assertEqual(first.assets, second.assets)
+        self.assertEqual(first.key, second.key)
+
+    def test_changed_asset_gets_a_new_hash(self):
+        first = build_manifest(self.sources, self.cache)
+        path = self.write(self.static, "index.css", "body { color: red }")
+        os.utime(path, ns=(1, 1))
+        second = build_manifest(self.sources, self.cache)
+        self.assertNotEqual(first.rename("index.css"), second.rename("index.css"))
+        self.assertEqual(first.rename("images/tom.png"), second.rename("images/tom.png"))
+        self.assertNotEqual(first.key, second.key)
+
+    def test_lookup_keeps_query_and_fragment(self):
+        manifest = AssetManifest({"index.css": ("index.abc.css", "static/index.css")})
+        self.assertEqual(manifest.lookup("/index.css?v=1#top"), ("/index.abc.css?v=1#top", "static/index.css"))
+        self.assertIsNone(manifest.lookup("/missing.css"))
+
+    def test_sync_copies_assets_under_fingerprinted_names(self):
+        manifest = build_manifest(self.sources, self.cache)
+        sync_tree(self.sources, self.docs, rename=manifest.rename)
+        self.assertEqual(sorted(os.listdir(self.docs)), sorted(["images", manifest.rename("index.css"), "robots.txt"]))
+
+    def test_rewriter_uses_fingerprinted_urls(self):
+        manifest = AssetManifest({"images/tom.png": ("images/tom.abc.png", "static/images/tom.png")})
+        rewriter = UrlRewriter("/site/", "/blog/tom/", assets=manifest)
+        self.assertEqual(rewriter.rewrite_image("tom.png"), "/site/images/tom.abc.png")
+        self.assertEqual(rewriter.rewrite_link("/images/tom.png"), "/site/images/tom.abc.png")
+        self.assertEqual(rewriter.rewrite_link("/blog/"), "/site/blog/")
+        self.assertEqual(rewriter.references(), {"images": ["/images/tom.png"], "links": ["/blog/"], "absent": []})
+        self.assertIn(manifest.key, rewriter.signature(include_page=False))
+
+    def test_template_references_are_rewritten(self):
+        template_path = self.write(self.tmp.name, "template.html",
+                                   '<link href="/index.css"><a href="/about/">{{ Content }}</a>')
+        manifest = AssetManifest({"index.css": ("index.abc.css", "static/index.css")})
+        loader = TemplateLoader(template_path)
+        template = loader.get("/site/", "", manifest)
+        self.assertEqual(template.render({"Content": ""}), '<link href="/site/index.abc.css"><a href="/site/about/"></a>')
+        self.assertEqual(template.assets, ["static/index.css"])
+        self.assertNotEqual(template.key, loader.get("/site/").key)
+
+    def test_headers_mark_fingerprinted_paths_immutable(self):
+        manifest = AssetManifest({"index.css": ("index.abc.css", "static/index.css")})
+        headers = manifest.headers("/site/")
+        self.assertEqual(headers, "/site/index.abc.css\n  Cache-Control: public, max-age=31536000, immutable\n")
+        path = os.path.join(self.docs, "_headers")
+        self.assertTrue(write_headers(path, headers))
+        self.assertFalse(write_headers(path, headers))
+
+
+if __name__ == "__main__":
+    unittest.main()
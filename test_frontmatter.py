@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from blocklexer import lex_page
+from frontmatter import page_metadata, parse_front_matter, plain_text
+from rendercache import RenderCache
+from utils import generate_page, render_page
+
+PAGE = """---
+title: "Tom: a Mistake"
+date: 2024-05-01
+# tags for the archive
+tags:
+  - tolkien
+  - characters
+---
+
+# Why Tom Bombadil Was a Mistake
+
+[Back home](/)
+
+In the *vast* weave of [Tolkien's](https://example.com) legendarium.
+"""
+
+
+def metadata(source, default_title="index"):
+    return page_metadata(source, lex_page(source), default_title)
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_fields_and_offset(self):
+        fields, offset = parse_front_matter(PAGE)
+        self.assertEqual(fields, {"title": "Tom: a Mistake", "date": "2024-05-01",
+                                  "tags": ["tolkien", "characters"]})
+        self.assertTrue(PAGE[offset:].startswith("\n# Why"))
+
+    def test_inline_lists_and_unclosed_blocks(self):
+        self.assertEqual(parse_front_matter("---\ntags: [a, 'b c']\n---\n")[0], {"tags": ["a", "b c"]})
+        self.assertEqual(parse_front_matter("---\ntitle: x\n\n# Heading\n"), ({}, 0))
+
+    def test_front_matter_is_not_a_block(self):
+        page = lex_page(PAGE)
+        self.assertEqual(PAGE[page.spans[0][1]:page.spans[0][2]], "# Why Tom Bombadil Was a Mistake")
+
+    def test_plain_text(self):
+        self.assertEqual(plain_text("**Tom** is [here](/tom) ![a pipe](/pipe.png)"), "Tom is here")
+        self.assertEqual(plain_text("[Back home](/)", prose_only=True), "")
+
+
+class TestPageMetadata(unittest.TestCase):
+    def test_front_matter_wins(self):
+        self.assertEqual(metadata(PAGE), {"title": "Tom: a Mistake", "date": "2024-05-01",
+                                          "tags": ["tolkien", "characters"],
+                                          "summary": "In the vast weave of Tolkien's legendarium."})
+
+    def test_title_falls_back_to_h1_then_file_name(self):
+        self.assertEqual(metadata("Intro\n\n# The **Title**\n")["title"], "The Title")
+        self.assertEqual(metadata("## Not a title\n")["title"], "index")
+
+    def test_bad_dates_and_comma_tags(self):
+        meta = metadata("---\ndate: May 1st\ntags: a, b\nsummary: Short.\n---\nText\n")
+        self.assertIsNone(meta["date"])
+        self.assertEqual(meta["tags"], ["a", "b"])
+        self.assertEqual(meta["summary"], "Short.")
+
+    def test_title_is_escaped_in_the_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, "w") as f:
+                f.write("<title>{{ Title }}</title>")
+            for source in ("---\ntitle: A <b> & C\n---\nText\n", "# A <b> & C\n"):
+                content_path = os.path.join(tmp, "page.md")
+                with open(content_path, "w") as f:
+                    f.write(source)
+                html, dependencies = render_page(content_path, template_path, "/")
+                self.assertEqual(html, "<title>A &lt;b&gt; &amp; C</title>")
+                self.assertEqual(dependencies["meta"]["title"], "A <b> & C")
+                cached, _ = render_page(content_path, template_path, "/", RenderCache(os.path.join(tmp, "cache")))
+                self.assertEqual(cached, html)
+                output_path = os.path.join(tmp, "page.html")
+                generate_page(content_path, template_path, output_path, "/")
+                with open(output_path) as f:
+                    self.assertEqual(f.read(), html)
+
+
+if __name__ == "__main__":
+    unittest.main()
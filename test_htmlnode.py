@@ -91,6 +91,46 @@ class TestHTMLNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_nodes_have_no_instance_dict(self):
+        self.assertFalse(hasattr(LeafNode("p", "x"), "__dict__"))
+        self.assertFalse(hasattr(ParentNode("p", [LeafNode(None, "x")]), "__dict__"))
+
+    def test_identical_props_are_shared_and_read_only(self):
+        first = LeafNode("a", "one", {"href": "https://example.com"})
+        second = LeafNode("a", "two", {"href": "https://example.com"})
+        self.assertIs(first.props, second.props)
+        with self.assertRaises(TypeError):
+            first.props["href"] = "changed"
+
+    def test_tags_are_interned(self):
+        level = 2
+        node = ParentNode(f"h{level}", [LeafNode(None, "x")])
+        self.assertIs(node.tag, ParentNode("h2", [LeafNode(None, "y")]).tag)
+
+    def test_to_html_deep_tree(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertTrue(html.endswith("</span></span>"))
+        self.assertIn("<b>deep</b>", html)
+
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode("div", [
+            LeafNode(None, "text "),
+            ParentNode("p", [LeafNode("b", "bold"), LeafNode("img", "", {"src": "a.png"})], {"class": "x"}),
+        ])
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+        self.assertEqual(node.to_html(), '<div>text <p class="x"><b>bold</b><img src="a.png"></p></div>')
+
+    def test_write_to_streams_in_chunks(self):
+        import io
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, f"item {i}")]) for i in range(100)])
+        out = io.StringIO()
+        node.write_to(out, buffer_size=16)
+        self.assertEqual(out.getvalue(), node.to_html())
+
     def test_to_html_with_nochildren(self):
         parent_node = ParentNode("span", None)
         with self.assertRaises(ValueError):
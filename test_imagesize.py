@@ -0,0 +1,119 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import blockmemo
+from blockmemo import BlockMemo
+from imagesize import ImageSizer, read_image_size
+from markdowntohtmlnode import markdown_to_html_node
+from urlrewrite import UrlRewriter
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\x0dIHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 20
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    exif = b"\xff\xe1" + struct.pack(">H", 1002) + b"\x00" * 1000
+    sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 3) + b"\x00" * 3
+    return b"\xff\xd8" + app0 + exif + sof + b"\xff\xd9"
+
+
+def webp(chunk, payload):
+    body = b"WEBP" + chunk + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.cache = os.path.join(self.tmp.name, "cache", "imagesizes.json")
+        self.write(self.static, "images/tom.png", png(928, 468))
+        self.write(self.content, "blog/photo.gif", gif(64, 32))
+
+    def tearDown(self):
+        blockmemo.disable()
+        self.tmp.cleanup()
+
+    def write(self, root, relative, data):
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_png_and_gif(self):
+        self.assertEqual(read_image_size(os.path.join(self.static, "images/tom.png")), (928, 468))
+        self.assertEqual(read_image_size(os.path.join(self.content, "blog/photo.gif")), (64, 32))
+
+    def test_jpeg_skips_segments_before_the_frame(self):
+        path = self.write(self.tmp.name, "photo.jpg", jpeg(1920, 1080))
+        self.assertEqual(read_image_size(path), (1920, 1080))
+
+    def test_webp_variants(self):
+        lossy = b"\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", 300, 200) + b"\x00" * 4
+        lossless = b"\x2f" + struct.pack("<I", (300 - 1) | ((200 - 1) << 14)) + b"\x00" * 8
+        extended = b"\x00" * 4 + (300 - 1).to_bytes(3, "little") + (200 - 1).to_bytes(3, "little")
+        for chunk, payload in ((b"VP8 ", lossy), (b"VP8L", lossless), (b"VP8X", extended)):
+            path = self.write(self.tmp.name, "image.webp", webp(chunk, payload))
+            self.assertEqual(read_image_size(path), (300, 200), chunk)
+
+    def test_unknown_format(self):
+        path = self.write(self.tmp.name, "notes.png", b"not an image")
+        self.assertIsNone(read_image_size(path))
+
+    def test_sizer_finds_images_by_url(self):
+        sizer = ImageSizer(self.content, self.static, self.cache)
+        self.assertEqual(sizer.size_for_url("/images/tom.png"), (928, 468))
+        self.assertEqual(sizer.size_for_url("/blog/photo.gif?v=2"), (64, 32))
+        self.assertIsNone(sizer.size_for_url("/images/missing.png"))
+
+    def test_sizes_are_cached_until_the_file_changes(self):
+        self.assertEqual(ImageSizer(self.content, self.static, self.cache).read, 2)
+        sizer = ImageSizer(self.content, self.static, self.cache)
+        self.assertEqual(sizer.read, 0)
+        key = sizer.key
+        path = self.write(self.static, "images/tom.png", png(100, 50))
+        os.utime(path, ns=(1, 1))
+        sizer = ImageSizer(self.content, self.static, self.cache)
+        self.assertEqual(sizer.read, 1)
+        self.assertEqual(sizer.size_for_url("/images/tom.png"), (100, 50))
+        self.assertNotEqual(sizer.key, key)
+
+    def test_attributes(self):
+        sizer = ImageSizer(self.content, self.static, eager_images=1)
+        self.assertEqual(sizer.attributes("/images/tom.png", 0), {"width": "928", "height": "468"})
+        self.assertEqual(sizer.attributes(None, 1), {"loading": "lazy", "decoding": "async"})
+
+    def render(self, markdown, sizer):
+        rewriter = UrlRewriter("/", "/blog/", sizer=sizer)
+        return markdown_to_html_node(markdown, rewriter).to_html()
+
+    def test_images_after_the_first_screen_are_lazy(self):
+        sizer = ImageSizer(self.content, self.static, eager_images=1)
+        html = self.render("![a](/images/tom.png)\n\n![b](/images/tom.png)", sizer)
+        self.assertIn('<img src="/images/tom.png" alt="a" width="928" height="468">', html)
+        self.assertIn('<img src="/images/tom.png" alt="b" width="928" height="468" loading="lazy" decoding="async">',
+                      html)
+
+    def test_memoized_blocks_respect_image_position(self):
+        blockmemo.enable(BlockMemo())
+        sizer = ImageSizer(self.content, self.static, eager_images=1)
+        image = "![a](/images/tom.png)"
+        first = self.render(f"{image}\n\n{image}", sizer)
+        second = self.render(f"{image}\n\n{image}", sizer)
+        self.assertEqual(first, second)
+        self.assertEqual(first.count('loading="lazy"'), 1)
+        self.assertEqual(self.render(f"intro\n\n{image}", sizer).count('loading="lazy"'), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import random
+import unittest
+
+from textnode import TextNode, TextType
+from inlinetokenizer import tokenize_inline
+from splitdelimiter import split_nodes_delimiter
+from splitnodes import split_nodes_image, split_nodes_link
+
+
+def chained_extract(text):
+    # The pass order used by markdowntohtmlnode.extract_markdown_text
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+
+def chained_text_to_textnodes(text):
+    # The pass order used by text_to_textnodes.text_to_textnodes
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    return split_nodes_delimiter(nodes, "`", TextType.CODE)
+
+
+WORDS = ["the", "quick", "brown fox", " jumps ", "over.", "lazy dog,", "Gandalf", "é"]
+
+
+def random_inline(rng, pieces, allow_star):
+    kinds = ["text", "bold", "italic", "code", "link", "image"]
+    if allow_star:
+        kinds.append("star")
+    out = []
+    for _ in range(pieces):
+        kind = rng.choice(kinds)
+        word = rng.choice(WORDS)
+        if kind == "text":
+            out.append(word)
+        elif kind == "bold":
+            out.append(f"**{word}**")
+        elif kind == "italic":
+            out.append(f"_{word}_")
+        elif kind == "star":
+            out.append(f"*{word}*")
+        elif kind == "code":
+            out.append(f"`{word}`")
+        elif kind == "link":
+            out.append(f"[{word}](https://example.com/{rng.randint(0, 99)})")
+        else:
+            out.append(f"![{word}](/images/{rng.randint(0, 99)}.png)")
+    # Pieces are space separated: the chained passes cannot tell "**a***b*" apart
+    return " ".join(out)
+
+
+class TestInlineTokenizer(unittest.TestCase):
+    def test_plain_text_fast_path(self):
+        self.assertEqual(tokenize_inline("Just words, nothing else."), [TextNode("Just words, nothing else.", TextType.TEXT)])
+
+    def test_mixed(self):
+        text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        self.assertEqual(tokenize_inline(text), chained_extract(text))
+
+    def test_markup_inside_code_is_literal(self):
+        nodes = tokenize_inline("call `snake_case_name` now")
+        self.assertEqual(nodes[1], TextNode("snake_case_name", TextType.CODE))
+
+    def test_underscores_in_urls_are_kept(self):
+        nodes = tokenize_inline("see [docs](https://example.com/a_b_c)")
+        self.assertEqual(nodes[1], TextNode("docs", TextType.LINK, "https://example.com/a_b_c"))
+
+    def test_unmatched_bracket_is_text(self):
+        self.assertEqual(tokenize_inline("[not a link] ! and ![nor] this"), [TextNode("[not a link] ! and ![nor] this", TextType.TEXT)])
+
+    def test_missing_closing_delimiter(self):
+        with self.assertRaises(Exception):
+            tokenize_inline("This has **no closing delimiter")
+
+    def test_many_pairs_without_recursion(self):
+        text = "a _b_ " * 20000
+        nodes = tokenize_inline(text)
+        self.assertEqual(len(nodes), 40001)
+        self.assertEqual(split_nodes_delimiter([TextNode(text, TextType.TEXT)], "_", TextType.ITALIC), nodes)
+
+    def test_differential_against_extract_chain(self):
+        rng = random.Random(1234)
+        for _ in range(500):
+            text = random_inline(rng, rng.randint(1, 12), allow_star=True)
+            self.assertEqual(tokenize_inline(text), chained_extract(text), text)
+
+    def test_differential_against_text_to_textnodes_chain(self):
+        rng = random.Random(5678)
+        for _ in range(500):
+            text = random_inline(rng, rng.randint(1, 12), allow_star=False)
+            self.assertEqual(tokenize_inline(text), chained_text_to_textnodes(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from listings import ListingGenerator
+from outputwriter import OutputWriter
+from pageindex import PageIndex
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+LISTING = ("{% for page in Pages %}<a href=\"{{ page.url }}\">{{ page.title }}</a>{% endfor %}"
+           "{% for url in Older %}<a href=\"{{ url }}\">Older</a>{% endfor %}")
+ARCHIVE = "{% for group in Years %}<h2>{{ group.year }}</h2>{% for page in group.pages %}{{ page.title }};{% endfor %}{% endfor %}"
+
+
+class TestListingGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, "cache", "listings.json")
+        self.template_path = os.path.join(self.tmp.name, "template.html")
+        for name, source in (("template.html", TEMPLATE), ("listing.html", LISTING), ("archive.html", ARCHIVE)):
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write(source)
+        self.posts = {"a": ("A & B", "2023-02-01"), "b": ("Bee", "2024-03-01"), "c": ("Sea", None)}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, reserved=()):
+        page_index = PageIndex(self.docs)
+        for name, (title, date) in self.posts.items():
+            output_path = os.path.join(self.docs, "blog", name, "index.html")
+            page_index.update_page(f"content/blog/{name}/index.md", output_path,
+                                   {"title": title, "date": date, "tags": [], "summary": ""})
+        writer = OutputWriter(self.docs)
+        listings = ListingGenerator(self.template_path, self.docs, "/site/", self.state, page_size=2)
+        outputs, failures = listings.generate(page_index, writer, reserved)
+        listings.save()
+        self.assertEqual(failures, [])
+        return [os.path.relpath(path, self.docs) for path in outputs], listings
+
+    def read(self, relative):
+        with open(os.path.join(self.docs, relative)) as f:
+            return f.read()
+
+    def test_pages_newest_first(self):
+        outputs, _ = self.build()
+        self.assertEqual(outputs, ["blog/index.html", "blog/page/2/index.html", "blog/archive/index.html"])
+        self.assertEqual(self.read("blog/index.html"),
+                         '<title>Blog</title><main><a href="/site/blog/b/">Bee</a><a href="/site/blog/a/">A &amp; B</a>'
+                         '<a href="/site/blog/page/2/">Older</a></main>')
+        self.assertIn("<title>Blog, page 2</title>", self.read("blog/page/2/index.html"))
+        self.assertIn("<h2>2024</h2>Bee;<h2>2023</h2>A &amp; B;<h2>Undated</h2>Sea;",
+                      self.read("blog/archive/index.html"))
+
+    def test_entries_for_the_sitemap(self):
+        _, listings = self.build()
+        self.assertEqual([(entry["url"], entry["title"]) for entry in listings.entries()],
+                         [("/blog/", "Blog"), ("/blog/page/2/", "Blog, page 2"),
+                          ("/blog/archive/", "Blog archive")])
+
+    def test_only_changed_pages_are_rendered(self):
+        self.build()
+        self.posts["c"] = ("Sea!", None)
+        _, listings = self.build()
+        self.assertEqual(listings.written, ["blog/page/2/index.html", "blog/archive/index.html"])
+        self.assertEqual(listings.unchanged, ["blog/index.html"])
+
+    def test_missing_outputs_are_rendered_again(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "blog", "index.html"))
+        _, listings = self.build()
+        self.assertEqual(listings.written, ["blog/index.html"])
+
+    def test_markdown_pages_are_not_replaced(self):
+        outputs, _ = self.build(reserved=[os.path.join(self.docs, "blog", "index.html")])
+        self.assertNotIn("blog/index.html", outputs)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from blocklexer import block_text, lex_blocks
 from markdowntoblocks import markdown_to_blocks
 
 
@@ -52,6 +53,13 @@ class TestMarkdownToBlock(unittest.TestCase):
         ]
         assert markdown_to_blocks(markdown) == expected
 
+    def test_same_blocks_as_lexer(self):
+        markdown = ("Intro\n# Heading\nafter\n\n  ```py\n  code\n\n    more\n  ```\ntail\n"
+                    "para\n```\nx\n```\n\n```\nnever closed\n\n## Last")
+        expected = [block_text(markdown, *span) for span in lex_blocks(markdown)]
+        self.assertEqual(markdown_to_blocks(markdown), expected)
+        self.assertEqual(expected[3], "  ```py\n  code\n\n    more\n  ```")
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import blockmemo
+import minify
+from assetsync import sync_tree
+from blockmemo import BlockMemo
+from htmlnode import LeafNode, ParentNode
+from markdowntohtmlnode import markdown_to_html_node
+from minify import HtmlMinifier, minify_css, minify_tag
+from template import TemplateLoader
+
+
+class TestMinify(unittest.TestCase):
+    def setUp(self):
+        minify.enable()
+
+    def tearDown(self):
+        minify.disable()
+        blockmemo.disable()
+
+    def test_minify_tag(self):
+        self.assertEqual(minify_tag('<meta charset="utf-8" />'), "<meta charset=utf-8>")
+        self.assertEqual(minify_tag('<a  href="/blog/"   title="two words">'), '<a href=/blog/ title="two words">')
+        self.assertEqual(minify_tag('<input disabled value="">'), '<input disabled value="">')
+        self.assertEqual(minify_tag("</p >"), "</p>")
+
+    def test_html_minifier(self):
+        html = HtmlMinifier().feed('<!doctype html>\n<html>\n  <!-- note -->\n  <body>\n    <p>Some   <b>bold</b>\n'
+                                   '    text </p>\n    <pre>  keep\n   this </pre>\n  </body>\n</html>')
+        self.assertEqual(html, "<!doctype html><html><body><p>Some <b>bold</b> text</p><pre>  keep\n   this </pre>"
+                               "</body></html>")
+
+    def test_html_minifier_leaves_tags_cut_by_placeholders(self):
+        minifier = HtmlMinifier()
+        self.assertEqual(minifier.feed('<div>\n  <a class="x y" href="'), '<div><a class="x y" href="')
+        self.assertEqual(minifier.feed('"  title="a">\n  link </a>'), '"  title="a"> link </a>')
+
+    def test_minify_css(self):
+        css = "/* theme */\nbody {\n  color : #fff;\n  margin: calc(1px + 2px);\n}\n\n" \
+              "a:hover,\na > b { content: \"a  b\"; }\n@media (max-width: 600px) { p { x: y } }"
+        self.assertEqual(minify_css(css), 'body{color :#fff;margin:calc(1px + 2px)}a:hover,a>b{content:"a  b"}'
+                                          "@media (max-width:600px){p{x:y}}")
+
+    def test_serializer_collapses_text_outside_pre(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "two\nlines   here"), LeafNode("a", "link", {"href": "/a b"})]),
+            ParentNode("pre", [ParentNode("code", [LeafNode(None, "a\n    b")])]),
+            LeafNode("img", "", {"src": "/images/tom.png", "alt": ""}),
+        ])
+        self.assertEqual(node.to_html(), '<div><p>two lines here<a href="/a b">link</a></p>'
+                                         '<pre><code>a\n    b</code></pre><img src=/images/tom.png alt=""></div>')
+
+    def test_disabled_output_is_unchanged(self):
+        minify.disable()
+        node = ParentNode("p", [LeafNode(None, "two\nlines")], {"class": "x"})
+        self.assertEqual(node.to_html(), '<p class="x">two\nlines</p>')
+
+    def test_memoized_code_blocks_keep_their_whitespace(self):
+        blockmemo.enable(BlockMemo())
+        markdown = "Some\ntext\n\n```\nfunc main() {\n    return\n}\n```"
+        first = markdown_to_html_node(markdown).to_html()
+        second = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(first, second)
+        self.assertIn("<p>Some text</p>", first)
+        self.assertIn("func main() {\n    return\n}", first)
+
+    def test_template_is_minified_at_compile_time(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "template.html")
+            with open(path, "w") as f:
+                f.write('<html>\n  <head>\n    <title>{{ Title }}</title>\n    <link href="/index.css" rel="stylesheet" />'
+                        '\n  </head>\n  <body>\n    <article>{{ Content }}</article>\n  </body>\n</html>')
+            loader = TemplateLoader(path)
+            template = loader.get("/site/")
+            self.assertEqual(template.render({"Title": "Home", "Content": "<p>hi</p>"}),
+                             "<html><head><title>Home</title><link href=/site/index.css rel=stylesheet></head>"
+                             "<body><article><p>hi</p></article></body></html>")
+            minify.disable()
+            self.assertNotEqual(loader.get("/site/").key, template.key)
+
+    def test_sync_minifies_css_and_keeps_it_current(self):
+        with tempfile.TemporaryDirectory() as root:
+            static = os.path.join(root, "static")
+            docs = os.path.join(root, "docs")
+            manifest = os.path.join(root, "sync.json")
+            os.makedirs(static)
+            with open(os.path.join(static, "index.css"), "w") as f:
+                f.write("body {\n  margin: 0;\n}\n")
+            transforms = {".css": minify_css}
+            result = sync_tree([(static, None)], docs, manifest, transforms=transforms)
+            self.assertEqual(result.copied, ["index.css"])
+            with open(os.path.join(docs, "index.css")) as f:
+                self.assertEqual(f.read(), "body{margin:0}")
+            self.assertEqual(sync_tree([(static, None)], docs, manifest, transforms=transforms).copied, [])
+            # Turning minification off copies the original again
+            self.assertEqual(sync_tree([(static, None)], docs, manifest).copied, ["index.css"])
+
+
+if __name__ == "__main__":
+    unittest.main()
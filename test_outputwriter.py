@@ -0,0 +1,168 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from outputwriter import BASE_PATH_PLACEHOLDER, MultiTargetWriter, OutputWriter, write_changes
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.manifest = os.path.join(self.tmp.name, "cache", "outputs.json")
+        os.makedirs(os.path.join(self.docs, "blog"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, relative):
+        return os.path.join(self.docs, relative)
+
+    def build(self, pages):
+        writer = OutputWriter(self.docs, self.manifest)
+        for relative, text in pages.items():
+            os.makedirs(os.path.dirname(self.path(relative)), exist_ok=True)
+            writer.write(self.path(relative), [text[:3], text[3:]])
+        writer.finish([self.path(relative) for relative in pages])
+        return writer
+
+    def test_first_build_adds_every_page(self):
+        writer = self.build({"index.html": "<p>home</p>", "blog/index.html": "<p>blog</p>"})
+        self.assertEqual(writer.paths_with_status("added"), ["blog/index.html", "index.html"])
+        with open(self.path("index.html")) as f:
+            self.assertEqual(f.read(), "<p>home</p>")
+        self.assertEqual(sorted(os.listdir(self.docs)), ["blog", "index.html"])
+
+    def test_unchanged_page_is_not_rewritten(self):
+        self.build({"index.html": "<p>home</p>"})
+        os.utime(self.path("index.html"), ns=(1, 1))
+        writer = self.build({"index.html": "<p>home</p>"})
+        self.assertEqual(writer.paths_with_status("unchanged"), ["index.html"])
+        self.assertEqual(os.stat(self.path("index.html")).st_mtime_ns, 1)
+
+    def test_changed_page_is_replaced(self):
+        self.build({"index.html": "<p>home</p>"})
+        writer = self.build({"index.html": "<p>welcome</p>"})
+        self.assertEqual(writer.paths_with_status("changed"), ["index.html"])
+        with open(self.path("index.html")) as f:
+            self.assertEqual(f.read(), "<p>welcome</p>")
+        self.assertEqual(os.stat(self.path("index.html")).st_mode & 0o777, 0o644)
+
+    def test_existing_file_without_manifest_is_compared(self):
+        with open(self.path("index.html"), "w") as f:
+            f.write("<p>home</p>")
+        os.utime(self.path("index.html"), ns=(1, 1))
+        writer = self.build({"index.html": "<p>home</p>"})
+        self.assertEqual(writer.paths_with_status("unchanged"), ["index.html"])
+        self.assertEqual(os.stat(self.path("index.html")).st_mtime_ns, 1)
+
+    def test_existing_file_without_manifest_is_changed_not_added(self):
+        with open(self.path("index.html"), "w") as f:
+            f.write("<p>old home page</p>")
+        writer = self.build({"index.html": "<p>home</p>", "new.html": "<p>new</p>"})
+        self.assertEqual(writer.paths_with_status("changed"), ["index.html"])
+        self.assertEqual(writer.paths_with_status("added"), ["new.html"])
+
+    def test_missing_output_is_written_again(self):
+        self.build({"index.html": "<p>home</p>"})
+        os.remove(self.path("index.html"))
+        self.build({"index.html": "<p>home</p>"})
+        self.assertTrue(os.path.exists(self.path("index.html")))
+
+    def test_pages_without_source_are_removed(self):
+        self.build({"blog/index.html": "<p>blog</p>", "blog/tom/index.html": "<p>tom</p>"})
+        writer = self.build({"blog/index.html": "<p>blog</p>"})
+        self.assertEqual(writer.removed, ["blog/tom/index.html"])
+        self.assertFalse(os.path.exists(self.path("blog/tom")))
+        # Directories that still hold other files are kept
+        self.assertTrue(os.path.exists(self.path("blog")))
+
+    def test_expected_pages_that_were_not_written_are_kept(self):
+        self.build({"index.html": "<p>home</p>", "blog/index.html": "<p>blog</p>"})
+        writer = OutputWriter(self.docs, self.manifest)
+        writer.write(self.path("index.html"), ["<p>home</p>"])
+        writer.finish([self.path("index.html"), self.path("blog/index.html")])
+        self.assertEqual(writer.removed, [])
+        with open(self.manifest) as f:
+            self.assertEqual(sorted(json.load(f)["files"]), ["blog/index.html", "index.html"])
+
+    def test_modified_time_only_moves_when_content_changes(self):
+        self.build({"index.html": "<p>home</p>", "blog/index.html": "<p>blog</p>"})
+        os.utime(self.path("index.html"), ns=(1, 1))
+        first = OutputWriter(self.docs, self.manifest).modified_ns("index.html")
+        writer = self.build({"index.html": "<p>home</p>", "blog/index.html": "<p>blog!</p>"})
+        self.assertEqual(writer.modified_ns("index.html"), first)
+        self.assertEqual(writer.modified_ns("blog/index.html"), os.stat(self.path("blog/index.html")).st_mtime_ns)
+        self.assertIsNone(writer.modified_ns("gone.html"))
+
+    def test_no_temporary_files_are_left(self):
+        self.build({"index.html": "<p>home</p>"})
+        self.build({"index.html": "<p>home</p>"})
+        self.build({"index.html": "<p>changed</p>"})
+        self.assertEqual(sorted(os.listdir(self.docs)), ["blog", "index.html"])
+
+    def test_write_changes_lists_urls(self):
+        path = os.path.join(self.tmp.name, "changes.json")
+        changes = write_changes(path, "/site/", ["blog/new/index.html"], ["index.html", "index.css"],
+                                ["blog/old.html"])
+        self.assertEqual(changes, {
+            "added": ["/site/blog/new/"],
+            "changed": ["/site/", "/site/index.css"],
+            "removed": ["/site/blog/old.html"],
+        })
+        with open(path) as f:
+            self.assertEqual(json.load(f), changes)
+
+
+class TestMultiTargetWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.docs = os.path.join(self.root, "docs")
+        self.staging = os.path.join(self.root, "build", "staging")
+        os.makedirs(os.path.join(self.docs, "blog"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def writer(self):
+        return MultiTargetWriter([
+            ("/site/", OutputWriter(self.docs, os.path.join(self.root, "cache", "outputs.json"))),
+            ("/staging/", OutputWriter(self.staging, os.path.join(self.root, "cache", "outputs.staging.json"))),
+        ], self.docs)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_each_target_gets_its_base_path(self):
+        writer = self.writer()
+        page = os.path.join(self.docs, "blog", "index.html")
+        writer.write(page, [f'<a href="{BASE_PATH_PLACEHOLDER}tom/">', "Tom</a>"])
+        writer.finish([page])
+        self.assertEqual(self.read(page), '<a href="/site/tom/">Tom</a>')
+        self.assertEqual(self.read(os.path.join(self.staging, "blog", "index.html")), '<a href="/staging/tom/">Tom</a>')
+
+    def test_results_and_missing_outputs_per_target(self):
+        page = os.path.join(self.docs, "index.html")
+        writer = self.writer()
+        writer.write(page, ["<p>home</p>"])
+        writer.finish([page])
+        os.remove(os.path.join(self.staging, "index.html"))
+        writer = self.writer()
+        self.assertEqual(writer.missing_outputs(page), [os.path.join(self.staging, "index.html")])
+
+        # Results travel from worker copies back to the parent's writers
+        worker = pickle.loads(pickle.dumps(writer))
+        worker.write(page, ["<p>home</p>"])
+        writer.merge_results(worker.take_results())
+        writer.finish([page])
+        self.assertEqual([target.paths_with_status("unchanged") for _, target in writer.targets],
+                         [["index.html"], ["index.html"]])
+        self.assertEqual(writer.missing_outputs(page), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
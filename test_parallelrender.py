@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from parallelrender import chunk_pages, render_pages_parallel
+
+
+class TestParallelRender(unittest.TestCase):
+    def test_chunk_pages_covers_every_page(self):
+        pages = list(range(10))
+        chunks = chunk_pages(pages, jobs=2)
+        self.assertEqual([page for chunk in chunks for page in chunk], pages)
+        self.assertTrue(all(len(chunk) <= 2 for chunk in chunks))
+
+    def test_chunk_pages_empty(self):
+        self.assertEqual(chunk_pages([], jobs=4), [])
+
+    def test_failures_are_collected_per_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template_path = os.path.join(tmp, "template.html")
+            with open(template_path, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+
+            pages = []
+            for name, markdown in [("good", "# Hello"), ("bad", "**unclosed")]:
+                markdown_path = os.path.join(tmp, f"{name}.md")
+                with open(markdown_path, "w") as f:
+                    f.write(markdown)
+                pages.append((markdown_path, os.path.join(tmp, f"{name}.html")))
+
+            failures = render_pages_parallel(pages, template_path, "/", jobs=2)
+
+            self.assertEqual([path for path, _ in failures], [pages[1][0]])
+            self.assertIn("No closing delimiter", failures[0][1])
+            with open(pages[0][1]) as f:
+                self.assertEqual(f.read(), "<title>Hello</title><div><h1>Hello</h1></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from outputwriter import OutputWriter
+from pageindex import PageIndex
+from pipeline import Pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.template_path = os.path.join(self.tmp.name, "template.html")
+        with open(self.template_path, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pages(self, sources):
+        pages = []
+        for name, markdown in sources:
+            markdown_path = os.path.join(self.tmp.name, f"{name}.md")
+            if markdown is not None:
+                with open(markdown_path, "w") as f:
+                    f.write(markdown)
+            pages.append((markdown_path, os.path.join(self.tmp.name, f"{name}.html")))
+        return pages
+
+    def test_pages_are_rendered_and_indexed(self):
+        pages = self.pages([(f"page{number}", f"# Page {number}\n\nText") for number in range(20)])
+        writer = OutputWriter(self.tmp.name)
+        page_index = PageIndex(self.tmp.name)
+        pipeline = Pipeline(read_ahead=1, write_behind=1, readers=3, writers=3)
+
+        failures = pipeline.run(pages, self.template_path, "/", writer=writer, page_index=page_index)
+
+        self.assertEqual(failures, [])
+        with open(pages[7][1]) as f:
+            self.assertEqual(f.read(), "<title>Page 7</title><div><h1>Page 7</h1><p>Text</p></div>")
+        self.assertEqual(len(writer.paths_with_status("added")), 20)
+        self.assertTrue(all(page_index.has_page(markdown_path) for markdown_path, _ in pages))
+        read, render, write = pipeline.stats
+        self.assertEqual((read.items, render.items, write.items), (20, 20, 20))
+        # Bounded queues never hold more than their size
+        self.assertLessEqual(read.depth_max, 1)
+        self.assertLessEqual(render.depth_max, 1)
+        self.assertEqual(len(pipeline.report()), 3)
+
+    def test_failures_are_collected_per_page(self):
+        pages = self.pages([("good", "# Hello"), ("bad", "**unclosed"), ("missing", None)])
+
+        failures = dict(Pipeline().run(pages, self.template_path, "/"))
+
+        self.assertEqual(sorted(failures), sorted([pages[1][0], pages[2][0]]))
+        self.assertIn("No closing delimiter", failures[pages[1][0]])
+        self.assertIn("FileNotFoundError", failures[pages[2][0]])
+        with open(pages[0][1]) as f:
+            self.assertEqual(f.read(), "<title>Hello</title><div><h1>Hello</h1></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
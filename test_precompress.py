@@ -0,0 +1,106 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from precompress import precompress_tree
+
+PAGE = "<p>" + "hello world " * 200 + "</p>"
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.manifest = os.path.join(self.tmp.name, "cache", "precompress.json")
+        self.write("index.html", PAGE)
+        self.write("blog/tom/index.html", PAGE)
+        self.write("styles.css", "body {}")
+        self.write("images/a.png", "x" * 4096)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative, text):
+        path = os.path.join(self.docs, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def exists(self, relative):
+        return os.path.exists(os.path.join(self.docs, relative))
+
+    def run_precompress(self, **kwargs):
+        return precompress_tree(self.docs, self.manifest, **kwargs)
+
+    def test_compresses_large_text_files_only(self):
+        result = self.run_precompress()
+        self.assertEqual(result.compressed, ["blog/tom/index.html", "index.html"])
+        self.assertEqual(result.skipped, ["styles.css"])
+        self.assertFalse(self.exists("styles.css.gz"))
+        self.assertFalse(self.exists("images/a.png.gz"))
+        with gzip.open(os.path.join(self.docs, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), PAGE)
+
+    def test_output_is_reproducible(self):
+        self.run_precompress()
+        with open(os.path.join(self.docs, "index.html.gz"), "rb") as f:
+            first = f.read()
+        os.remove(self.manifest)
+        self.run_precompress()
+        with open(os.path.join(self.docs, "index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), first)
+
+    def test_unchanged_files_are_not_compressed_again(self):
+        self.run_precompress()
+        result = self.run_precompress()
+        self.assertEqual(result.compressed, [])
+        self.assertEqual(len(result.unchanged), 3)
+
+    def test_same_content_with_new_mtime_is_unchanged(self):
+        self.run_precompress()
+        os.utime(os.path.join(self.docs, "index.html"), ns=(1, 1))
+        result = self.run_precompress()
+        self.assertEqual(result.compressed, [])
+
+    def test_changed_file_is_compressed_again(self):
+        self.run_precompress()
+        path = self.write("index.html", PAGE + "<p>more</p>")
+        os.utime(path, ns=(1, 1))
+        result = self.run_precompress()
+        self.assertEqual(result.compressed, ["index.html"])
+        with gzip.open(path + ".gz", "rt") as f:
+            self.assertEqual(f.read(), PAGE + "<p>more</p>")
+
+    def test_missing_gzip_is_written_again(self):
+        self.run_precompress()
+        os.remove(os.path.join(self.docs, "index.html.gz"))
+        result = self.run_precompress()
+        self.assertEqual(result.compressed, ["index.html"])
+
+    def test_poor_savings_are_skipped(self):
+        result = self.run_precompress(min_savings=0.99)
+        self.assertEqual(result.compressed, [])
+        self.assertFalse(self.exists("index.html.gz"))
+
+    def test_stale_gzip_is_removed(self):
+        self.run_precompress()
+        os.remove(os.path.join(self.docs, "blog/tom/index.html"))
+        result = self.run_precompress()
+        self.assertEqual(result.removed, ["blog/tom/index.html.gz"])
+        self.assertFalse(self.exists("blog/tom/index.html.gz"))
+        # The directory the page left behind goes too
+        self.assertFalse(self.exists("blog"))
+
+    def test_file_that_shrinks_below_minimum_loses_its_gzip(self):
+        self.run_precompress()
+        path = self.write("index.html", "<p>hi</p>")
+        os.utime(path, ns=(1, 1))
+        result = self.run_precompress()
+        self.assertEqual(result.skipped, ["index.html"])
+        self.assertFalse(self.exists("index.html.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
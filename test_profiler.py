@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+
+import profiler
+from markdowntohtmlnode import markdown_to_html_node
+
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_disabled_is_a_no_op(self):
+        self.assertIsNone(profiler.active())
+        with profiler.page("a.md"):
+            with profiler.stage("read"):
+                pass
+
+    def test_page_stages(self):
+        build_profiler = profiler.Profiler()
+        profiler.enable(build_profiler)
+        with profiler.page("content/a.md"):
+            with profiler.stage("read"):
+                pass
+            markdown_to_html_node("# Title\n\nSome **bold** text")
+
+        (duration, path, stages), = build_profiler.pages
+        self.assertEqual(path, "content/a.md")
+        for name in ["read", "block_lexing", "inline_parsing", "node_construction"]:
+            self.assertIn(name, stages)
+
+        # Per-block stages are summed into the page, not emitted as events
+        names = [event["name"] for event in build_profiler.events]
+        self.assertIn("read", names)
+        self.assertIn("page", names)
+        self.assertNotIn("inline_parsing", names)
+
+    def test_merge_and_report(self):
+        worker = profiler.Profiler()
+        with worker.page("slow.md"):
+            with worker.stage("write"):
+                pass
+        parent = profiler.Profiler()
+        parent.merge_results(worker.take_results())
+        self.assertEqual(worker.pages, [])
+        lines = parent.report(top=5)
+        self.assertIn("Time per stage:", lines)
+        self.assertTrue(any("slow.md" in line for line in lines))
+
+    def test_write_trace(self):
+        build_profiler = profiler.Profiler()
+        with build_profiler.stage("build"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile", "trace.json")
+            build_profiler.write_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+        event, = trace["traceEvents"]
+        self.assertEqual(event["name"], "build")
+        self.assertEqual(event["ph"], "X")
+
+    def test_cprofile_glob(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_profiler = profiler.Profiler("content/blog/*", tmp)
+            with build_profiler.page("content/blog/a.md"):
+                pass
+            with build_profiler.page("content/index.md"):
+                pass
+            self.assertEqual(os.listdir(tmp), ["content_blog_a.md.prof"])
+
+
+if __name__ == "__main__":
+    unittest.main()
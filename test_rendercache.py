@@ -0,0 +1,58 @@
+import os
+import tempfile
+import time
+import unittest
+
+from rendercache import RenderCache
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_miss_then_hit(self):
+        key = self.cache.fragment_key("# Hello")
+        self.assertIsNone(self.cache.get("fragments", key))
+        self.cache.put("fragments", key, "<h1>Hello</h1>")
+        self.assertEqual(self.cache.get("fragments", key), "<h1>Hello</h1>")
+        self.assertEqual(self.cache.hits["fragments"], 1)
+        self.assertEqual(self.cache.misses["fragments"], 1)
+
+    def test_page_key_depends_on_every_input(self):
+        fragment = self.cache.fragment_key("# Hello")
+        base = self.cache.page_key(fragment, "t1", "/", "index")
+        self.assertNotEqual(base, self.cache.page_key(fragment, "t2", "/", "index"))
+        self.assertNotEqual(base, self.cache.page_key(fragment, "t1", "/blog/", "index"))
+        self.assertNotEqual(base, self.cache.page_key(fragment, "t1", "/", "other"))
+        self.assertEqual(base, self.cache.page_key(fragment, "t1", "/", "index"))
+
+    def test_fragment_key_depends_on_rewriter(self):
+        self.assertNotEqual(self.cache.fragment_key("# Hello", "/\0/\0/images/"),
+                            self.cache.fragment_key("# Hello", "/blog/\0/\0/images/"))
+
+    def test_entries_shared_between_instances(self):
+        key = self.cache.fragment_key("shared")
+        self.cache.put("pages", key, "page")
+        other = RenderCache(self.tmp.name)
+        self.assertEqual(other.get("pages", key), "page")
+
+    def test_prune_evicts_least_recently_used(self):
+        cache = RenderCache(self.tmp.name, max_bytes=10)
+        keys = [cache.fragment_key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put("fragments", key, "x" * 5)
+            path = cache._entry_path("fragments", key)
+            stamp = time.time() - 100 + i
+            os.utime(path, (stamp, stamp))
+
+        self.assertEqual(cache.prune(), 1)
+        self.assertIsNone(cache.get("fragments", keys[0]))
+        self.assertEqual(cache.get("fragments", keys[2]), "xxxxx")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+import unittest
+
+import blockmemo
+from blockmemo import BlockMemo
+from markdowntohtmlnode import markdown_to_html_node
+from searchindex import PageText, SearchIndex, shard_name, slugify
+from urlrewrite import UrlRewriter
+
+PAGE = """# Tom Bombadil
+
+Old Tom is a **merry** fellow.
+
+## Songs
+
+- Hey dol
+- merry dol
+"""
+
+
+def parse(markdown):
+    rewriter = UrlRewriter("/", "/blog/tom/", text=PageText())
+    html = markdown_to_html_node(markdown, rewriter).to_html()
+    return html, rewriter.text
+
+
+class TestPageText(unittest.TestCase):
+    def tearDown(self):
+        blockmemo.disable()
+
+    def test_headings_get_anchors(self):
+        html, _ = parse(PAGE)
+        self.assertIn('<h1 id="tom-bombadil">Tom Bombadil</h1>', html)
+        self.assertIn('<h2 id="songs">Songs</h2>', html)
+
+    def test_repeated_headings_get_unique_anchors(self):
+        blockmemo.enable(BlockMemo())
+        markdown = "# Songs\n\n## Notes\n\nHey dol\n\n## Notes\n\n## Notes 2\n\n## Notes"
+        html, text = parse(markdown)
+        self.assertIn('<h2 id="notes">Notes</h2>', html)
+        self.assertIn('<h2 id="notes-2">Notes</h2>', html)
+        self.assertIn('<h2 id="notes-2-2">Notes 2</h2>', html)
+        self.assertIn('<h2 id="notes-3">Notes</h2>', html)
+        # Postings give the same anchors, also for text restored from the cache
+        _, headings = PageText(text.pieces).postings()
+        self.assertEqual([anchor for anchor, _ in headings], ["songs", "notes", "notes-2", "notes-2-2", "notes-3"])
+
+    def test_no_anchors_without_collecting(self):
+        html = markdown_to_html_node(PAGE, UrlRewriter("/", "/blog/tom/")).to_html()
+        self.assertIn("<h1>Tom Bombadil</h1>", html)
+
+    def test_postings_count_words_per_section(self):
+        _, text = parse(PAGE)
+        terms, headings = text.postings()
+        self.assertEqual(headings, [["tom-bombadil", "Tom Bombadil"], ["songs", "Songs"]])
+        # Section 1 is "Tom Bombadil Old Tom is a merry fellow"
+        self.assertEqual(terms["tom"], [1, 0, 1, 3])
+        self.assertEqual(terms["merry"], [1, 6, 2, 3])
+        # List items do not run into each other
+        self.assertEqual(terms["dol"], [2, 2, 2, 4])
+
+    def test_memo_hits_replay_text(self):
+        blockmemo.enable(BlockMemo())
+        _, first = parse(PAGE)
+        _, second = parse(PAGE)
+        # Headings are rendered again for their anchors
+        self.assertEqual(blockmemo.active().hits, 2)
+        self.assertEqual(second.pieces, first.pieces)
+
+    def test_slugs_and_shard_names(self):
+        self.assertEqual(slugify("My favorite characters (in order)"), "my-favorite-characters-in-order")
+        self.assertEqual(shard_name("to"), "to.json")
+        self.assertEqual(shard_name("é"), "_c3a9.json")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, "cache", "search.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, pages):
+        index = SearchIndex(self.docs, self.state)
+        for markdown_path, markdown in pages.items():
+            if not index.has_page(markdown_path) or markdown is not None:
+                _, text = parse(markdown)
+                output_path = os.path.join(self.docs, os.path.dirname(markdown_path), "index.html")
+                index.update_page(markdown_path, output_path, text.pieces)
+        index.retain(markdown_path for markdown_path in pages)
+        result = index.write(self.docs)
+        index.save()
+        return result
+
+    def read(self, name):
+        with open(os.path.join(self.docs, "search", name)) as f:
+            return json.load(f)
+
+    def test_writes_index_pages_and_shards(self):
+        self.build({"blog/tom/index.md": PAGE})
+        self.assertEqual(self.read("index.json")["shards"]["me"], "me.json")
+        self.assertEqual(self.read("pages.json"),
+                         {"0": ["/blog/tom/", "Tom Bombadil", [["tom-bombadil", "Tom Bombadil"], ["songs", "Songs"]]]})
+        self.assertEqual(self.read("me.json"), {"merry": [[0, 1, 6, 2, 3]]})
+
+    def test_only_touched_shards_are_rewritten(self):
+        self.build({"blog/tom/index.md": PAGE, "contact/index.md": "# Contact\n\nWrite to us."})
+        result = self.build({"blog/tom/index.md": PAGE.replace("merry dol", "merry lol"),
+                             "contact/index.md": None})
+        self.assertEqual(result.added, ["search/lo.json"])
+        self.assertEqual(result.changed, ["search/do.json", "search/index.json"])
+        self.assertEqual(self.read("do.json"), {"dol": [[0, 2, 2]]})
+
+    def test_removed_pages_leave_the_index(self):
+        self.build({"blog/tom/index.md": PAGE, "contact/index.md": "# Contact\n\nWrite to us."})
+        result = self.build({"blog/tom/index.md": None})
+        self.assertIn("search/wr.json", result.removed)
+        self.assertNotIn("1", self.read("pages.json"))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "search", "co.json")))
+
+    def test_missing_shards_are_written_again(self):
+        self.build({"blog/tom/index.md": PAGE})
+        os.remove(os.path.join(self.docs, "search", "me.json"))
+        result = self.build({"blog/tom/index.md": None})
+        self.assertEqual(result.added, ["search/me.json"])
+        self.assertEqual(result.changed, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
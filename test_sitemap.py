@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+
+from listings import ListingGenerator
+from main import write_sitemaps_and_feeds
+from pageindex import PageIndex
+from sitemap import SitemapWriter, rfc822_datetime, w3c_datetime
+
+DAY = 86400 * 10**9
+
+
+class TestSitemap(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        self.modified = {}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def index(self, pages):
+        page_index = PageIndex(self.docs, os.path.join(self.cache, "pages.json"))
+        for markdown_path, (title, day, *date) in pages.items():
+            output_path = os.path.join(self.docs, markdown_path.replace(".md", ".html"))
+            metadata = {"title": title, "date": date[0] if date else None, "tags": [], "summary": f"About {title}"}
+            page_index.update_page(markdown_path, output_path, metadata)
+            self.modified[os.path.relpath(output_path, self.docs)] = day * DAY
+        page_index.retain(pages)
+        page_index.save()
+        return page_index
+
+    def build(self, pages, shard_size=2):
+        page_index = PageIndex(self.docs, os.path.join(self.cache, "pages.json"))
+        page_index = self.index(pages) if pages is not None else page_index
+        writer = SitemapWriter(self.docs, "/site/", "https://example.com", os.path.join(self.cache, "sitemap.json"),
+                               shard_size)
+        entries = page_index.entries()
+        writer.write_sitemaps(entries, self.modified.get)
+        writer.write_feeds(entries, self.modified.get)
+        writer.finish()
+        return writer
+
+    def read(self, relative):
+        with open(os.path.join(self.docs, relative)) as f:
+            return f.read()
+
+    def test_dates(self):
+        self.assertEqual(w3c_datetime(DAY), "1970-01-02T00:00:00+00:00")
+        self.assertEqual(rfc822_datetime(DAY), "Fri, 02 Jan 1970 00:00:00 +0000")
+
+    def test_sitemap_shards_and_index(self):
+        self.build({"index.md": ("Home", 1), "contact/index.md": ("Contact", 2), "blog/index.md": ("Blog", 3)})
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<loc>https://example.com/site/sitemap-1.xml</loc>"
+                      "<lastmod>1970-01-04T00:00:00+00:00</lastmod>", sitemap)
+        self.assertIn("<loc>https://example.com/site/sitemap-2.xml</loc>", sitemap)
+        self.assertIn("<url><loc>https://example.com/site/</loc><lastmod>1970-01-02T00:00:00+00:00</lastmod></url>",
+                      self.read("sitemap-1.xml"))
+
+    def test_feeds_list_newest_posts_first(self):
+        self.build({"blog/index.md": ("Posts & news", 1), "blog/tom/index.md": ("Tom", 2),
+                    "blog/old/index.md": ("Old", 1), "index.md": ("Home", 5)})
+        rss = self.read("blog/feed.xml")
+        self.assertIn("<title>Posts &amp; news</title>", rss)
+        self.assertLess(rss.index("/site/blog/tom/"), rss.index("/site/blog/old/"))
+        self.assertNotIn("<link>https://example.com/site/</link>", rss)
+        self.assertIn("<description>About Tom</description>", rss)
+        atom = self.read("blog/atom.xml")
+        self.assertIn("<updated>1970-01-03T00:00:00+00:00</updated>", atom)
+
+    def test_feed_dates_come_from_front_matter(self):
+        self.build({"blog/tom/index.md": ("Tom", 9), "blog/old/index.md": ("Old", 10, "1969-12-31")})
+        rss = self.read("blog/feed.xml")
+        self.assertLess(rss.index("/site/blog/tom/"), rss.index("/site/blog/old/"))
+        self.assertIn("<pubDate>Wed, 31 Dec 1969 00:00:00 +0000</pubDate>", rss)
+        self.assertIn("<lastBuildDate>Sun, 11 Jan 1970 00:00:00 +0000</lastBuildDate>", rss)
+
+    def test_only_affected_files_are_rewritten(self):
+        pages = {"index.md": ("Home", 1), "contact/index.md": ("Contact", 1), "blog/tom/index.md": ("Tom", 1)}
+        self.build(pages)
+        writer = self.build(None)
+        self.assertEqual(writer.changed + writer.added, [])
+
+        # A new page goes to the shard with room and leaves the others alone
+        pages["about/index.md"] = ("About", 2)
+        writer = self.build(pages)
+        self.assertEqual(writer.changed, ["sitemap-2.xml", "sitemap.xml"])
+
+        pages["index.md"] = ("Home", 3)
+        writer = self.build(pages)
+        self.assertEqual(writer.changed, ["sitemap-1.xml", "sitemap.xml"])
+        self.assertEqual(writer.removed, [])
+
+    def test_stale_files_are_removed(self):
+        self.build({"index.md": ("Home", 1), "blog/tom/index.md": ("Tom", 1)})
+        writer = self.build({"index.md": ("Home", 1)})
+        self.assertEqual(writer.removed, ["blog/atom.xml", "blog/feed.xml"])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "feed.xml")))
+
+    def test_page_index_is_only_saved_when_changed(self):
+        path = os.path.join(self.cache, "pages.json")
+        self.index({"index.md": ("Home", 1)})
+        os.utime(path, ns=(1, 1))
+        self.index({"index.md": ("Home", 1)})
+        self.assertEqual(os.stat(path).st_mtime_ns, 1)
+        self.index({"index.md": ("Home, again", 1)})
+        self.assertNotEqual(os.stat(path).st_mtime_ns, 1)
+
+    def test_feeds_only_list_markdown_pages(self):
+        page_index = self.index({"blog/tom/index.md": ("Tom", 1), "blog/old/index.md": ("Old", 2)})
+        template_path = os.path.join(self.tmp.name, "template.html")
+        for name in ("template.html", "listing.html", "archive.html"):
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write("{{ Title }}")
+        listings = ListingGenerator(template_path, self.docs, "/site/")
+        listings.generate(page_index)
+        for entry in listings.entries():
+            self.modified[entry["output"]] = 3 * DAY
+        writer = SitemapWriter(self.docs, "/site/", "https://example.com")
+        write_sitemaps_and_feeds(writer, page_index, listings, self.modified.get)
+        sitemap = self.read("sitemap-1.xml")
+        self.assertIn("<loc>https://example.com/site/blog/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/site/blog/archive/</loc>", sitemap)
+        rss = self.read("blog/feed.xml")
+        self.assertEqual(rss.count("<item>"), 2)
+        self.assertNotIn("archive", rss)
+
+
+if __name__ == "__main__":
+    unittest.main()
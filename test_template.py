@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from template import TemplateLoader, TemplateError
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template_path = self.write("template.html", '<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+        self.loader = TemplateLoader(self.template_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_placeholders(self):
+        template = self.loader.get("/")
+        html = template.render({"Title": "Home", "Content": "<p>hi</p>"})
+        self.assertEqual(html, '<link href="/index.css"><title>Home</title><p>hi</p>')
+
+    def test_base_path_applied_at_compile_time(self):
+        template = self.loader.get("/site/")
+        html = template.render({"Title": "Home", "Content": ""})
+        self.assertEqual(html, '<link href="/site/index.css"><title>Home</title>')
+
+    def test_compiled_once(self):
+        self.assertIs(self.loader.get("/"), self.loader.get("/"))
+
+    def test_recompiles_when_file_changes(self):
+        first = self.loader.get("/")
+        self.write("template.html", "<main>{{ Content }}</main>")
+        os.utime(self.template_path, ns=(1, 1))
+        second = self.loader.get("/")
+        self.assertIsNot(first, second)
+        self.assertNotEqual(first.key, second.key)
+        self.assertEqual(second.render({"Content": "x"}), "<main>x</main>")
+
+    def test_partials(self):
+        self.write("partials/nav.html", '<nav><a href="/">{{ Title }}</a></nav>')
+        self.write("template.html", "{{> nav }}{{ Content }}")
+        template = self.loader.get("/base/")
+        self.assertEqual(template.render({"Title": "T", "Content": "c"}), '<nav><a href="/base/">T</a></nav>c')
+
+    def test_unknown_partial(self):
+        self.write("template.html", "{{> missing }}")
+        with self.assertRaises(TemplateError):
+            self.loader.get("/")
+
+    def test_loops(self):
+        self.write("template.html", "<ul>{% for post in Posts %}<li>{{ post.title }}</li>{% endfor %}</ul>")
+        template = self.loader.get("/")
+        html = template.render({"Posts": [{"title": "a"}, {"title": "b"}]})
+        self.assertEqual(html, "<ul><li>a</li><li>b</li></ul>")
+
+    def test_unclosed_loop(self):
+        self.write("template.html", "{% for post in Posts %}")
+        with self.assertRaises(TemplateError):
+            self.loader.get("/")
+
+    def test_per_directory_layouts(self):
+        self.write("layouts/blog.html", "<article>{{ Content }}</article>")
+        self.assertEqual(self.loader.layout_for("blog/tom"), os.path.join(self.root, "layouts", "blog.html"))
+        self.assertEqual(self.loader.layout_for("contact"), self.template_path)
+        self.assertEqual(self.loader.get("/", "blog/tom").render({"Content": "x"}), "<article>x</article>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,5 +24,11 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("Same text", TextType.ITALIC)
         self.assertNotEqual(node1, node2)
 
+    def test_slots(self):
+        node = TextNode("Same text", TextType.LINK, "http://example.com")
+        self.assertFalse(hasattr(node, "__dict__"))
+        node.url = "http://other.com"
+        self.assertEqual(node.url, "http://other.com")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from markdowntohtmlnode import markdown_to_html_node
+from urlrewrite import UrlRewriter, page_url_for
+
+
+class TestUrlRewrite(unittest.TestCase):
+    def test_page_url_for(self):
+        self.assertEqual(page_url_for("index.html"), "/")
+        self.assertEqual(page_url_for("blog/tom/index.html"), "/blog/tom/")
+        self.assertEqual(page_url_for("about.html"), "/about.html")
+
+    def test_base_path_prefixing(self):
+        rewriter = UrlRewriter("/site/")
+        self.assertEqual(rewriter.rewrite_link("/blog/tom"), "/site/blog/tom")
+        self.assertEqual(rewriter.rewrite_link("/"), "/site/")
+        self.assertEqual(UrlRewriter("/site").rewrite_link("/a"), "/site/a")
+        self.assertEqual(UrlRewriter("/").rewrite_link("/a"), "/a")
+
+    def test_external_and_fragment_links_untouched(self):
+        rewriter = UrlRewriter("/site/")
+        for url in ["https://example.com/x", "mailto:a@b.c", "//cdn.example.com/x.js", "#top", ""]:
+            self.assertEqual(rewriter.rewrite_link(url), url)
+
+    def test_relative_links_resolved_against_page(self):
+        rewriter = UrlRewriter("/site/", "/blog/tom/")
+        self.assertEqual(rewriter.rewrite_link("../glorfindel"), "/site/blog/glorfindel")
+        self.assertEqual(rewriter.rewrite_link("notes/"), "/site/blog/tom/notes/")
+        self.assertEqual(rewriter.rewrite_link("../../contact?x=1#form"), "/site/contact?x=1#form")
+        self.assertEqual(UrlRewriter("/", "/about.html").rewrite_link("contact.html"), "/contact.html")
+
+    def test_fragment_before_query_is_not_rewritten(self):
+        rewriter = UrlRewriter("/site/", "/blog/tom/")
+        self.assertEqual(rewriter.rewrite_link("../notes#a/../b?x"), "/site/blog/notes#a/../b?x")
+        self.assertEqual(rewriter.rewrite_link("../notes?a/../b#c"), "/site/blog/notes?a/../b#c")
+
+    def test_bare_image_mapped_to_image_dir(self):
+        rewriter = UrlRewriter("/site/", "/blog/tom/")
+        self.assertEqual(rewriter.rewrite_image("tom.png"), "/site/images/tom.png")
+        self.assertEqual(rewriter.rewrite_image("/images/tom.png"), "/site/images/tom.png")
+        self.assertEqual(rewriter.rewrite_image("./tom.png"), "/site/blog/tom/tom.png")
+
+    def test_bare_image_next_to_page_stays_relative(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            open(os.path.join(tmp, "photo.png"), "w").close()
+            rewriter = UrlRewriter("/", "/blog/tom/", source_dir=tmp)
+            self.assertEqual(rewriter.rewrite_image("photo.png"), "/blog/tom/photo.png")
+            self.assertEqual(rewriter.rewrite_image("missing.png"), "/images/missing.png")
+
+    def test_signature(self):
+        self.assertEqual(UrlRewriter("/a/", "/x/").signature(), UrlRewriter("/a", "/x/").signature())
+        self.assertNotEqual(UrlRewriter("/a/").signature(), UrlRewriter("/b/").signature())
+
+    def test_signature_covers_images_next_to_page(self):
+        markdown = "![x](photo.png) ![y](/images/other.png)"
+        with tempfile.TemporaryDirectory() as tmp:
+            before = UrlRewriter("/", "/blog/tom/", source_dir=tmp)
+            before.probe_images(markdown)
+            open(os.path.join(tmp, "photo.png"), "w").close()
+            after = UrlRewriter("/", "/blog/tom/", source_dir=tmp)
+            after.probe_images(markdown)
+        self.assertEqual(after.probes, {"photo.png": True})
+        self.assertNotEqual(before.signature(), after.signature())
+        self.assertEqual(before.signature(include_page=False), after.signature(include_page=False))
+        # Rendering uses the probed result
+        self.assertEqual(after.rewrite_image("photo.png"), "/blog/tom/photo.png")
+
+    def test_markdown_to_html_node_rewrites_props(self):
+        markdown = "See [home](/) and ![pic](tom.png)\n\n- [up](../other)\n\n`href=\"/code\"`"
+        html = markdown_to_html_node(markdown, UrlRewriter("/site/", "/blog/tom/")).to_html()
+        self.assertIn('<a href="/site/">home</a>', html)
+        self.assertIn('<img src="/site/images/tom.png" alt="pic">', html)
+        self.assertIn('<a href="/site/blog/other">up</a>', html)
+        # Text that merely looks like a URL attribute is not touched
+        self.assertIn('href="/code"', html)
+
+    def test_without_rewriter_urls_are_unchanged(self):
+        html = markdown_to_html_node("[home](/) ![pic](tom.png)").to_html()
+        self.assertIn('href="/"', html)
+        self.assertIn('src="tom.png"', html)
+
+
+if __name__ == "__main__":
+    unittest.main()